@@ -0,0 +1,171 @@
+"""Admission control: bound concurrent database work to what the pool can serve.
+
+Without it, overload shows up as requests queueing inside the connection pool
+for up to DB_POOL_TIMEOUT seconds while the threadpool keeps accepting more
+work. Instead, at most ADMISSION_MAX_CONCURRENCY DB-bound requests run at once
+(by default the pool's size plus overflow), up to ADMISSION_QUEUE_SIZE more
+wait in FIFO order for at most ADMISSION_QUEUE_TIMEOUT seconds, and anything
+beyond that is rejected immediately with 503 and a Retry-After header.
+
+Probes, metrics and documentation endpoints bypass admission so the service
+stays observable while it sheds load, as do change feed streams.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+
+from . import metrics
+from .database import DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "True").lower() == "true"
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", str(2 * ADMISSION_MAX_CONCURRENCY)))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# Threads for sync handlers: one per admitted request plus headroom for non-DB work
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", str(ADMISSION_MAX_CONCURRENCY + 8)))
+
+# Long-lived change streams hold no DB connection and must not pin a slot
+EXEMPT_PATHS = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json", "/changes")
+
+ADMISSION_REJECTED = metrics.REGISTRY.counter(
+    "pm_admission_rejected_total", "Requests rejected by admission control.", ("reason",),
+)
+ADMISSION_ACTIVE = metrics.REGISTRY.gauge(
+    "pm_admission_active", "DB-bound requests currently admitted.",
+)
+ADMISSION_QUEUED = metrics.REGISTRY.gauge(
+    "pm_admission_queued", "DB-bound requests waiting for admission.",
+)
+ADMISSION_WAIT = metrics.REGISTRY.histogram(
+    "pm_admission_wait_seconds", "Time admitted requests spent queued.",
+    (), metrics.POOL_WAIT_BUCKETS,
+)
+
+
+class AdmissionController:
+    """FIFO concurrency limiter with a bounded, deadline-limited queue.
+
+    Not thread-safe: it is only used from the worker's event loop.
+    """
+
+    def __init__(self, capacity: int, queue_size: int, queue_timeout: float):
+        self.capacity = capacity
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: deque = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        """Return None when admitted, otherwise the rejection reason."""
+        if self.active < self.capacity and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+            return None
+        except asyncio.TimeoutError:
+            if future.done():
+                # The slot was handed over just as the deadline passed
+                return None
+            future.cancel()
+            self._waiters.remove(future)
+            return "timeout"
+        except asyncio.CancelledError:
+            # Client went away while queued; give back a slot we may have received
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+                if future in self._waiters:
+                    self._waiters.remove(future)
+            raise
+
+    def release(self) -> None:
+        # Hand the slot straight to the next waiter so ordering stays FIFO
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+def is_exempt(path: str) -> bool:
+    return path == "/" or path.startswith(EXEMPT_PATHS)
+
+
+class AdmissionControlMiddleware:
+    """Admit, queue or reject DB-bound requests based on pool capacity.
+
+    A plain ASGI middleware, so the slot is held until the app returns, i.e.
+    after the last body chunk of a streamed response has been sent.
+    """
+
+    def __init__(self, app, capacity=ADMISSION_MAX_CONCURRENCY,
+                 queue_size=ADMISSION_QUEUE_SIZE, queue_timeout=ADMISSION_QUEUE_TIMEOUT):
+        self.app = app
+        self.controller = AdmissionController(capacity, queue_size, queue_timeout)
+
+    async def __call__(self, scope, receive, send):
+        if (not ADMISSION_CONTROL or scope["type"] != "http" or scope["method"] == "OPTIONS"
+                or is_exempt(scope["path"])):
+            await self.app(scope, receive, send)
+            return
+
+        queued_at = time.perf_counter()
+        ADMISSION_QUEUED.set(self.controller.queued + 1)
+        try:
+            reason = await self.controller.acquire()
+        finally:
+            ADMISSION_QUEUED.set(self.controller.queued)
+        if reason is not None:
+            ADMISSION_REJECTED.inc(reason)
+            logger.warning(
+                f"Rejected {scope['method']} {scope['path']}: {reason} "
+                f"(active={self.controller.active}, queued={self.controller.queued})"
+            )
+            response = JSONResponse(
+                status_code=503,
+                content={
+                    "error": "Server busy",
+                    "detail": "Too many concurrent requests; retry shortly",
+                    "path": scope["path"],
+                    "timestamp": datetime.now().isoformat(),
+                },
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+
+        ADMISSION_WAIT.observe(time.perf_counter() - queued_at)
+        ADMISSION_ACTIVE.set(self.controller.active)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+            ADMISSION_ACTIVE.set(self.controller.active)
+
+
+def configure_threadpool(size: int = THREADPOOL_SIZE) -> None:
+    """Size the threadpool that runs sync handlers (call from the event loop)."""
+    import anyio.to_thread
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+    logger.info(f"Threadpool size set to {size} (admission capacity {ADMISSION_MAX_CONCURRENCY})")
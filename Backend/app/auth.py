@@ -0,0 +1,226 @@
+"""Authentication: password logins and bearer token checks.
+
+Password hashes are computed and verified with bcrypt on a small process pool
+(AUTH_HASH_WORKERS), with at most AUTH_HASH_CONCURRENCY hashes in flight per
+worker. A burst of logins therefore only slows the login endpoint; the event
+loop and the threadpool serving everything else never run bcrypt.
+
+Access tokens are HS256 JWTs signed with a key object built once, on first use
+(jose is imported then too, keeping it out of startup).
+Verified claims are kept in an LRU cache keyed by the token, so requests
+after the first one with a token cost a dict lookup and an expiry check
+instead of a signature verification.
+
+Authentication is enforced when AUTH_REQUIRED is set. Until then requests
+without a token are let through anonymously (the frontend has no login yet),
+but a token that is sent must be valid.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, status
+from starlette.requests import HTTPConnection
+
+from . import passwords, tenancy
+
+logger = logging.getLogger(__name__)
+
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "False").lower() == "true"
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-me-in-production")
+JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+AUTH_HASH_CONCURRENCY = int(os.getenv("AUTH_HASH_CONCURRENCY", str(AUTH_HASH_WORKERS * 4)))
+AUTH_HASH_QUEUE_TIMEOUT = float(os.getenv("AUTH_HASH_QUEUE_TIMEOUT", "5"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+ROLES = ("admin", "manager", "tenant")
+
+if AUTH_REQUIRED and JWT_SECRET_KEY == "change-me-in-production":
+    logger.warning("AUTH_REQUIRED is set but JWT_SECRET_KEY is the development default")
+
+# Built once: jose would otherwise construct the HMAC key on every encode/decode
+_key = None
+
+# Checked when the email is unknown, so the response time doesn't reveal which emails exist
+_DUMMY_HASH = "$2b$12$6xueuQpmn4f9O7u8tiJjiu90pztGqfiEmTjxlJdlPtRHjVb2H0VNm"
+
+
+class Principal(NamedTuple):
+    user_id: int
+    email: str
+    role: str
+    tenant_id: Optional[int]
+    expires_at: float
+    schema: Optional[str] = None  # customer schema the token was issued for (multi-tenant mode)
+
+
+# --- password hashing -------------------------------------------------------
+
+# ProcessPoolExecutor, created on first use: multiprocessing is only needed once somebody logs in
+_pool = None
+_pool_lock = threading.Lock()
+_hash_slots = asyncio.Semaphore(AUTH_HASH_CONCURRENCY)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Spawned, not forked: workers never inherit the app's connections or threads
+            _pool = ProcessPoolExecutor(max_workers=AUTH_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+async def _run_hash(fn, *args):
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), AUTH_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    finally:
+        _hash_slots.release()
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hash(passwords.hash_password, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed: Optional[str]) -> bool:
+    return await _run_hash(passwords.verify_password, password, hashed or _DUMMY_HASH) and hashed is not None
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# --- tokens -----------------------------------------------------------------
+
+_token_cache: "OrderedDict[str, Principal]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _signing_key():
+    global _key
+    if _key is None:
+        from jose import jwk
+
+        _key = jwk.construct(JWT_SECRET_KEY, JWT_ALGORITHM)
+    return _key
+
+
+def create_access_token(user) -> str:
+    from jose import jwt
+
+    now = int(time.time())
+    claims = {
+        "sub": str(user.id),
+        "email": user.email,
+        "role": user.role,
+        "tenant_id": user.tenant_id,
+        "cst": tenancy.current_schema(),
+        "iat": now,
+        "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+    return jwt.encode(claims, _signing_key(), algorithm=JWT_ALGORITHM)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def verify_token(token: str) -> Principal:
+    """Return the token's principal, raising 401 when it is invalid or expired."""
+    from jose import jwt, JWTError
+
+    now = time.time()
+    with _token_cache_lock:
+        principal = _token_cache.get(token)
+        if principal is not None:
+            if principal.expires_at > now:
+                _token_cache.move_to_end(token)
+                return _check_customer(principal)
+            del _token_cache[token]
+            raise _unauthorized("Token has expired")
+
+    try:
+        claims = jwt.decode(token, _signing_key(), algorithms=[JWT_ALGORITHM])
+        principal = Principal(
+            user_id=int(claims["sub"]),
+            email=claims.get("email") or "",
+            role=claims.get("role") or "manager",
+            tenant_id=claims.get("tenant_id"),
+            expires_at=float(claims["exp"]),
+            schema=claims.get("cst"),
+        )
+    except jwt.ExpiredSignatureError:
+        raise _unauthorized("Token has expired")
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise _unauthorized("Invalid token")
+
+    with _token_cache_lock:
+        _token_cache[token] = principal
+        if len(_token_cache) > AUTH_TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return _check_customer(principal)
+
+
+def _check_customer(principal: Principal) -> Principal:
+    # User ids are per customer schema: a token is only good for the customer that issued it
+    if principal.schema != tenancy.current_schema():
+        raise _unauthorized("Token was issued for another customer")
+    return principal
+
+
+def _bearer_token(connection: HTTPConnection) -> Optional[str]:
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token.strip()
+    # EventSource and browser WebSockets can't set headers
+    return connection.query_params.get("access_token")
+
+
+async def authenticate(connection: HTTPConnection) -> Optional[Principal]:
+    """Router dependency: the caller's principal, or None for anonymous access when auth is optional."""
+    token = _bearer_token(connection)
+    if token is None:
+        if AUTH_REQUIRED:
+            raise _unauthorized("Not authenticated")
+        return None
+    principal = verify_token(token)
+    connection.state.principal = principal
+    return principal
+
+
+async def require_user(principal: Optional[Principal] = Depends(authenticate)) -> Principal:
+    if principal is None:
+        raise _unauthorized("Not authenticated")
+    return principal
+
+
+async def require_admin(principal: Principal = Depends(require_user)) -> Principal:
+    if principal.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return principal
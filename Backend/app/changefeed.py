@@ -0,0 +1,352 @@
+"""Change notifications for WebSocket / Server-Sent Events clients.
+
+Publishing: session events record which synced rows a transaction inserted,
+updated or deleted. On PostgreSQL the list is sent with pg_notify inside the
+same transaction, so notifications are delivered only if (and when) it
+commits, to every worker. Other databases (the desktop build) publish to the
+local worker after commit.
+
+Delivery: each worker keeps one LISTEN connection on a background thread and
+hands notifications to the event loop, where the hub fans them out. That
+connection is opened outside the engine's pool, so gunicorn.conf.py counts it
+in DB_RESERVED_PER_WORKER. Every subscriber has an entity filter and a
+bounded set of pending changes keyed by (entity, id): bursts collapse into
+one message per CHANGEFEED_COALESCE_MS, and a subscriber that falls more
+than CHANGEFEED_MAX_PENDING rows behind gets a single "resync" message
+(fetch /sync) instead of an unbounded backlog.
+
+Messages carry only entity, id and op; clients fetch the rows with /sync.
+In multi-tenant mode changes are tagged with the customer schema and only
+reach that customer's subscribers.
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select as sa_select, func
+from sqlalchemy.orm import Session
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CHANGEFEED_CHANNEL = os.getenv("CHANGEFEED_CHANNEL", "pm_changes")
+CHANGEFEED_COALESCE_MS = float(os.getenv("CHANGEFEED_COALESCE_MS", "250"))
+CHANGEFEED_MAX_PENDING = int(os.getenv("CHANGEFEED_MAX_PENDING", "1000"))
+CHANGEFEED_HEARTBEAT = float(os.getenv("CHANGEFEED_HEARTBEAT", "15"))
+CHANGEFEED_RECONNECT_DELAY = float(os.getenv("CHANGEFEED_RECONNECT_DELAY", "2"))
+
+# Tables whose changes are published, by sync collection name (see routers/sync.py)
+ENTITIES = ("properties", "tenants", "leases", "transactions", "maintenance_requests")
+
+# pg_notify payloads must stay below 8000 bytes
+_MAX_PAYLOAD = 7000
+
+CHANGES_PUBLISHED = metrics.REGISTRY.counter(
+    "pm_changefeed_changes_total", "Row changes received by this worker's change feed.", ("entity",),
+)
+CHANGEFEED_SUBSCRIBERS = metrics.REGISTRY.gauge(
+    "pm_changefeed_subscribers", "Connected change feed subscribers.",
+)
+CHANGEFEED_RESYNCS = metrics.REGISTRY.counter(
+    "pm_changefeed_resyncs_total", "Subscribers told to resync after falling behind.",
+)
+
+Change = Tuple[str, int, str]  # (entity, id, op)
+
+
+class Subscriber:
+    """One client's filtered, coalescing view of the change stream."""
+
+    def __init__(self, entities: Optional[Iterable[str]] = None, max_pending: int = CHANGEFEED_MAX_PENDING,
+                 schema: Optional[str] = None):
+        self.entities = set(entities) if entities else None
+        self.schema = schema
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[str, int], str] = {}
+        self._overflow = False
+        self._ready = asyncio.Event()
+
+    def offer(self, changes: List[Change]) -> None:
+        for entity, entity_id, op in changes:
+            if self.entities is not None and entity not in self.entities:
+                continue
+            if self._overflow:
+                break
+            key = (entity, entity_id)
+            if key not in self._pending and len(self._pending) >= self.max_pending:
+                # Too far behind to be worth replaying; the client refetches instead
+                self._overflow = True
+                self._pending.clear()
+                CHANGEFEED_RESYNCS.inc()
+                break
+            if op == "insert" and self._pending.get(key) == "delete":
+                op = "update"
+            elif op == "update" and key in self._pending:
+                continue  # an earlier insert/update already covers it
+            self._pending[key] = op
+        if self._pending or self._overflow:
+            self._ready.set()
+
+    def force_resync(self) -> None:
+        self._overflow = True
+        self._pending.clear()
+        self._ready.set()
+
+    async def next_message(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait for the next batch; None when nothing arrived within timeout."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        # Let a burst settle so it goes out as one message
+        await asyncio.sleep(CHANGEFEED_COALESCE_MS / 1000)
+        self._ready.clear()
+        if self._overflow:
+            self._overflow = False
+            return {"type": "resync"}
+        pending, self._pending = self._pending, {}
+        return {
+            "type": "changes",
+            "changes": [
+                {"entity": entity, "id": entity_id, "op": op}
+                for (entity, entity_id), op in pending.items()
+            ],
+        }
+
+
+class ChangeHub:
+    """Fans change batches out to subscribers and in-process callbacks.
+
+    All methods except the *_threadsafe ones must be called on the event loop.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+        self._callbacks: List[Callable[[Optional[List[Change]]], None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def subscribe(self, entities: Optional[Iterable[str]] = None, schema: Optional[str] = None) -> Subscriber:
+        subscriber = Subscriber(entities, schema=schema)
+        self._subscribers.append(subscriber)
+        CHANGEFEED_SUBSCRIBERS.set(len(self._subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+        CHANGEFEED_SUBSCRIBERS.set(len(self._subscribers))
+
+    def add_callback(self, callback: Callable[[Optional[List[Change]]], None]) -> None:
+        """Call callback(changes) for every batch, e.g. to invalidate a cache.
+
+        changes is None when notifications may have been lost and anything
+        could have changed.
+        """
+        self._callbacks.append(callback)
+
+    def _run_callbacks(self, changes: Optional[List[Change]]) -> None:
+        for callback in self._callbacks:
+            try:
+                callback(changes)
+            except Exception:
+                logger.exception("Change feed callback failed")
+
+    def publish(self, changes: List[Change], schema: Optional[str] = None) -> None:
+        for entity, _, _ in changes:
+            CHANGES_PUBLISHED.inc(entity)
+        self._run_callbacks(changes)
+        for subscriber in self._subscribers:
+            if subscriber.schema == schema:
+                subscriber.offer(changes)
+
+    def resync(self) -> None:
+        """Tell everyone that changes may have been missed."""
+        self._run_callbacks(None)
+        for subscriber in self._subscribers:
+            subscriber.force_resync()
+        if self._subscribers:
+            CHANGEFEED_RESYNCS.inc(amount=len(self._subscribers))
+
+    def _call_threadsafe(self, callback, *args) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(callback, *args)
+
+    def publish_threadsafe(self, changes: List[Change], schema: Optional[str] = None) -> None:
+        self._call_threadsafe(self.publish, changes, schema)
+
+    def resync_threadsafe(self) -> None:
+        self._call_threadsafe(self.resync)
+
+
+hub = ChangeHub()
+
+
+# --- publishing -------------------------------------------------------------
+
+def _collect(session: Session, flush_context) -> None:
+    changes = session.info.setdefault("pm_changes", [])
+    for op, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            table = getattr(obj, "__tablename__", None)
+            if table not in ENTITIES:
+                continue
+            if op == "update" and not session.is_modified(obj, include_collections=False):
+                continue
+            changes.append((table, obj.id, op))
+
+
+def record_changes(session: Session, entity: str, ids: Iterable[int], op: str) -> None:
+    """Announce rows changed by a bulk statement, which bypasses flush events."""
+    session.info.setdefault("pm_changes", []).extend((entity, entity_id, op) for entity_id in ids)
+
+
+def _notify(session: Session) -> None:
+    # Flush first so the changes of this final flush are collected too
+    session.flush()
+    changes = session.info.pop("pm_changes", None)
+    if not changes or session.get_bind().dialect.name != "postgresql":
+        if changes:
+            session.info["pm_committed_changes"] = changes
+        return
+    # Customer schema set by tenancy.py; payloads without one are a plain list
+    schema = session.info.get("pm_schema")
+
+    def send(batch: List[Change]) -> None:
+        payload = {"schema": schema, "changes": batch} if schema else batch
+        session.execute(sa_select(func.pg_notify(CHANGEFEED_CHANNEL, json.dumps(payload))))
+
+    # Split into payloads small enough for pg_notify
+    batch: List[Change] = []
+    size = 0
+    for change in changes:
+        item = json.dumps(change)
+        if batch and size + len(item) > _MAX_PAYLOAD:
+            send(batch)
+            batch, size = [], 0
+        batch.append(change)
+        size += len(item) + 1
+    send(batch)
+
+
+def _publish_local(session: Session) -> None:
+    changes = session.info.pop("pm_committed_changes", None)
+    if changes:
+        hub.publish_threadsafe([tuple(c) for c in changes], session.info.get("pm_schema"))
+
+
+def _discard(session: Session) -> None:
+    session.info.pop("pm_changes", None)
+    session.info.pop("pm_committed_changes", None)
+
+
+def install(session_factory) -> None:
+    """Publish changes made through sessions from session_factory."""
+    event.listen(session_factory, "after_flush", _collect)
+    event.listen(session_factory, "before_commit", _notify)
+    event.listen(session_factory, "after_commit", _publish_local)
+    event.listen(session_factory, "after_soft_rollback", lambda session, previous: _discard(session))
+
+
+# --- listening --------------------------------------------------------------
+
+class PostgresListener:
+    """One LISTEN connection per worker, read on a daemon thread.
+
+    A thread with select() works with every event loop (including Windows'
+    proactor loop, which has no add_reader).
+    """
+
+    def __init__(self, engine, channel: str = CHANGEFEED_CHANNEL):
+        self.engine = engine
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self):
+        cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+        cparams.update(connect_timeout=10, application_name="property_manager_changefeed")
+        connection = self.engine.dialect.dbapi.connect(*cargs, **cparams)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _run(self) -> None:
+        reconnecting = False
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                logger.info(f"Change feed listening on channel '{self.channel}'")
+                if reconnecting:
+                    # Notifications sent while disconnected are lost
+                    hub.resync_threadsafe()
+                    reconnecting = False
+                while not self._stop.is_set():
+                    readable, _, _ = select.select([connection], [], [], 1.0)
+                    if not readable:
+                        continue
+                    connection.poll()
+                    by_schema: Dict[Optional[str], List[Change]] = {}
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        try:
+                            payload = json.loads(notification.payload)
+                            schema = payload.get("schema") if isinstance(payload, dict) else None
+                            changes = payload["changes"] if isinstance(payload, dict) else payload
+                            by_schema.setdefault(schema, []).extend(tuple(c) for c in changes)
+                        except (ValueError, KeyError, TypeError):
+                            logger.warning(f"Ignoring malformed change notification: {notification.payload[:200]}")
+                    for schema, changes in by_schema.items():
+                        hub.publish_threadsafe(changes, schema)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logger.error(f"Change feed listener error: {str(e)}")
+                reconnecting = True
+                self._stop.wait(CHANGEFEED_RECONNECT_DELAY)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="changefeed-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+_listener: Optional[PostgresListener] = None
+
+
+def start(engine) -> None:
+    """Bind the hub to the running loop and start this worker's listener."""
+    global _listener
+    hub.bind(asyncio.get_running_loop())
+    if engine.dialect.name == "postgresql" and _listener is None:
+        _listener = PostgresListener(engine)
+        _listener.start()
+
+
+def stop() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
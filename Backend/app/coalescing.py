@@ -0,0 +1,133 @@
+"""Single-flight coalescing for identical concurrent GET requests.
+
+When several clients ask for the same resource at the same moment (open
+portal tabs, polling hooks), only the first request runs the handler and its
+database queries; the others wait for it and receive a copy of the same
+serialized response body.
+
+Only routes listed in COALESCE_ROUTES (route templates, comma separated) take
+part. Requests are keyed by path, sorted query string, and a hash of the
+headers that can change the response (credentials, host, customer), so
+clients never receive a body produced for somebody else. Every completed
+write through this worker starts a new generation, and requests arriving after
+it never join a flight that started before it.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Pattern
+
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+COALESCE_ROUTES = os.getenv(
+    "COALESCE_ROUTES",
+    "/properties/,/properties/{property_id},/tenants/,/tenants/{tenant_id},/dashboard",
+)
+# Request headers that may change the response; they are part of the key
+KEY_HEADERS = ("authorization", "cookie", "host", "x-customer", "accept", "accept-encoding")
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+REQUESTS_COALESCED = metrics.REGISTRY.counter(
+    "pm_requests_coalesced_total", "GET requests served from another request's in-flight result.", ("route",),
+)
+
+
+def _template_pattern(template: str) -> Pattern:
+    parts = re.split(r"(\{[^}]+\})", template)
+    regex = "".join("[^/]+" if p.startswith("{") else re.escape(p) for p in parts)
+    return re.compile(f"^{regex}$")
+
+
+class _Flight:
+    __slots__ = ("future", "followers")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.followers = 0
+
+
+class SingleFlightMiddleware(BaseHTTPMiddleware):
+    """Share one in-flight execution among identical concurrent GET requests.
+
+    The routes are fixed at construction: the routes argument if given,
+    otherwise COALESCE_ROUTES.
+    """
+
+    def __init__(self, app, routes: Optional[List[str]] = None):
+        super().__init__(app)
+        templates = routes if routes is not None else [r.strip() for r in COALESCE_ROUTES.split(",") if r.strip()]
+        self.routes = [(template, _template_pattern(template)) for template in templates]
+        self._flights: Dict[str, _Flight] = {}
+        self._generation = 0
+
+    def _match(self, path: str) -> Optional[str]:
+        for template, pattern in self.routes:
+            if pattern.match(path):
+                return template
+        return None
+
+    def _key(self, request) -> str:
+        query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+        digest = hashlib.sha256()
+        for name in KEY_HEADERS:
+            digest.update(name.encode())
+            digest.update(b"=")
+            digest.update(request.headers.get(name, "").encode())
+            digest.update(b"\n")
+        return f"{self._generation}:{request.method}:{request.url.path}?{query}#{digest.hexdigest()}"
+
+    async def dispatch(self, request, call_next):
+        if request.method not in SAFE_METHODS:
+            try:
+                return await call_next(request)
+            finally:
+                # Later reads must not join flights that may predate this write
+                self._generation += 1
+
+        template = self._match(request.url.path) if request.method == "GET" else None
+        if template is None:
+            return await call_next(request)
+
+        key = self._key(request)
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.followers += 1
+            try:
+                status_code, headers, body = await asyncio.shield(flight.future)
+            except Exception:
+                # The leader failed; run this request on its own
+                return await call_next(request)
+            REQUESTS_COALESCED.inc(template)
+            return Response(content=body, status_code=status_code, headers=headers)
+
+        flight = self._flights[key] = _Flight(asyncio.get_running_loop().create_future())
+        try:
+            response = await call_next(request)
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            # Cookies and per-request ids belong to the leader only
+            headers = {
+                k: v for k, v in response.headers.items()
+                if k.lower() not in ("set-cookie", "content-length", "x-request-id", "server-timing")
+            }
+            flight.future.set_result((response.status_code, headers, body))
+            if flight.followers:
+                logger.debug(f"Coalesced {flight.followers} request(s) into GET {request.url.path}")
+            leader_response = Response(content=body, status_code=response.status_code)
+            leader_response.raw_headers = list(response.headers.raw)
+            return leader_response
+        except BaseException as e:
+            if not flight.future.done():
+                flight.future.set_exception(e if isinstance(e, Exception) else RuntimeError("request cancelled"))
+                # Mark the exception as retrieved when nobody was waiting for it
+                flight.future.exception()
+            raise
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
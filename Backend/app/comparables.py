@@ -0,0 +1,423 @@
+"""Rent comparables and suggested rents (k nearest neighbours).
+
+Each customer schema gets an in-memory index of every property: a NumPy
+matrix of the features (bedrooms, bathrooms, area), the rents and the
+statuses. Features are standardized (z-scores) and weighted with
+COMPARABLES_WEIGHTS, so the distance between two units is
+
+    sqrt(sum(w * (z_a - z_b) ** 2) / sum(w))
+
+over the features the subject has. Comparables are let units (status
+rented or occupied) with a rent. Bedrooms and bathrooms take few values, so
+candidates are grouped by them and sorted by area; a query only scores the
+2k + 2 candidates around its area in each group, which is exact. At 100k
+properties that is well under a millisecond per property, and pricing every
+vacant unit in one call is a single batched pass. Brute force over all
+candidates is the fallback when grouping doesn't pay.
+
+The suggested rent is the inverse-distance weighted rent per unit of area of
+the comparables times the subject's area (their plain weighted rent when
+areas are missing), with the interquartile range of the same estimates as
+low/high.
+
+The index is loaded on first use. Property changes from the change feed
+mark their ids; the next query reloads just those rows. It is rebuilt from
+scratch after a change feed resync or COMPARABLES_REFRESH_SECONDS, which
+also picks up bulk loads that bypass the ORM.
+
+NumPy takes a while to import, so the properties router only imports this
+module when comparables are first requested.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Set
+
+import numpy as np
+from sqlalchemy import select
+
+from .changefeed import hub
+from .database import SessionLocal
+from .models.models import Property as PropertyModel
+from . import tenancy
+
+logger = logging.getLogger(__name__)
+
+COMPARABLES_REFRESH_SECONDS = float(os.getenv("COMPARABLES_REFRESH_SECONDS", "600"))
+COMPARABLES_WEIGHTS = os.getenv("COMPARABLES_WEIGHTS", "bedrooms=1,bathrooms=0.5,area=1")
+# Distance matrix cells computed at once when pricing in bulk
+COMPARABLES_BLOCK_CELLS = int(os.getenv("COMPARABLES_BLOCK_CELLS", "4000000"))
+
+FEATURES = ("bedrooms", "bathrooms", "area")
+OCCUPIED_STATUSES = ("rented", "occupied")
+# Full reload instead of patching when this many properties changed
+_MAX_PATCH = 5000
+
+_weights = dict.fromkeys(FEATURES, 1.0)
+for _part in COMPARABLES_WEIGHTS.split(","):
+    _name, _, _value = _part.partition("=")
+    if _name.strip() in _weights:
+        _weights[_name.strip()] = float(_value)
+WEIGHTS = np.array([_weights[f] for f in FEATURES])
+
+
+class Snapshot(NamedTuple):
+    """Immutable view of the index; queries never see a half-applied update."""
+    ids: np.ndarray            # sorted property ids
+    features: np.ndarray       # (n, 3) raw values, NaN when missing
+    scaled: np.ndarray         # (n, 3) z-scores, 0 where missing
+    rents: np.ndarray          # NaN when missing
+    statuses: np.ndarray       # object array of status strings
+    valid: np.ndarray          # False for deleted rows (until the next full load)
+    candidates: np.ndarray     # positions of let units with a rent
+    # Candidates grouped by (bedrooms, bathrooms), sorted by area within a group
+    group_keys: np.ndarray     # (g, 2) scaled bedrooms and bathrooms of each group
+    group_bounds: np.ndarray   # (g + 1,) where each group starts in the arrays below
+    by_group: np.ndarray       # candidate positions
+    by_group_area: np.ndarray  # their scaled area
+    area_keys: np.ndarray      # scaled area + group number * area_span, sorted
+    area_span: float
+    loaded_at: float
+
+    def position(self, property_id: int) -> Optional[int]:
+        pos = int(np.searchsorted(self.ids, property_id))
+        if pos < len(self.ids) and self.ids[pos] == property_id and self.valid[pos]:
+            return pos
+        return None
+
+
+def _snapshot(ids, features, rents, statuses, valid, loaded_at) -> Snapshot:
+    present = features[valid]
+    mean = np.nanmean(present, axis=0) if len(present) else np.zeros(len(FEATURES))
+    std = np.nanstd(present, axis=0) if len(present) else np.ones(len(FEATURES))
+    mean = np.nan_to_num(mean)
+    std = np.where(np.isnan(std) | (std == 0), 1.0, std)
+    scaled = np.nan_to_num((features - mean) / std)
+    occupied = np.isin(statuses, OCCUPIED_STATUSES)
+    candidates = np.flatnonzero(valid & occupied & (rents > 0))
+
+    zc = scaled[candidates]
+    group_keys, group_of = np.unique(zc[:, :-1], axis=0, return_inverse=True)
+    group_of = group_of.reshape(-1)
+    order = np.lexsort((zc[:, -1], group_of))
+    group_bounds = np.searchsorted(group_of[order], np.arange(len(group_keys) + 1))
+    area = zc[order, -1]
+    area_span = float(np.ptp(area)) + 1.0 if len(area) else 1.0
+    return Snapshot(
+        ids, features, scaled, rents, statuses, valid, candidates,
+        group_keys, group_bounds, candidates[order], area, area + group_of[order] * area_span, area_span,
+        loaded_at,
+    )
+
+
+def _rows(db, ids=None):
+    query = select(
+        PropertyModel.id, PropertyModel.bedrooms, PropertyModel.bathrooms, PropertyModel.area,
+        PropertyModel.rent_amount, PropertyModel.status,
+    )
+    if ids is not None:
+        query = query.where(PropertyModel.id.in_(ids))
+    return db.execute(query.order_by(PropertyModel.id)).all()
+
+
+def _arrays(rows):
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    features = np.array(
+        [[np.nan if v is None else float(v) for v in r[1:4]] for r in rows], dtype=np.float64,
+    ).reshape(len(rows), len(FEATURES))
+    rents = np.fromiter((np.nan if r[4] is None else float(r[4]) for r in rows), dtype=np.float64, count=len(rows))
+    statuses = np.array([(r[5] or "").lower() for r in rows], dtype=object)
+    return ids, features, rents, statuses
+
+
+class PropertyIndex:
+    """The comparables index of one customer schema."""
+
+    def __init__(self, schema: Optional[str]):
+        self.schema = schema
+        self.snapshot: Optional[Snapshot] = None
+        self.pending: Set[int] = set()
+        self.stale = True
+        self.lock = threading.Lock()
+
+    def current(self) -> Snapshot:
+        snapshot = self.snapshot
+        if snapshot is not None and not self.stale and not self.pending \
+                and time.monotonic() - snapshot.loaded_at < COMPARABLES_REFRESH_SECONDS:
+            return snapshot
+        with self.lock:
+            snapshot = self.snapshot
+            if self.stale or snapshot is None or time.monotonic() - snapshot.loaded_at >= COMPARABLES_REFRESH_SECONDS \
+                    or len(self.pending) > _MAX_PATCH:
+                self._load()
+            elif self.pending:
+                self._patch()
+            return self.snapshot
+
+    def _load(self) -> None:
+        started = time.perf_counter()
+        # Swapped rather than cleared so ids marked while loading aren't lost
+        self.stale, self.pending = False, set()
+        with tenancy.use_schema(self.schema), SessionLocal() as db:
+            rows = _rows(db)
+        ids, features, rents, statuses = _arrays(rows)
+        self.snapshot = _snapshot(ids, features, rents, statuses, np.ones(len(ids), dtype=bool), time.monotonic())
+        logger.info(
+            f"Loaded comparables index for {self.schema or 'default schema'}: {len(ids)} properties "
+            f"in {(time.perf_counter() - started) * 1000:.2f}ms"
+        )
+
+    def _patch(self) -> None:
+        changed, self.pending = sorted(self.pending), set()
+        with tenancy.use_schema(self.schema), SessionLocal() as db:
+            rows = _rows(db, changed)
+        new_ids, new_features, new_rents, new_statuses = _arrays(rows)
+        old = self.snapshot
+        ids, features, rents = old.ids.copy(), old.features.copy(), old.rents.copy()
+        statuses, valid = old.statuses.copy(), old.valid.copy()
+
+        positions = np.searchsorted(ids, new_ids)
+        known = (positions < len(ids)) & (ids[np.minimum(positions, max(len(ids) - 1, 0))] == new_ids) \
+            if len(ids) else np.zeros(len(new_ids), dtype=bool)
+        at = positions[known]
+        features[at], rents[at], statuses[at], valid[at] = new_features[known], new_rents[known], new_statuses[known], True
+
+        # Changed ids that no longer exist were deleted
+        gone = np.setdiff1d(np.array(changed, dtype=np.int64), new_ids)
+        gone_positions = np.searchsorted(ids, gone)
+        in_range = gone_positions < len(ids)
+        gone_positions = gone_positions[in_range][ids[gone_positions[in_range]] == gone[in_range]]
+        valid[gone_positions] = False
+
+        added = ~known
+        if added.any():
+            ids = np.concatenate([ids, new_ids[added]])
+            features = np.concatenate([features, new_features[added]])
+            rents = np.concatenate([rents, new_rents[added]])
+            statuses = np.concatenate([statuses, new_statuses[added]])
+            valid = np.concatenate([valid, np.ones(int(added.sum()), dtype=bool)])
+            if len(ids) > 1 and not (ids[:-1] < ids[1:]).all():
+                order = np.argsort(ids, kind="stable")
+                ids, features, rents, statuses, valid = ids[order], features[order], rents[order], statuses[order], valid[order]
+        self.snapshot = _snapshot(ids, features, rents, statuses, valid, old.loaded_at)
+
+
+_indexes: Dict[Optional[str], PropertyIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def index() -> PropertyIndex:
+    """The index of the current customer schema."""
+    schema = tenancy.current_schema()
+    idx = _indexes.get(schema)
+    if idx is None:
+        with _indexes_lock:
+            idx = _indexes.setdefault(schema, PropertyIndex(schema))
+    return idx
+
+
+def _on_changes(changes) -> None:
+    # Callbacks don't say which customer changed; ids are marked in every index
+    if changes is None:
+        for idx in list(_indexes.values()):
+            idx.stale = True
+        return
+    ids = [entity_id for entity, entity_id, _ in changes if entity == "properties"]
+    if ids:
+        for idx in list(_indexes.values()):
+            idx.pending.update(ids)
+
+
+hub.add_callback(_on_changes)
+
+
+# --- queries ----------------------------------------------------------------
+
+def _all_candidates(snap: Snapshot, subjects, z, w, k):
+    """Weighted squared distances from each subject to every candidate."""
+    cand = snap.candidates
+    # sum_f w (z_s - z_c)^2, expanded so the work is two small matrix products
+    zc = snap.scaled[cand]
+    d = (w * z ** 2).sum(axis=1, keepdims=True) + w @ (zc ** 2).T - 2 * (w * z) @ zc.T
+    slot = np.searchsorted(cand, subjects)
+    own = np.flatnonzero((slot < len(cand)) & (cand[np.minimum(slot, len(cand) - 1)] == subjects))
+    d[own, slot[own]] = np.inf
+    return cand, d
+
+
+def _grouped_candidates(snap: Snapshot, subjects, z, w, k):
+    """Weighted squared distances to the candidates that can be among the k nearest.
+
+    Within a (bedrooms, bathrooms) group only the area differs, so a subject's
+    k nearest in the group are within k + 1 places of its area in the group's
+    sorted areas. Scanning that window in every group is exact.
+    """
+    width = 2 * k + 2
+    starts, ends = snap.group_bounds[:-1], snap.group_bounds[1:]
+    groups = np.arange(len(starts))
+    # One searchsorted finds each subject's area in every group
+    pos = np.searchsorted(snap.area_keys, z[:, -1:] + groups * snap.area_span)
+    low = np.clip(pos - (k + 1), starts, np.maximum(ends - width, starts))
+    window = low[:, :, None] + np.arange(width)
+    inside = window < ends[:, None]
+    window = np.minimum(window, len(snap.by_group) - 1)
+
+    base = (w[:, None, :-1] * (z[:, None, :-1] - snap.group_keys) ** 2).sum(axis=2)
+    d = base[:, :, None] + w[:, None, None, -1] * (z[:, None, None, -1] - snap.by_group_area[window]) ** 2
+    cols = snap.by_group[window]
+    d[~inside | (cols == subjects[:, None, None])] = np.inf  # a unit is not its own comparable
+    m = len(subjects)
+    return cols.reshape(m, -1), d.reshape(m, -1)
+
+
+def _nearest(snap: Snapshot, subjects: np.ndarray, k: int):
+    """k nearest comparables of each subject position: (candidate positions, distances), both (m, k).
+
+    Rows are padded with -1 / inf when there are fewer than k comparables.
+    """
+    m = len(subjects)
+    if m == 0 or len(snap.candidates) == 0 or k <= 0:
+        return np.full((m, 0), -1, dtype=np.int64), np.empty((m, 0))
+    k = min(k, len(snap.candidates))
+
+    zs = snap.scaled[subjects]
+    # Features the subject doesn't have are left out of its distances
+    ws = np.where(np.isnan(snap.features[subjects]), 0.0, WEIGHTS)
+    total_weight = np.maximum(ws.sum(axis=1, keepdims=True), 1e-12)
+
+    # Brute force only when bedrooms/bathrooms take so many values that grouping doesn't pay
+    per_subject = len(snap.group_keys) * (2 * k + 2)
+    search = _grouped_candidates
+    if per_subject >= len(snap.candidates):
+        search, per_subject = _all_candidates, len(snap.candidates)
+
+    nearest = np.empty((m, k), dtype=np.int64)
+    distances = np.empty((m, k))
+    block = max(1, COMPARABLES_BLOCK_CELLS // per_subject)
+    for start in range(0, m, block):
+        rows = slice(start, start + block)
+        cols, d = search(snap, subjects[rows], zs[rows], ws[rows], k)
+        part = np.argpartition(d, k - 1, axis=1)[:, :k]
+        part_d = np.take_along_axis(d, part, axis=1)
+        order = np.argsort(part_d, axis=1)
+        part = np.take_along_axis(part, order, axis=1)
+        nearest[rows] = cols[part] if cols.ndim == 1 else np.take_along_axis(cols, part, axis=1)
+        distances[rows] = np.sqrt(np.maximum(np.take_along_axis(part_d, order, axis=1), 0) / total_weight[rows])
+    missing = np.isinf(distances)
+    nearest[missing] = -1
+    return nearest, distances
+
+
+def _estimate(snap: Snapshot, subjects: np.ndarray, nearest: np.ndarray, distances: np.ndarray):
+    """Suggested rent, low and high per subject (NaN without comparables)."""
+    found = nearest >= 0
+    safe = np.where(found, nearest, 0)
+    rents = np.where(found, snap.rents[safe], np.nan)
+    areas = np.where(found, snap.features[safe, 2], np.nan)
+    subject_area = snap.features[subjects, 2][:, None]
+
+    # Scale each comparable's rent to the subject's area when both areas are known
+    by_area = found & (areas > 0) & (subject_area > 0)
+    use_area = by_area.any(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scaled = np.where(by_area, rents / areas * subject_area, rents)
+        estimates = np.where(use_area, np.where(by_area, scaled, np.nan), rents)
+        weights = np.where(np.isnan(estimates), 0.0, 1.0 / (distances + 0.05))
+        total = weights.sum(axis=1)
+        suggested = np.where(total > 0, (weights * np.nan_to_num(estimates)).sum(axis=1) / total, np.nan)
+    low, high = _row_quantiles(estimates, (0.25, 0.75))
+    # The weighted suggestion can fall outside the unweighted quartiles
+    return suggested, np.fmin(low, suggested), np.fmax(high, suggested)
+
+
+def _row_quantiles(values: np.ndarray, quantiles):
+    """Linearly interpolated quantiles of each row, ignoring NaN (np.nanpercentile loops over rows)."""
+    ordered = np.sort(values, axis=1)  # NaN sorts last
+    counts = (~np.isnan(values)).sum(axis=1)
+    rows = np.arange(len(values))
+    result = []
+    for q in quantiles:
+        position = q * np.maximum(counts - 1, 0)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, np.maximum(counts - 1, 0))
+        fraction = position - below
+        with np.errstate(invalid="ignore"):
+            value = ordered[rows, below] * (1 - fraction) + ordered[rows, above] * fraction
+        result.append(np.where(counts > 0, value, np.nan))
+    return result
+
+
+def _money(value) -> Optional[str]:
+    return None if value is None or np.isnan(value) else f"{float(value):.2f}"
+
+
+def _number(value):
+    return None if np.isnan(value) else float(value)
+
+
+def _describe(snap: Snapshot, pos: int) -> dict:
+    bedrooms, bathrooms, area = snap.features[pos]
+    return {
+        "id": int(snap.ids[pos]),
+        "bedrooms": None if np.isnan(bedrooms) else int(bedrooms),
+        "bathrooms": _number(bathrooms),
+        "area": _number(area),
+        "rent_amount": _money(snap.rents[pos]),
+        "status": snap.statuses[pos] or None,
+    }
+
+
+def comparables(property_id: int, k: int) -> Optional[dict]:
+    """The k most similar let units, or None when the property doesn't exist."""
+    snap = index().current()
+    pos = snap.position(property_id)
+    if pos is None:
+        return None
+    nearest, distances = _nearest(snap, np.array([pos]), k)
+    return {
+        "property": _describe(snap, pos),
+        "comparables": [
+            dict(_describe(snap, c), distance=round(float(d), 4))
+            for c, d in zip(nearest[0], distances[0]) if c >= 0
+        ],
+        "candidates": int(len(snap.candidates)),
+    }
+
+
+def _suggestion(snap: Snapshot, pos: int, nearest_row, distance_row, suggested, low, high) -> dict:
+    found = nearest_row >= 0
+    return {
+        "property_id": int(snap.ids[pos]),
+        "current_rent": _money(snap.rents[pos]),
+        # Suggestions are rounded to whole currency units
+        "suggested_rent": _money(np.round(suggested)),
+        "low": _money(np.round(low)),
+        "high": _money(np.round(high)),
+        "comparables_used": int(found.sum()),
+        "mean_distance": round(float(distance_row[found].mean()), 4) if found.any() else None,
+        "comparable_ids": [int(snap.ids[c]) for c in nearest_row[found]],
+    }
+
+
+def suggest_rent(property_id: int, k: int) -> Optional[dict]:
+    snap = index().current()
+    pos = snap.position(property_id)
+    if pos is None:
+        return None
+    subjects = np.array([pos])
+    nearest, distances = _nearest(snap, subjects, k)
+    suggested, low, high = _estimate(snap, subjects, nearest, distances)
+    return _suggestion(snap, pos, nearest[0], distances[0], suggested[0], low[0], high[0])
+
+
+def suggest_vacant_rents(k: int) -> List[dict]:
+    """Suggested rents for every property that isn't let, in one vectorized pass."""
+    snap = index().current()
+    subjects = np.flatnonzero(snap.valid & ~np.isin(snap.statuses, OCCUPIED_STATUSES))
+    nearest, distances = _nearest(snap, subjects, k)
+    suggested, low, high = _estimate(snap, subjects, nearest, distances)
+    return [
+        _suggestion(snap, int(pos), nearest[i], distances[i], suggested[i], low[i], high[i])
+        for i, pos in enumerate(subjects)
+    ]
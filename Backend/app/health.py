@@ -0,0 +1,208 @@
+"""Cached dependency health for liveness/readiness probes.
+
+Probes must be cheap and must never wait on the database from the event loop.
+A background task runs every registered check on a dedicated single-thread
+executor every HEALTH_CHECK_INTERVAL seconds and stores the result; the probe
+endpoints only read that cached state.
+
+The database check uses its own one-connection engine, so probes neither take
+connections from the request pool nor queue behind requests waiting for one.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import create_engine, text
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "3"))
+HEALTH_SLOW_LATENCY_MS = float(os.getenv("HEALTH_SLOW_LATENCY_MS", "1000"))
+
+
+class CheckResult:
+    """Last known state of one dependency."""
+
+    __slots__ = ("status", "latency_ms", "checked_at", "error")
+
+    def __init__(self, status="unknown", latency_ms=None, checked_at=None, error=None):
+        self.status = status
+        self.latency_ms = latency_ms
+        self.checked_at = checked_at
+        self.error = error
+
+    @property
+    def age(self) -> Optional[float]:
+        return None if self.checked_at is None else time.time() - self.checked_at
+
+    def is_fresh(self) -> bool:
+        age = self.age
+        return age is not None and age <= 3 * HEALTH_CHECK_INTERVAL + HEALTH_CHECK_TIMEOUT
+
+    def as_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "latency_ms": None if self.latency_ms is None else round(self.latency_ms, 2),
+            "checked_at": None if self.checked_at is None else datetime.fromtimestamp(self.checked_at).isoformat(),
+            "error": self.error,
+        }
+
+
+class HealthMonitor:
+    """Runs blocking dependency checks off the event loop and caches their results."""
+
+    def __init__(self):
+        self._checks: Dict[str, Callable[[], None]] = {}
+        self._results: Dict[str, CheckResult] = {}
+        self._pending: Dict[str, object] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_check(self, name: str, check: Callable[[], None]) -> None:
+        """Register a blocking callable that raises when the dependency is unhealthy."""
+        self._checks[name] = check
+        self._results.setdefault(name, CheckResult())
+
+    def result(self, name: str) -> CheckResult:
+        return self._results.get(name, CheckResult())
+
+    def results(self) -> Dict[str, CheckResult]:
+        return dict(self._results)
+
+    def is_ready(self, names=None) -> bool:
+        names = list(self._checks) if names is None else names
+        return all(
+            self.result(name).status == "up" and self.result(name).is_fresh()
+            for name in names
+        )
+
+    def _run_check(self, name: str) -> float:
+        start = time.perf_counter()
+        self._checks[name]()
+        return (time.perf_counter() - start) * 1000
+
+    async def run_checks(self) -> None:
+        loop = asyncio.get_running_loop()
+        for name in list(self._checks):
+            pending = self._pending.get(name)
+            if pending is not None and not pending.done():
+                # The previous attempt is still stuck; don't pile up more work
+                self._results[name] = CheckResult("down", None, time.time(), "check timed out")
+                continue
+            future = loop.run_in_executor(self._executor, self._run_check, name)
+            self._pending[name] = future
+            try:
+                latency = await asyncio.wait_for(asyncio.shield(future), HEALTH_CHECK_TIMEOUT)
+            except asyncio.TimeoutError:
+                self._results[name] = CheckResult("down", None, time.time(), "check timed out")
+                logger.warning(f"Health check '{name}' timed out after {HEALTH_CHECK_TIMEOUT}s")
+                continue
+            except Exception as e:
+                previous = self._results.get(name)
+                if previous is None or previous.status != "down":
+                    logger.error(f"Health check '{name}' failed: {str(e)}")
+                self._results[name] = CheckResult("down", None, time.time(), str(e))
+                continue
+            if latency > HEALTH_SLOW_LATENCY_MS:
+                logger.warning(f"High latency for '{name}': {latency:.2f}ms")
+            self._results[name] = CheckResult("up", latency, time.time())
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_checks()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Health monitor iteration failed")
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="health-check")
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+def _probe_engine(url: str, connect_args: Optional[dict] = None):
+    probe_engine = create_engine(
+        url,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=HEALTH_CHECK_TIMEOUT,
+        pool_recycle=1800,
+        pool_pre_ping=False,  # the check itself is the ping
+        connect_args=connect_args or {},
+    )
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=lambda: probe_engine.dispose(close=False))
+    return probe_engine
+
+
+def database_check(url: str, connect_args: Optional[dict] = None) -> Callable[[], None]:
+    """Build a check that runs SELECT 1 over its own single-connection pool."""
+    probe_engine = _probe_engine(url, connect_args)
+
+    def check() -> None:
+        try:
+            with probe_engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception:
+            # Drop a possibly broken connection so the next check reconnects
+            probe_engine.dispose()
+            raise
+
+    check.engine = probe_engine
+    return check
+
+
+# Seconds since the last replayed transaction, or 0 when everything received is replayed
+# (an idle primary commits nothing, so the replay timestamp alone would look like lag)
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def replica_check(url: str, max_lag_seconds: float, connect_args: Optional[dict] = None) -> Callable[[], None]:
+    """Build a check that fails when a PostgreSQL replica is unreachable or lags too far.
+
+    The last measured lag is kept in check.lag_seconds.
+    """
+    probe_engine = _probe_engine(url, connect_args)
+
+    def check() -> None:
+        try:
+            with probe_engine.connect() as connection:
+                lag = connection.execute(_REPLICA_LAG_SQL).scalar()
+        except Exception:
+            probe_engine.dispose()
+            raise
+        # NULL when the server is not in recovery (e.g. pointed at the primary)
+        check.lag_seconds = float(lag or 0)
+        if check.lag_seconds > max_lag_seconds:
+            raise RuntimeError(f"replica is {check.lag_seconds:.1f}s behind (limit {max_lag_seconds:.0f}s)")
+
+    check.engine = probe_engine
+    check.lag_seconds = None
+    return check
+
+
+monitor = HealthMonitor()
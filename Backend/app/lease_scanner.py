@@ -0,0 +1,188 @@
+"""Periodic lease expiry and renewal scan.
+
+Two passes over active leases, both served by the (status, end_date) index
+and walked in keyset order on (end_date, id), LEASE_SCAN_CHUNK rows at a time
+with a commit per chunk, so a scan never holds a long transaction or an
+OFFSET that grows with the table:
+
+* leases ending within LEASE_RENEWAL_WINDOW_DAYS get a renewal task
+  (INSERT ... ON CONFLICT DO NOTHING, so rescans are idempotent);
+* leases whose end date has passed are moved to status "expired" with one
+  UPDATE per chunk, and the change feed is told about them.
+
+The scan runs every LEASE_SCAN_INTERVAL seconds on each worker; on PostgreSQL
+an advisory lock makes sure only one of them does the work. In multi-tenant
+mode it covers every customer schema in turn.
+"""
+import asyncio
+import calendar
+import logging
+import os
+import time
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import select, update, func, tuple_
+from sqlalchemy.orm import Session
+
+from . import changefeed, tenancy
+from .database import engine, SessionLocal, dialect_insert
+from .models.models import Lease as LeaseModel, RenewalTask as RenewalTaskModel
+
+logger = logging.getLogger(__name__)
+
+LEASE_SCAN_ENABLED = os.getenv("LEASE_SCAN_ENABLED", "True").lower() == "true"
+LEASE_SCAN_INTERVAL = float(os.getenv("LEASE_SCAN_INTERVAL", "3600"))
+LEASE_SCAN_CHUNK = int(os.getenv("LEASE_SCAN_CHUNK", "1000"))
+LEASE_RENEWAL_WINDOW_DAYS = int(os.getenv("LEASE_RENEWAL_WINDOW_DAYS", "60"))
+LEASE_TERM_MONTHS = int(os.getenv("LEASE_TERM_MONTHS", "12"))
+
+ACTIVE_STATUS = "active"
+EXPIRED_STATUS = "expired"
+# Arbitrary constant identifying the scanner's advisory lock
+_ADVISORY_LOCK_KEY = 640_040
+
+
+def add_months(start: date, months: int) -> date:
+    """Same day-of-month `months` later, clamped to the end of shorter months."""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def default_end_date(start: date) -> date:
+    """End date for a new lease with the default term (the day before the anniversary)."""
+    return add_months(start, LEASE_TERM_MONTHS) - timedelta(days=1)
+
+
+def _active_chunks(db: Session, first_end: Optional[date], last_end: date):
+    """Yield lists of (id, end_date, tenant_id, property_id) for active leases in keyset order."""
+    cursor = None
+    while True:
+        stmt = (
+            select(LeaseModel.id, LeaseModel.end_date, LeaseModel.tenant_id, LeaseModel.property_id)
+            .where(LeaseModel.status == ACTIVE_STATUS, LeaseModel.end_date <= last_end)
+            .order_by(LeaseModel.end_date, LeaseModel.id)
+            .limit(LEASE_SCAN_CHUNK)
+        )
+        if first_end is not None:
+            stmt = stmt.where(LeaseModel.end_date >= first_end)
+        if cursor is not None:
+            stmt = stmt.where(tuple_(LeaseModel.end_date, LeaseModel.id) > tuple_(*cursor))
+        rows = db.execute(stmt).all()
+        if not rows:
+            return
+        yield rows
+        cursor = (rows[-1].end_date, rows[-1].id)
+
+
+def create_renewal_tasks(db: Session, today: date) -> int:
+    """Create renewal tasks for active leases ending within the window."""
+    insert = dialect_insert(db)
+    created = 0
+    for rows in _active_chunks(db, today, today + timedelta(days=LEASE_RENEWAL_WINDOW_DAYS)):
+        result = db.execute(
+            insert(RenewalTaskModel)
+            .values([
+                {"lease_id": r.id, "tenant_id": r.tenant_id, "property_id": r.property_id,
+                 "lease_end_date": r.end_date, "status": "open"}
+                for r in rows
+            ])
+            .on_conflict_do_nothing(index_elements=["lease_id", "lease_end_date"])
+        )
+        created += max(result.rowcount, 0)
+        db.commit()
+    return created
+
+
+def expire_leases(db: Session, today: date) -> int:
+    """Mark active leases whose end date has passed as expired."""
+    expired = 0
+    # Expired rows drop out of the active set, but the keyset cursor still moves forward
+    for rows in _active_chunks(db, None, today - timedelta(days=1)):
+        # Only the rows still active when the UPDATE runs: a lease renewed meanwhile is left alone
+        ids = db.execute(
+            update(LeaseModel)
+            .where(LeaseModel.id.in_([r.id for r in rows]), LeaseModel.status == ACTIVE_STATUS)
+            .values(status=EXPIRED_STATUS, updated_at=func.now())
+            .returning(LeaseModel.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        changefeed.record_changes(db, "leases", ids, "update")
+        db.commit()
+        expired += len(ids)
+    return expired
+
+
+def _try_lock(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return bool(db.execute(select(func.pg_try_advisory_lock(_ADVISORY_LOCK_KEY))).scalar())
+
+
+def _unlock(db: Session) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_unlock(_ADVISORY_LOCK_KEY)))
+        db.commit()
+
+
+def run_scan(today: Optional[date] = None) -> Dict:
+    """Run both passes once (blocking); returns what was done."""
+    today = today or date.today()
+    started = time.perf_counter()
+    # Pin one connection: the advisory lock belongs to it and outlives the per-chunk commits
+    with engine.connect() as connection, SessionLocal(bind=connection) as db:
+        if not _try_lock(db):
+            db.rollback()
+            logger.info("Lease scan skipped: another worker holds the scan lock")
+            return {"skipped": True}
+        try:
+            created = expired = 0
+            for schema in tenancy.all_schemas():
+                # End the current transaction: the next one begins on this customer's schema
+                db.commit()
+                with tenancy.use_schema(schema):
+                    created += create_renewal_tasks(db, today)
+                    expired += expire_leases(db, today)
+        finally:
+            db.rollback()
+            _unlock(db)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"Lease scan: {created} renewal tasks created, {expired} leases expired in {elapsed_ms:.2f}ms",
+        extra={"event": "lease_scan", "renewal_tasks": created, "expired": expired, "duration_ms": round(elapsed_ms, 2)}
+    )
+    return {"skipped": False, "renewal_tasks_created": created, "leases_expired": expired,
+            "duration_ms": round(elapsed_ms, 2)}
+
+
+async def _loop() -> None:
+    while True:
+        try:
+            await asyncio.to_thread(run_scan)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Lease scan failed")
+        await asyncio.sleep(LEASE_SCAN_INTERVAL)
+
+
+_task: Optional[asyncio.Task] = None
+
+
+def start() -> None:
+    global _task
+    if LEASE_SCAN_ENABLED and _task is None:
+        _task = asyncio.get_running_loop().create_task(_loop())
+
+
+async def stop() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
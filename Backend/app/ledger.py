@@ -0,0 +1,251 @@
+"""Tenant ledger: postings, running balances and accounts-receivable aging.
+
+Charges (rent, fees) increase what a tenant owes and payments/credits reduce
+it; other transaction types (property income and expenses) do not touch
+tenant balances. Every posting upserts tenant_balances and lease_balances in
+the same database transaction as the ledger row, so a balance is a primary
+key lookup instead of a SUM over the tenant's history.
+
+AR aging allocates payments to the oldest charges first (FIFO) and buckets
+what remains by age. It is one set-based query: a running total of charges
+per tenant (window function over the (tenant_id, date) index) is compared
+with the tenant's total payments. Only tenants who owed at least min_balance
+on the report date are examined: for today that is the stored balance, for an
+earlier date the balance is summed from the ledger up to that date.
+"""
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import select, func, case, literal, and_
+from sqlalchemy.orm import Session
+
+from .database import dialect_insert
+from .models.models import (
+    Transaction as TransactionModel,
+    TenantBalance as TenantBalanceModel,
+    LeaseBalance as LeaseBalanceModel,
+    Lease as LeaseModel,
+    Tenant as TenantModel,
+    Property as PropertyModel,
+)
+
+logger = logging.getLogger(__name__)
+
+CHARGE_TYPES = ("charge", "rent", "fee", "late_fee", "deposit")
+PAYMENT_TYPES = ("payment", "credit", "refund_applied", "writeoff")
+# Postings that move no money: charges record what is owed, credits and
+# write-offs forgive it
+NON_CASH_TYPES = CHARGE_TYPES + ("credit", "writeoff")
+
+# Upper age (days) of each bucket; older amounts fall into the last one
+AGING_BUCKETS = (("current", 30), ("days_31_60", 60), ("days_61_90", 90))
+AGING_OVERDUE_BUCKET = "days_90_plus"
+
+
+class LedgerError(ValueError):
+    """A posting that cannot be applied (unknown tenant or lease, mismatched tenant...)."""
+
+
+def balance_delta(tx_type: Optional[str], amount) -> Decimal:
+    """How much a transaction changes the amount the tenant owes."""
+    kind = (tx_type or "").lower()
+    amount = Decimal(amount or 0)
+    if kind in CHARGE_TYPES:
+        return amount
+    if kind in PAYMENT_TYPES:
+        return -amount
+    return Decimal(0)
+
+
+def _apply_delta(db: Session, tenant_id: Optional[int], lease_id: Optional[int], delta: Decimal) -> None:
+    if not delta:
+        return
+    insert = dialect_insert(db)
+    if tenant_id is not None:
+        stmt = insert(TenantBalanceModel).values(tenant_id=tenant_id, balance=delta)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[TenantBalanceModel.tenant_id],
+            set_={"balance": TenantBalanceModel.balance + stmt.excluded.balance, "updated_at": func.now()},
+        ))
+    if lease_id is not None:
+        stmt = insert(LeaseBalanceModel).values(lease_id=lease_id, tenant_id=tenant_id, balance=delta)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[LeaseBalanceModel.lease_id],
+            set_={"balance": LeaseBalanceModel.balance + stmt.excluded.balance, "updated_at": func.now()},
+        ))
+
+
+def post_transaction(db: Session, **fields) -> TransactionModel:
+    """Add a ledger row and update the affected balances; the caller commits.
+
+    tenant_id and property_id default to the lease's when lease_id is given.
+    """
+    lease_id = fields.get("lease_id")
+    if lease_id is not None:
+        lease = db.get(LeaseModel, lease_id)
+        if lease is None:
+            raise LedgerError(f"Lease {lease_id} not found")
+        if fields.get("tenant_id") is None:
+            fields["tenant_id"] = lease.tenant_id
+        elif fields["tenant_id"] != lease.tenant_id:
+            raise LedgerError(f"Lease {lease_id} does not belong to tenant {fields['tenant_id']}")
+        if fields.get("property_id") is None:
+            fields["property_id"] = lease.property_id
+    # Checked here: a foreign key violation would only surface at flush as a database error
+    if fields.get("tenant_id") is not None and db.get(TenantModel, fields["tenant_id"]) is None:
+        raise LedgerError(f"Tenant {fields['tenant_id']} not found")
+    if fields.get("property_id") is not None and db.get(PropertyModel, fields["property_id"]) is None:
+        raise LedgerError(f"Property {fields['property_id']} not found")
+    if fields.get("date") is None:
+        fields["date"] = date.today()
+
+    tx = TransactionModel(**fields)
+    db.add(tx)
+    db.flush()
+    _apply_delta(db, tx.tenant_id, tx.lease_id, balance_delta(tx.type, tx.amount))
+    return tx
+
+
+def get_balances(db: Session, tenant_id: int) -> Dict:
+    tenant_balance = db.get(TenantBalanceModel, tenant_id)
+    leases = db.query(LeaseBalanceModel).filter(LeaseBalanceModel.tenant_id == tenant_id).all()
+    return {
+        "tenant_id": tenant_id,
+        "balance": str(tenant_balance.balance if tenant_balance else Decimal("0.00")),
+        "updated_at": tenant_balance.updated_at.isoformat() if tenant_balance and tenant_balance.updated_at else None,
+        "leases": [
+            {"lease_id": lb.lease_id, "balance": str(lb.balance)}
+            for lb in sorted(leases, key=lambda lb: lb.lease_id)
+        ],
+    }
+
+
+def signed_amount():
+    """SQL expression for balance_delta() of a transactions row."""
+    return case(
+        (func.lower(TransactionModel.type).in_(CHARGE_TYPES), TransactionModel.amount),
+        (func.lower(TransactionModel.type).in_(PAYMENT_TYPES), -TransactionModel.amount),
+        else_=0,
+    )
+
+
+def rebuild_balances(db: Session) -> None:
+    """Recompute every stored balance from the ledger (repair/backfill); the caller commits."""
+    signed = signed_amount()
+    db.query(LeaseBalanceModel).delete(synchronize_session=False)
+    db.query(TenantBalanceModel).delete(synchronize_session=False)
+    db.execute(TenantBalanceModel.__table__.insert().from_select(
+        ["tenant_id", "balance"],
+        select(TransactionModel.tenant_id, func.sum(signed))
+        .where(TransactionModel.tenant_id.isnot(None))
+        .group_by(TransactionModel.tenant_id),
+    ))
+    db.execute(LeaseBalanceModel.__table__.insert().from_select(
+        ["lease_id", "tenant_id", "balance"],
+        select(TransactionModel.lease_id, func.max(TransactionModel.tenant_id), func.sum(signed))
+        .where(TransactionModel.lease_id.isnot(None))
+        .group_by(TransactionModel.lease_id),
+    ))
+
+
+def aging_statement(as_of: date, min_balance: Decimal = Decimal("0.01"), limit: Optional[int] = None):
+    """Build the AR aging query: one row per tenant owing at least min_balance."""
+    tx = TransactionModel
+    kind = func.lower(tx.type)
+
+    if as_of == date.today():
+        # Only tenants whose maintained balance says they owe something
+        owing = (
+            select(TenantBalanceModel.tenant_id)
+            .where(TenantBalanceModel.balance >= min_balance)
+            .cte("owing")
+        )
+    else:
+        # The stored balance is today's; a tenant who has paid since as_of still
+        # belongs in a historical report
+        owing = (
+            select(tx.tenant_id)
+            .where(tx.tenant_id.isnot(None), tx.date <= as_of)
+            .group_by(tx.tenant_id)
+            .having(func.sum(signed_amount()) >= min_balance)
+            .cte("owing")
+        )
+    payments = (
+        select(tx.tenant_id, func.sum(tx.amount).label("paid"))
+        .join(owing, owing.c.tenant_id == tx.tenant_id)
+        .where(kind.in_(PAYMENT_TYPES), tx.date <= as_of)
+        .group_by(tx.tenant_id)
+        .cte("payments")
+    )
+    charges = (
+        select(
+            tx.tenant_id,
+            tx.date,
+            tx.amount,
+            func.sum(tx.amount).over(
+                partition_by=tx.tenant_id, order_by=(tx.date, tx.id)
+            ).label("cumulative"),
+        )
+        .join(owing, owing.c.tenant_id == tx.tenant_id)
+        .where(kind.in_(CHARGE_TYPES), tx.date <= as_of)
+        .cte("charges")
+    )
+
+    # FIFO: payments cover the oldest charges, so a charge is open for whatever
+    # part of the running total exceeds everything paid so far
+    paid = func.coalesce(payments.c.paid, 0)
+    uncovered = charges.c.cumulative - paid
+    outstanding = case(
+        (uncovered <= 0, literal(0)),
+        (uncovered >= charges.c.amount, charges.c.amount),
+        else_=uncovered,
+    )
+
+    columns = []
+    newer_than = None
+    for name, max_days in AGING_BUCKETS:
+        cutoff = as_of - timedelta(days=max_days)
+        condition = charges.c.date >= cutoff if newer_than is None else and_(charges.c.date >= cutoff, charges.c.date < newer_than)
+        columns.append(func.coalesce(func.sum(outstanding).filter(condition), 0).label(name))
+        newer_than = cutoff
+    columns.append(func.coalesce(func.sum(outstanding).filter(charges.c.date < newer_than), 0).label(AGING_OVERDUE_BUCKET))
+
+    total = func.sum(outstanding).label("total")
+    stmt = (
+        select(
+            charges.c.tenant_id, *columns, total,
+            func.min(charges.c.date).filter(outstanding > 0).label("oldest_charge"),
+        )
+        .select_from(charges.outerjoin(payments, payments.c.tenant_id == charges.c.tenant_id))
+        .group_by(charges.c.tenant_id)
+        .having(func.sum(outstanding) >= min_balance)
+        .order_by(total.desc(), charges.c.tenant_id)
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def aging_report(db: Session, as_of: Optional[date] = None, min_balance: Decimal = Decimal("0.01"),
+                 limit: Optional[int] = None) -> Dict:
+    as_of = as_of or date.today()
+    rows = db.execute(aging_statement(as_of, min_balance, limit)).mappings().all()
+    cents = Decimal("0.01")
+    bucket_names = [name for name, _ in AGING_BUCKETS] + [AGING_OVERDUE_BUCKET]
+    totals = {name: Decimal("0.00") for name in bucket_names + ["total"]}
+    tenants = []
+    for row in rows:
+        entry = {"tenant_id": row["tenant_id"]}
+        for name in bucket_names + ["total"]:
+            value = Decimal(str(row[name] or 0)).quantize(cents)
+            totals[name] += value
+            entry[name] = str(value)
+        entry["oldest_charge"] = row["oldest_charge"].isoformat() if row["oldest_charge"] else None
+        tenants.append(entry)
+    return {
+        "as_of": as_of.isoformat(),
+        "tenants": tenants,
+        "totals": {name: str(value) for name, value in totals.items()},
+    }
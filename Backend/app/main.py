@@ -1,32 +1,68 @@
+import time
+
+# Measured from here so the startup log can report how long importing the app took
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from .database import engine, Base, get_db
+from fastapi.responses import JSONResponse, PlainTextResponse
+from .database import (
+    engine, Base, SessionLocal, get_db, DATABASE_URL, DB_WARMUP, IS_SQLITE, warm_pool,
+    init_embedded_db, optimize_embedded_db,
+)
+from . import metrics, query_stats
+from .logging_config import setup_logging, new_request_id, should_log_request
 from sqlalchemy import text
 from sqlalchemy.orm import Session
+import asyncio
 import logging
-import time
 import os
 import threading
-from tenacity import retry, stop_after_attempt, wait_exponential
 from datetime import datetime
+from . import health, changefeed, lease_scanner, auth, replicas, tenancy, profiling, named_statements, search_index
+from .admission import AdmissionControlMiddleware, configure_threadpool
+from .coalescing import SingleFlightMiddleware
 
 # Import routers
+from .routers import auth as auth_router
 from .routers import properties as properties_router
 from .routers import tenants as tenants_router
+from .routers import sync as sync_router
+from .routers import changes as changes_router
+from .routers import dashboard as dashboard_router
+from .routers import ledger as ledger_router
+from .routers import reconciliation as reconciliation_router
+from .routers import statements as statements_router
+from .routers import leases as leases_router
+from .routers import profiles as profiles_router
+from .routers import search as search_router
 from .schemas.responses import HealthCheck, APIError, Metrics
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (records are written by a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Track API start time for uptime calculation
 START_TIME = time.time()
-REQUEST_COUNT = 0
-LAST_REQUEST_TIME = time.time()
+
+# Startup is expected to finish within this budget; overruns are logged
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+# Database status for probes is refreshed in the background (see health.py)
+health.monitor.add_check("database", health.database_check(
+    DATABASE_URL,
+    {"check_same_thread": False, "timeout": health.HEALTH_CHECK_TIMEOUT} if IS_SQLITE else
+    {"connect_timeout": int(health.HEALTH_CHECK_TIMEOUT), "application_name": "property_manager_health"}
+))
+# Replica health and lag decide which replicas serve reads (see replicas.py)
+replicas.register_checks()
+
+# Committed writes are announced to change feed subscribers (see changefeed.py)
+changefeed.install(SessionLocal)
+# Multi-tenant mode: sessions run against the request's customer schema (see tenancy.py)
+tenancy.install(SessionLocal)
+# Compiled-cache hit rates of the prebuilt hot-path statements (see named_statements.py)
+named_statements.instrument_engine(engine)
 
 # Global OpenAPI metadata and tag descriptions
 app = FastAPI(
@@ -44,8 +80,18 @@ app = FastAPI(
     servers=[{"url": "http://localhost:8000", "description": "Local development server"}],
     openapi_tags=[
         {"name": "System", "description": "Health, metrics and system-level endpoints."},
+        {"name": "Auth", "description": "Logins, access tokens and users."},
         {"name": "Properties", "description": "Manage properties: create, read, update, delete, and list."},
         {"name": "Tenants", "description": "Manage tenants and related operations."},
+        {"name": "Sync", "description": "Incremental sync of everything changed since a token."},
+        {"name": "Changes", "description": "Push notifications of row changes over SSE or WebSocket."},
+        {"name": "Dashboard", "description": "Portfolio aggregates for the manager portal."},
+        {"name": "Ledger", "description": "Tenant charges and payments, balances and AR aging."},
+        {"name": "Reconciliation", "description": "Match bank statements against the ledger."},
+        {"name": "Statements", "description": "Batch generation of tenant statements."},
+        {"name": "Leases", "description": "Lease renewals and expiry."},
+        {"name": "Profiling", "description": "Stored per-request profiles and flame graphs."},
+        {"name": "Search", "description": "Typeahead suggestions across properties and tenants."},
     ],
 )
 
@@ -54,13 +100,44 @@ app = FastAPI(
 async def shutdown_event():
     """Gracefully shutdown the application by disposing resources."""
     logger.info("Shutting down application...")
+    warmup = getattr(app.state, "db_warmup", None)
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    await health.monitor.stop()
+    changefeed.stop()
+    await lease_scanner.stop()
+    await search_index.stop()
+    auth.shutdown()
+    metrics.stop_exporter()
     try:
+        if IS_SQLITE:
+            optimize_embedded_db()
         # dispose() is synchronous for SQLAlchemy engines; use .dispose()
         engine.dispose()
+        replicas.dispose()
         logger.info("Database connections closed")
     except Exception:
         logger.exception("Error while disposing engine during shutdown")
 
+# Innermost, so a profile covers the handler and not the admission queue (see profiling.py)
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Shed load before it reaches the connection pool. Middleware added first runs
+# innermost: CORS headers still apply to 503s and rejected requests are logged.
+app.add_middleware(AdmissionControlMiddleware)
+
+# Identical concurrent GETs share one execution; followers never take an admission slot
+app.add_middleware(SingleFlightMiddleware)
+
+# After a write, the client reads from the primary for a few seconds
+if replicas.replicas:
+    app.add_middleware(replicas.ReadYourWritesMiddleware)
+
+# Resolve the customer before anything touches the database
+if tenancy.MULTI_TENANT:
+    app.add_middleware(tenancy.CustomerMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -80,48 +157,86 @@ app.add_middleware(
 # Add logging middleware
 @app.middleware("http")
 async def log_requests(request, call_next):
-    global REQUEST_COUNT, LAST_REQUEST_TIME
-    REQUEST_COUNT += 1
-    LAST_REQUEST_TIME = time.time()
-    
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = (time.time() - start_time) * 1000
-    
-    logger.info(
-        f"Method: {request.method} Path: {request.url.path} "
-        f"Status: {response.status_code} Duration: {process_time:.2f}ms"
-    )
-    
+    start_time = time.perf_counter()
+    status_code = 500
+    request_id = new_request_id(request.headers.get("X-Request-ID"))
+    stats = query_stats.begin_request(request.scope)
+    metrics.HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec()
+        duration = time.perf_counter() - start_time
+        route = metrics.route_label(request)
+        metrics.HTTP_REQUESTS.inc(request.method, route, str(status_code))
+        metrics.HTTP_LATENCY.observe(duration, request.method, route)
+        if stats.query_count:
+            metrics.DB_QUERIES.inc(request.method, route, amount=stats.query_count)
+            metrics.DB_REQUEST_TIME.observe(stats.db_time, request.method, route)
+            query_stats.report_repeated_statements(stats, request.method)
+    process_time = duration * 1000
+    response.headers.append("Server-Timing", query_stats.server_timing(stats, duration))
+    response.headers["X-Request-ID"] = request_id
+
+    if should_log_request(response.status_code, process_time):
+        logger.info(
+            f"Method: {request.method} Path: {request.url.path} "
+            f"Status: {response.status_code} Duration: {process_time:.2f}ms "
+            f"Queries: {stats.query_count} DB: {stats.db_time_ms:.2f}ms",
+            extra={
+                "event": "request",
+                "method": request.method,
+                "path": request.url.path,
+                "route": route,
+                "status": response.status_code,
+                "duration_ms": round(process_time, 2),
+                "db_queries": stats.query_count,
+                "db_ms": round(stats.db_time_ms, 2),
+            }
+        )
+
     return response
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize application state and verify database connection"""
-    from tenacity import retry, stop_after_attempt, wait_exponential
+    """Start background services without blocking on the database.
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
+    Connection warm-up runs in a worker thread; requests that arrive before it
+    finishes simply open their own connections. The embedded SQLite database is
+    the exception: it is created or migrated first, which only touches a local file.
+    """
+    startup_started = time.perf_counter()
+    configure_threadpool()
+    if IS_SQLITE:
+        # Embedded mode: the tables must exist before the first request
+        await asyncio.to_thread(init_embedded_db)
+    metrics.start_exporter()
+    health.monitor.start()
+    changefeed.start(engine)
+    lease_scanner.start()
+    search_index.start()
+    if DB_WARMUP:
+        app.state.db_warmup = asyncio.get_running_loop().create_task(_warm_up_database())
+
+    import_ms = (startup_started - _IMPORT_STARTED) * 1000
+    startup_ms = (time.perf_counter() - _IMPORT_STARTED) * 1000
+    logger.info(
+        f"Application started in {startup_ms:.2f}ms (import {import_ms:.2f}ms)",
+        extra={"event": "startup", "import_ms": round(import_ms, 2), "startup_ms": round(startup_ms, 2)}
     )
-    def check_db_connection():
-        try:
-            # Test the database connection
-            with engine.connect() as connection:
-                connection.execute(text("SELECT 1"))
-                connection.commit()
-            logger.info("Database connection successful")
-            return True
-        except Exception as e:
-            logger.error(f"Database connection failed: {str(e)}")
-            raise
+    if startup_ms > STARTUP_BUDGET_MS:
+        logger.warning(f"Startup took {startup_ms:.2f}ms, over the {STARTUP_BUDGET_MS:.0f}ms budget")
 
-    try:
-        check_db_connection()
-    except Exception as e:
-        # Log error but allow the server to start
-        logger.error(f"All database connection attempts failed: {str(e)}")
-        # We'll handle individual request failures in the database session
+
+async def _warm_up_database():
+    started = time.perf_counter()
+    opened = await asyncio.to_thread(warm_pool)
+    if opened:
+        logger.info(f"Database pool warmed with {opened} connections in {(time.perf_counter() - started) * 1000:.2f}ms")
+    else:
+        # Log error but keep serving; individual requests report database errors
+        logger.error("Database warm-up failed; connections will be opened on demand")
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -131,7 +246,7 @@ async def http_exception_handler(request, exc):
         content=APIError(
             error=exc.detail,
             path=request.url.path
-        ).dict()
+        ).model_dump(mode="json")
     )
 
 @app.exception_handler(Exception)
@@ -144,12 +259,24 @@ async def general_exception_handler(request, exc):
             error="Internal server error",
             detail=str(exc),
             path=request.url.path
-        ).dict()
+        ).model_dump(mode="json")
     )
 
 # Include routers
-app.include_router(properties_router.router)
-app.include_router(tenants_router.router)
+# Data routers accept a bearer token; AUTH_REQUIRED makes it mandatory (see auth.py)
+protected = [Depends(auth.authenticate)]
+app.include_router(auth_router.router)
+app.include_router(properties_router.router, dependencies=protected)
+app.include_router(tenants_router.router, dependencies=protected)
+app.include_router(sync_router.router, dependencies=protected)
+app.include_router(changes_router.router, dependencies=protected)
+app.include_router(dashboard_router.router, dependencies=protected)
+app.include_router(ledger_router.router, dependencies=protected)
+app.include_router(reconciliation_router.router, dependencies=protected)
+app.include_router(statements_router.router, dependencies=protected)
+app.include_router(leases_router.router, dependencies=protected)
+app.include_router(profiles_router.router, dependencies=protected)
+app.include_router(search_router.router, dependencies=protected)
 
 @app.get("/", 
          summary="API Root",
@@ -186,34 +313,64 @@ async def root():
              503: {"model": APIError, "description": "Service unavailable - Database connection failed"}
          },
          tags=["System"])
-async def health_check(db: Session = Depends(get_db)):
-    """Check API and database health status"""
-    try:
-        # Use retry for database check
-        @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=2))
-        def check_db():
-            start = time.time()
-            db.execute(text("SELECT 1"))
-            return (time.time() - start) * 1000
-
-        db_latency = check_db()
-        
-        if db_latency > 1000:  # Alert if DB latency > 1 second
-            logger.warning(f"High database latency: {db_latency:.2f}ms")
-
-        return HealthCheck(
-            status="healthy",
-            version="1.0.0",
-            database=f"connected (latency: {db_latency:.2f}ms)",
-            timestamp=datetime.now()
-        )
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
+async def health_check():
+    """Check API and database health status (served from the cached background check)"""
+    db_health = health.monitor.result("database")
+    if db_health.status != "up" or not db_health.is_fresh():
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Service unhealthy: {str(e)}"
+            detail=f"Service unhealthy: database {db_health.status}"
+                   + (f" ({db_health.error})" if db_health.error else "")
         )
 
+    return HealthCheck(
+        status="healthy",
+        version="1.0.0",
+        database=f"connected (latency: {db_health.latency_ms:.2f}ms)",
+        timestamp=datetime.now()
+    )
+
+@app.get("/health/live",
+         summary="Liveness Probe",
+         description="""
+         Returns 200 while the worker process is able to serve requests.
+
+         Never touches the database, so it stays cheap and cannot be stalled
+         by a slow dependency. Use it for liveness/restart decisions.
+         """,
+         response_model=dict,
+         tags=["System"])
+async def liveness():
+    """Report that the process is alive"""
+    return {"status": "alive", "uptime": time.time() - START_TIME}
+
+@app.get("/health/ready",
+         summary="Readiness Probe",
+         description="""
+         Returns 200 when the most recent background dependency check succeeded
+         and is recent, 503 otherwise.
+
+         The checks run every HEALTH_CHECK_INTERVAL seconds on a dedicated thread
+         with their own database connection; this endpoint only reads the cached
+         result. Use it for load balancer routing decisions.
+         """,
+         response_model=dict,
+         responses={
+             503: {"description": "A dependency is down or has not been checked recently"}
+         },
+         tags=["System"])
+async def readiness():
+    """Report whether the worker should receive traffic"""
+    # Replicas are optional: reads fall back to the primary without them
+    ready = health.monitor.is_ready(["database"])
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "checks": {name: result.as_dict() for name, result in health.monitor.results().items()},
+        }
+    )
+
 @app.get("/metrics",
          summary="API Performance Metrics",
          description="""
@@ -221,9 +378,9 @@ async def health_check(db: Session = Depends(get_db)):
          
          Returns:
          - uptime: seconds since server start
-         - database_latency_ms: current database query latency
+         - database_latency_ms: latency of the last background database check (-1 if unknown)
          - active_connections: number of active database connections
-         - requests_per_minute: current request rate
+         - requests_per_minute: requests served by this worker in the last minute
          - status: detailed system metrics including:
            * process_id: current process ID
            * thread_count: active threads
@@ -238,25 +395,21 @@ async def health_check(db: Session = Depends(get_db)):
          responses={
              500: {"model": APIError, "description": "Internal server error"}
          })
-async def get_metrics(db: Session = Depends(get_db)):
+async def get_metrics():
     """Get API performance metrics"""
     try:
-        # Test database latency with retry
-        @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=2))
-        def check_db_latency():
-            start_time = time.time()
-            db.execute(text("SELECT 1"))
-            return (time.time() - start_time) * 1000
-
+        db_health = health.monitor.result("database")
         return Metrics(
             uptime=time.time() - START_TIME,
-            database_latency_ms=check_db_latency(),
-            active_connections=len(engine.pool.checkedin()) + len(engine.pool.checkedout()),
-            requests_per_minute=REQUEST_COUNT,
+            database_latency_ms=db_health.latency_ms if db_health.latency_ms is not None else -1,
+            active_connections=engine.pool.checkedin() + engine.pool.checkedout(),
+            requests_per_minute=metrics.requests_per_minute(),
             status={
                 "process_id": os.getpid(),
                 "thread_count": threading.active_count(),
-                "pool_size": engine.pool.size()
+                "pool_size": engine.pool.size(),
+                "database": db_health.status,
+                "statement_cache": named_statements.summary()
             }
         )
     except Exception as e:
@@ -266,14 +419,42 @@ async def get_metrics(db: Session = Depends(get_db)):
             detail=str(e)
         )
 
+@app.get("/metrics/prometheus",
+         summary="Prometheus Metrics",
+         description="""
+         Metrics in the Prometheus text exposition format.
+
+         Includes:
+         - pm_http_requests_total: request counts by method, route and status
+         - pm_http_request_duration_seconds: latency histogram by method and route,
+           with p50/p95/p99 over a rolling window in *_window
+         - pm_http_requests_in_flight: requests currently being served
+         - pm_db_pool_checkout_wait_seconds: time spent waiting for a pooled connection
+         - pm_db_pool_connections: pool connections by state
+         - pm_db_statement_executions_total, pm_db_compiled_cache_total: statement cache hits and misses
+
+         When METRICS_MULTIPROC_DIR is set the values are aggregated across all worker processes.
+         """,
+         response_class=PlainTextResponse,
+         tags=["System"])
+def get_prometheus_metrics():
+    """Export metrics for Prometheus scraping"""
+    return PlainTextResponse(
+        metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 @app.get("/debug/db",
          include_in_schema=False,
          description="Debug database connection (development only)")
-async def debug_db(db: Session = Depends(get_db)):
+def debug_db(db: Session = Depends(get_db)):
     """Debug database connection (development only)"""
     try:
         result = db.execute(text("SELECT version()")).scalar()
         return {"db_version": result}
     except Exception as e:
         logger.error(f"Database debug failed: {str(e)}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+# Last, once every route is registered
+profiling.instrument_routes(app)
@@ -0,0 +1,465 @@
+"""Request and database pool metrics with Prometheus text exposition.
+
+Metrics are kept in a process-local registry guarded by a lock, so handlers
+running in the threadpool and middleware running on the event loop can update
+them safely. Histograms use fixed buckets both for their lifetime totals and
+for a ring of short time slots, which gives p50/p95/p99 over a rolling window
+that can be summed across processes.
+
+When METRICS_MULTIPROC_DIR is set, every worker periodically writes a JSON
+snapshot of its registry to that directory and the exposition endpoint merges
+all snapshots, so a scrape of any worker reports totals for the whole server.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+METRICS_WINDOW_SECONDS = int(os.getenv("METRICS_WINDOW_SECONDS", "300"))
+METRICS_SLOT_SECONDS = int(os.getenv("METRICS_SLOT_SECONDS", "10"))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    for n, v in (extra or {}).items():
+        pairs.append(f'{n}="{_escape(v)}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def bucket_quantile(q: float, buckets: Sequence[float], counts: Sequence[int]) -> Optional[float]:
+    """Estimate a quantile from per-bucket counts (same interpolation as histogram_quantile)."""
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = q * total
+    cumulative = 0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count > 0:
+            lower = buckets[i - 1] if i > 0 else 0.0
+            # The overflow bucket has no upper bound; report its lower edge
+            if i >= len(buckets):
+                return lower
+            upper = buckets[i]
+            return lower + (upper - lower) * ((rank - cumulative) / count)
+        cumulative += count
+    return buckets[-1]
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock: threading.Lock = threading.Lock()
+
+    def _key(self, labelvalues: Sequence[str]) -> Tuple[str, ...]:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+        return tuple(str(v) for v in labelvalues)
+
+
+class Counter(_Metric):
+    """Monotonic counter; values from every process are summed."""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"series": [[list(k), v] for k, v in self._values.items()]}
+
+
+class Gauge(_Metric):
+    """Point-in-time value; values from live processes are combined with `aggregate` (sum, min or max)."""
+    type_name = "gauge"
+    AGGREGATES = {"sum": lambda a, b: a + b, "min": min, "max": max}
+
+    def __init__(self, name, documentation, labelnames=(), aggregate: str = "sum"):
+        super().__init__(name, documentation, labelnames)
+        if aggregate not in self.AGGREGATES:
+            raise ValueError(f"{name}: unknown gauge aggregate {aggregate!r}")
+        self.aggregate = aggregate
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labelvalues), 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"series": [[list(k), v] for k, v in self._values.items()]}
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram with lifetime totals and a rolling window of time slots."""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: [bucket counts (non-cumulative, + overflow), sum, count]
+        self._totals: Dict[Tuple[str, ...], list] = {}
+        # Per series: {slot start epoch: bucket counts}
+        self._slots: Dict[Tuple[str, ...], Dict[int, List[int]]] = {}
+
+    def _bucket_index(self, value: float) -> int:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                return i
+        return len(self.buckets)
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        key = self._key(labelvalues)
+        index = self._bucket_index(value)
+        slot = int(time.time()) // METRICS_SLOT_SECONDS * METRICS_SLOT_SECONDS
+        with self._lock:
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            totals[0][index] += 1
+            totals[1] += value
+            totals[2] += 1
+
+            slots = self._slots.setdefault(key, {})
+            counts = slots.get(slot)
+            if counts is None:
+                counts = slots[slot] = [0] * (len(self.buckets) + 1)
+                # Drop slots that have fallen out of the window
+                horizon = slot - METRICS_WINDOW_SECONDS
+                for old in [s for s in slots if s <= horizon]:
+                    del slots[old]
+            counts[index] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "series": [[list(k), [list(t[0]), t[1], t[2]]] for k, t in self._totals.items()],
+                "slots": [[list(k), {str(s): list(c) for s, c in v.items()}] for k, v in self._slots.items()],
+            }
+
+
+class Registry:
+    """Holds metric families and merges snapshots from one or more processes."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), aggregate="sum") -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, aggregate))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges right before a snapshot is taken."""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+        return {
+            "pid": os.getpid(),
+            "written_at": time.time(),
+            "metrics": {name: dict(m.snapshot(), type=m.type_name) for name, m in self._metrics.items()},
+        }
+
+    def merge(self, snapshots: Iterable[dict]) -> Dict[str, dict]:
+        """Combine snapshots: counters and histograms always sum, gauges only from live writers."""
+        merged: Dict[str, dict] = {}
+        stale_before = time.time() - 3 * METRICS_FLUSH_INTERVAL
+        horizon = time.time() - METRICS_WINDOW_SECONDS
+        for snap in snapshots:
+            live = snap.get("written_at", 0) >= stale_before
+            for name, data in snap.get("metrics", {}).items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                target = merged.setdefault(name, {"series": {}, "slots": {}})
+                if isinstance(metric, Histogram):
+                    for labels, (counts, total, count) in data.get("series", []):
+                        key = tuple(labels)
+                        cur = target["series"].setdefault(key, [[0] * (len(metric.buckets) + 1), 0.0, 0])
+                        cur[0] = [a + b for a, b in zip(cur[0], counts)]
+                        cur[1] += total
+                        cur[2] += count
+                    for labels, slots in data.get("slots", []):
+                        window = target["slots"].setdefault(tuple(labels), [0] * (len(metric.buckets) + 1))
+                        for slot, counts in slots.items():
+                            if int(slot) > horizon:
+                                for i, c in enumerate(counts):
+                                    window[i] += c
+                elif isinstance(metric, Gauge):
+                    if not live:
+                        continue
+                    combine = Gauge.AGGREGATES[metric.aggregate]
+                    for labels, value in data.get("series", []):
+                        key = tuple(labels)
+                        target["series"][key] = combine(target["series"][key], value) if key in target["series"] else value
+                else:
+                    for labels, value in data.get("series", []):
+                        key = tuple(labels)
+                        target["series"][key] = target["series"].get(key, 0) + value
+        return merged
+
+    def render(self, merged: Dict[str, dict]) -> str:
+        """Render merged metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            data = merged.get(name, {"series": {}, "slots": {}})
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            if isinstance(metric, Histogram):
+                for key, (counts, total, count) in sorted(data["series"].items()):
+                    cumulative = 0
+                    for bound, c in zip(list(metric.buckets) + [math.inf], counts):
+                        cumulative += c
+                        labels = _format_labels(metric.labelnames, key, {"le": _format_value(bound)})
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    labels = _format_labels(metric.labelnames, key)
+                    lines.append(f"{name}_sum{labels} {_format_value(total)}")
+                    lines.append(f"{name}_count{labels} {count}")
+                window_name = f"{name}_window"
+                lines.append(f"# HELP {window_name} {metric.documentation.rstrip('.')} (quantiles over the last {METRICS_WINDOW_SECONDS}s)")
+                lines.append(f"# TYPE {window_name} gauge")
+                for key, counts in sorted(data["slots"].items()):
+                    for q in QUANTILES:
+                        value = bucket_quantile(q, metric.buckets, counts)
+                        if value is None:
+                            continue
+                        labels = _format_labels(metric.labelnames, key, {"quantile": str(q)})
+                        lines.append(f"{window_name}{labels} {_format_value(value)}")
+            else:
+                for key, value in sorted(data["series"].items()):
+                    lines.append(f"{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    # ------------------------------------------------------------------
+    # Multi-process support
+    # ------------------------------------------------------------------
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(METRICS_MULTIPROC_DIR, f"metrics_{pid}.json")
+
+    def flush(self) -> None:
+        """Write this process' snapshot for the other workers to merge."""
+        if not METRICS_MULTIPROC_DIR:
+            return
+        snap = self.snapshot()
+        path = self._snapshot_path(snap["pid"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snap, f)
+        os.replace(tmp_path, path)
+
+    def collect(self) -> Dict[str, dict]:
+        """Merged view of this process or, in multi-process mode, of every worker."""
+        if not METRICS_MULTIPROC_DIR:
+            return self.merge([self.snapshot()])
+        self.flush()
+        snapshots = []
+        for entry in os.scandir(METRICS_MULTIPROC_DIR):
+            if not (entry.name.startswith("metrics_") and entry.name.endswith(".json")):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # A worker may be replacing its file right now; skip it this scrape
+                continue
+        return self.merge(snapshots)
+
+
+def archive_process(pid: int, directory: str = METRICS_MULTIPROC_DIR) -> None:
+    """Fold an exited worker's counters and histograms into the archive snapshot.
+
+    Called by the process manager when a worker exits, so recycled workers
+    don't leave files behind and merged totals never go backwards.
+    """
+    path = os.path.join(directory, f"metrics_{pid}.json")
+    archive_path = os.path.join(directory, "metrics_archive.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            dead = json.load(f)
+    except (OSError, ValueError):
+        return
+    try:
+        with open(archive_path, encoding="utf-8") as f:
+            archive = json.load(f)
+    except (OSError, ValueError):
+        archive = {"pid": "archive", "written_at": 0, "metrics": {}}
+
+    for name, data in dead.get("metrics", {}).items():
+        kind = data.get("type")
+        if kind not in ("counter", "histogram"):
+            continue
+        target = archive["metrics"].setdefault(name, {"type": kind, "series": []})
+        series = {tuple(labels): value for labels, value in target["series"]}
+        for labels, value in data.get("series", []):
+            key = tuple(labels)
+            if kind == "counter":
+                series[key] = series.get(key, 0) + value
+            else:
+                cur = series.get(key)
+                if cur is None:
+                    series[key] = value
+                else:
+                    series[key] = [[a + b for a, b in zip(cur[0], value[0])], cur[1] + value[1], cur[2] + value[2]]
+        target["series"] = [[list(k), v] for k, v in series.items()]
+
+    tmp_path = f"{archive_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(archive, f)
+    os.replace(tmp_path, archive_path)
+    os.remove(path)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "pm_http_requests_total", "HTTP requests by method, route and status code.",
+    ("method", "route", "status"),
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "pm_http_request_duration_seconds", "HTTP request latency in seconds.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "pm_http_requests_in_flight", "HTTP requests currently being served.",
+)
+DB_QUERIES = REGISTRY.counter(
+    "pm_db_queries_total", "SQL statements executed, by the route that ran them.",
+    ("method", "route"),
+)
+DB_REQUEST_TIME = REGISTRY.histogram(
+    "pm_db_request_time_seconds", "Total time a request spent waiting on SQL statements.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    "pm_db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the database pool.",
+    (), POOL_WAIT_BUCKETS,
+)
+DB_POOL_CONNECTIONS = REGISTRY.gauge(
+    "pm_db_pool_connections", "Database pool connections by state.", ("state",),
+)
+PROCESS_START_TIME = REGISTRY.gauge(
+    "pm_process_start_time_seconds", "Start time of the oldest live worker process since the unix epoch.",
+    aggregate="min",
+)
+PROCESS_START_TIME.set(time.time())
+
+
+def route_label(request) -> str:
+    """Return the route template (e.g. /properties/{property_id}) to keep label cardinality bounded."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def requests_per_minute() -> float:
+    """Request rate over the last minute of the rolling window, for this process."""
+    with HTTP_LATENCY._lock:
+        horizon = time.time() - 60
+        total = sum(
+            sum(counts)
+            for slots in HTTP_LATENCY._slots.values()
+            for slot, counts in slots.items()
+            if slot > horizon
+        )
+    return float(total)
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render(REGISTRY.collect())
+
+
+_flush_thread: Optional[threading.Thread] = None
+_flush_stop = threading.Event()
+
+
+def _flush_loop() -> None:
+    while not _flush_stop.wait(METRICS_FLUSH_INTERVAL):
+        try:
+            REGISTRY.flush()
+        except Exception as e:
+            logger.warning(f"Failed to write metrics snapshot: {str(e)}")
+
+
+def start_exporter() -> None:
+    """Start the background snapshot writer when running with several workers."""
+    global _flush_thread
+    if not METRICS_MULTIPROC_DIR or _flush_thread is not None:
+        return
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    _flush_stop.clear()
+    _flush_thread = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+    _flush_thread.start()
+
+
+def stop_exporter() -> None:
+    global _flush_thread
+    if _flush_thread is None:
+        return
+    _flush_stop.set()
+    _flush_thread.join(timeout=METRICS_FLUSH_INTERVAL)
+    _flush_thread = None
+    try:
+        REGISTRY.flush()
+    except Exception as e:
+        logger.warning(f"Failed to write final metrics snapshot: {str(e)}")
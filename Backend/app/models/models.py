@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, Text, Numeric
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, ForeignKey, Text, Numeric, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -16,6 +16,7 @@ class Property(Base):
     amenities = Column(Text, nullable=True)
     notes = Column(Text, nullable=True)  # Added notes column
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     # Relationships
     tenants = relationship("Lease", back_populates="property")
@@ -33,6 +34,7 @@ class Tenant(Base):
     phone = Column(String(20))
     status = Column(String(50))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     # Relationships
     leases = relationship("Lease", back_populates="tenant")
@@ -51,11 +53,15 @@ class Lease(Base):
     rent_amount = Column(Numeric(10, 2))
     status = Column(String(50))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     # Relationships
     property = relationship("Property", back_populates="tenants")
     tenant = relationship("Tenant", back_populates="leases")
 
+    # The lease scanner walks active leases in end_date order
+    __table_args__ = (Index("ix_leases_status_end_date", "status", "end_date"),)
+
 class MaintenanceRequest(Base):
     __tablename__ = "maintenance_requests"
     
@@ -66,6 +72,7 @@ class MaintenanceRequest(Base):
     status = Column(String(50))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     # Relationships
     property = relationship("Property", back_populates="maintenance_requests")
@@ -77,16 +84,21 @@ class Transaction(Base):
     id = Column(Integer, primary_key=True, index=True)
     property_id = Column(Integer, ForeignKey("properties.id"))
     tenant_id = Column(Integer, ForeignKey("tenants.id"))
+    lease_id = Column(Integer, ForeignKey("leases.id"), nullable=True)
     type = Column(String(50))
     amount = Column(Numeric(10, 2))
     description = Column(Text)
     date = Column(Date)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     # Relationships
     property = relationship("Property", back_populates="transactions")
     tenant = relationship("Tenant", back_populates="transactions")
 
+    # Per-tenant ledger scans (balances, AR aging) read in date order
+    __table_args__ = (Index("ix_transactions_tenant_id_date", "tenant_id", "date"),)
+
 class File(Base):
     __tablename__ = "files"
     
@@ -97,7 +109,92 @@ class File(Base):
     file_path = Column(Text)
     file_type = Column(String(50))
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+    statement_job_id = Column(Integer, ForeignKey("statement_jobs.id"), nullable=True, index=True)
 
     # Relationships
     property = relationship("Property", back_populates="files")
-    tenant = relationship("Tenant", back_populates="files")
\ No newline at end of file
+    tenant = relationship("Tenant", back_populates="files")
+
+class Tombstone(Base):
+    """Record of a hard delete, so /sync can tell clients what to drop."""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(50), nullable=False)  # sync collection name, e.g. "properties"
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_tombstones_deleted_at_entity", "deleted_at", "entity"),)
+
+
+class TenantBalance(Base):
+    """Running amount owed by a tenant, maintained by app.ledger on every posting."""
+    __tablename__ = "tenant_balances"
+
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), primary_key=True)
+    balance = Column(Numeric(12, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class LeaseBalance(Base):
+    """Running amount owed on a lease, maintained by app.ledger on every posting."""
+    __tablename__ = "lease_balances"
+
+    lease_id = Column(Integer, ForeignKey("leases.id"), primary_key=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), index=True)
+    balance = Column(Numeric(12, 2), nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class StatementJob(Base):
+    """A batch run of tenant statements for one billing period."""
+    __tablename__ = "statement_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    period_start = Column(Date, nullable=False)
+    period_end = Column(Date, nullable=False)
+    status = Column(String(30), nullable=False, default="pending")  # pending, running, completed, completed_with_errors, failed
+    file_format = Column(String(10), nullable=False, default="html")
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    output_dir = Column(Text)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+
+class RenewalTask(Base):
+    """Follow-up for a lease approaching its end date, created by the lease scanner."""
+    __tablename__ = "renewal_tasks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    lease_id = Column(Integer, ForeignKey("leases.id"), nullable=False)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"))
+    property_id = Column(Integer, ForeignKey("properties.id"))
+    lease_end_date = Column(Date, nullable=False)
+    status = Column(String(20), nullable=False, default="open")  # open, renewed, declined, dismissed
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # One task per lease term, so rescans are idempotent
+    __table_args__ = (
+        UniqueConstraint("lease_id", "lease_end_date", name="uq_renewal_tasks_lease_end"),
+        Index("ix_renewal_tasks_status_end_date", "status", "lease_end_date"),
+    )
+
+
+class User(Base):
+    """A login for the API. Tenant users are linked to their tenant record."""
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String(255), unique=True, nullable=False)
+    hashed_password = Column(String(255), nullable=False)
+    full_name = Column(String(200))
+    role = Column(String(20), nullable=False, default="manager")  # admin, manager, tenant
+    tenant_id = Column(Integer, ForeignKey("tenants.id"))
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
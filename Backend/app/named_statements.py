@@ -0,0 +1,244 @@
+"""Named, prebuilt statements for the hot query paths.
+
+Routers used to build their lookups per request (db.query(Model).filter(...),
+query.count()), paying for statement construction and the SQL compiled-cache
+key traversal every time. The statements below are built once at import with
+bind parameters for every value; executing one reuses the same object, so
+SQLAlchemy finds its memoized cache key and compiled SQL straight away.
+
+With PREPARED_STATEMENTS (PostgreSQL only) each statement is also PREPAREd
+on the server the first time a pooled connection runs it, and later runs
+send EXECUTE, so PostgreSQL skips parsing and planning. Prepared statements
+live as long as the connection; leave the setting off behind a pooler in
+transaction mode (PgBouncer), where consecutive transactions may use
+different server connections. In embedded (SQLite) mode the driver keeps
+its own per-connection statement cache.
+
+Instrumentation (see /metrics/prometheus and the statement_cache entry of
+/metrics): executions per statement by compiled-cache outcome, the Python
+time from execute() to the driver call for hits and misses, and the cost
+saved per execution, i.e. building the statement and its cache key, which
+the per-request queries paid every time. pm_db_compiled_cache_total shows
+the compiled-cache hit rate over all statements.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import Integer, bindparam, event, func, or_, select, text
+from sqlalchemy.dialects.postgresql import psycopg2 as pg_psycopg2
+from sqlalchemy.engine import Result
+from sqlalchemy.engine.interfaces import CacheStats
+from sqlalchemy.orm import Session
+
+from . import metrics
+from .database import IS_SQLITE
+from .models.models import Property as PropertyModel, Tenant as TenantModel
+
+PREPARED_STATEMENTS = os.getenv("PREPARED_STATEMENTS", "False").lower() == "true" and not IS_SQLITE
+
+STATEMENT_EXECUTIONS = metrics.REGISTRY.counter(
+    "pm_db_statement_executions_total",
+    "Named statement executions by compiled-cache outcome (hit, miss, prepared).",
+    ("statement", "cache"),
+)
+STATEMENT_OVERHEAD = metrics.REGISTRY.counter(
+    "pm_db_statement_overhead_seconds_total",
+    "Python time from execute() to the driver call for named statements (cache lookup or compilation).",
+    ("statement", "cache"),
+)
+STATEMENT_BUILD = metrics.REGISTRY.gauge(
+    "pm_db_statement_build_seconds",
+    "Time to build a named statement and its cache key from scratch, saved on every execution.",
+    ("statement",),
+)
+COMPILED_CACHE = metrics.REGISTRY.counter(
+    "pm_db_compiled_cache_total", "Statement executions by SQLAlchemy compiled-cache outcome.", ("result",),
+)
+
+_CACHE_LABELS = {CacheStats.CACHE_HIT: "hit", CacheStats.CACHE_MISS: "miss"}
+_BUILD_SAMPLES = 20
+
+# Only used to render PREPARE statements with $1-style parameters
+_dollar_dialect = pg_psycopg2.dialect(paramstyle="numeric_dollar")
+
+_local = threading.local()
+
+STATEMENTS: Dict[str, "NamedStatement"] = {}
+
+
+class NamedStatement:
+    """A statement built once and executed by name with bind parameter values."""
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self.statement = factory().execution_options(pm_statement=name)
+        description = self.statement.column_descriptions[0]
+        # Loads whole rows of one mapped class (as opposed to scalars such as counts)
+        self.entity = description["entity"] if description["expr"] is description["entity"] else None
+        self.build_seconds: Optional[float] = None
+        self._prepared: Dict[tuple, tuple] = {}
+
+    def execute(self, db: Session, **params) -> Result:
+        if PREPARED_STATEMENTS:
+            return self._execute_prepared(db, params)
+        db.connection()  # checkout and BEGIN are not part of the statement's overhead
+        _local.started = time.perf_counter()
+        return db.execute(self.statement, params)
+
+    def measure_build(self) -> float:
+        if self.build_seconds is None:
+            started = time.perf_counter()
+            for _ in range(_BUILD_SAMPLES):
+                # What a per-request query pays before its compiled-cache lookup
+                self.factory()._generate_cache_key()
+            self.build_seconds = (time.perf_counter() - started) / _BUILD_SAMPLES
+        return self.build_seconds
+
+    def _execute_prepared(self, db: Session, params: dict) -> Result:
+        connection = db.connection()
+        translate_map = connection.get_execution_options().get("schema_translate_map") or {}
+        key = tuple(sorted(translate_map.items(), key=str))
+        prepared = self._prepared.get(key)
+        if prepared is None:
+            compiled = self.statement.compile(
+                dialect=_dollar_dialect, schema_translate_map=translate_map or None, render_schema_translate=True,
+            )
+            sql = str(compiled)
+            server_name = f"pm_{self.name}_{hashlib.sha1(sql.encode()).hexdigest()[:10]}"
+            names = list(compiled.positiontup or ())
+            defaults = {name: compiled.binds[name].effective_value for name in names}
+            call = text(f"EXECUTE {server_name}({', '.join(f':p{i}' for i in range(len(names)))})")
+            if self.entity is not None:
+                call = select(self.entity).from_statement(call)
+            call = call.execution_options(pm_statement=self.name, pm_prepared=True)
+            prepared = self._prepared[key] = (server_name, sql, names, defaults, call)
+        server_name, sql, names, defaults, call = prepared
+
+        on_connection = connection.connection.info.setdefault("pm_prepared", set())
+        if server_name not in on_connection:
+            connection.exec_driver_sql(f"PREPARE {server_name} AS {sql}")
+            on_connection.add(server_name)
+        values = {f"p{i}": params.get(name, defaults[name]) for i, name in enumerate(names)}
+        _local.started = time.perf_counter()
+        return db.execute(call, values)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+    cache = _CACHE_LABELS.get(context.cache_hit, "uncached")
+    COMPILED_CACHE.inc(cache)
+    name = context.execution_options.get("pm_statement")
+    if name is None:
+        return
+    if context.execution_options.get("pm_prepared"):
+        cache = "prepared"
+    started = getattr(_local, "started", None)
+    STATEMENT_EXECUTIONS.inc(name, cache)
+    if started is not None:
+        STATEMENT_OVERHEAD.inc(name, cache, amount=time.perf_counter() - started)
+        _local.started = None
+
+
+def instrument_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _collect_build_times() -> None:
+    for statement in STATEMENTS.values():
+        STATEMENT_BUILD.set(statement.measure_build(), statement.name)
+
+
+metrics.REGISTRY.add_collector(_collect_build_times)
+
+
+def summary() -> Dict[str, dict]:
+    """Per statement: executions, compiled-cache hit rate and the estimated cost saved per execution."""
+    executions = {tuple(k): v for k, v in STATEMENT_EXECUTIONS.snapshot()["series"]}
+    overhead = {tuple(k): v for k, v in STATEMENT_OVERHEAD.snapshot()["series"]}
+    report = {}
+    for name, statement in STATEMENTS.items():
+        counts = {cache: executions.get((name, cache), 0) for cache in ("hit", "miss", "prepared")}
+        total = sum(counts.values())
+        if not total:
+            continue
+        mean = {
+            cache: overhead.get((name, cache), 0) / counts[cache] if counts[cache] else None
+            for cache in ("hit", "miss")
+        }
+        saved = statement.measure_build()
+        report[name] = {
+            "executions": total,
+            "prepared": counts["prepared"],
+            "cache_hit_rate": round(counts["hit"] / (counts["hit"] + counts["miss"]), 4)
+            if counts["hit"] + counts["miss"] else None,
+            "hit_overhead_us": round(mean["hit"] * 1e6, 1) if mean["hit"] is not None else None,
+            "miss_overhead_us": round(mean["miss"] * 1e6, 1) if mean["miss"] is not None else None,
+            "saved_per_execution_us": round(saved * 1e6, 1),
+        }
+    return report
+
+
+# --- statements -------------------------------------------------------------
+
+def register(name: str, factory) -> NamedStatement:
+    statement = STATEMENTS[name] = NamedStatement(name, factory)
+    return statement
+
+
+def _page(statement):
+    return statement.offset(bindparam("skip", type_=Integer)).limit(bindparam("limit", type_=Integer))
+
+
+def _tenant_filters(statement, by_status: bool, by_search: bool):
+    if by_status:
+        statement = statement.where(TenantModel.status == bindparam("status"))
+    if by_search:
+        pattern = bindparam("pattern")
+        statement = statement.where(or_(
+            TenantModel.first_name.ilike(pattern),
+            TenantModel.last_name.ilike(pattern),
+            TenantModel.email.ilike(pattern),
+        ))
+    return statement
+
+
+PROPERTY_BY_ID = register(
+    "property_by_id", lambda: select(PropertyModel).where(PropertyModel.id == bindparam("id"))
+)
+TENANT_BY_ID = register(
+    "tenant_by_id", lambda: select(TenantModel).where(TenantModel.id == bindparam("id"))
+)
+
+# Keyed by whether the status filter is applied
+PROPERTY_PAGES = {
+    False: register("properties_page", lambda: _page(select(PropertyModel))),
+    True: register("properties_page_by_status", lambda: _page(
+        select(PropertyModel).where(PropertyModel.status == bindparam("status"))
+    )),
+}
+PROPERTY_COUNTS = {
+    False: register("properties_count", lambda: select(func.count()).select_from(PropertyModel)),
+    True: register("properties_count_by_status", lambda: select(func.count()).select_from(PropertyModel).where(
+        PropertyModel.status == bindparam("status")
+    )),
+}
+
+# Keyed by (status filter, search filter)
+TENANT_PAGES = {}
+TENANT_COUNTS = {}
+for _by_status in (False, True):
+    for _by_search in (False, True):
+        _suffix = "".join(s for s, on in (("_by_status", _by_status), ("_search", _by_search)) if on)
+        TENANT_PAGES[_by_status, _by_search] = register(
+            f"tenants_page{_suffix}",
+            lambda s=_by_status, q=_by_search: _page(_tenant_filters(select(TenantModel), s, q)),
+        )
+        TENANT_COUNTS[_by_status, _by_search] = register(
+            f"tenants_count{_suffix}",
+            lambda s=_by_status, q=_by_search: _tenant_filters(select(func.count()).select_from(TenantModel), s, q),
+        )
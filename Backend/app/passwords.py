@@ -0,0 +1,22 @@
+"""bcrypt hashing, run inside the auth process pool.
+
+Only depends on bcrypt so spawned workers import this module, not the web
+application. A hash costs about 100ms of CPU at the default work factor,
+which is why app.auth never calls these functions on a request thread.
+"""
+import bcrypt
+
+# bcrypt only looks at the first 72 bytes of a password
+MAX_PASSWORD_BYTES = 72
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8")[:MAX_PASSWORD_BYTES], bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode("utf-8")[:MAX_PASSWORD_BYTES], hashed.encode("ascii"))
+    except ValueError:
+        # Malformed stored hash
+        return False
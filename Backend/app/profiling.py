@@ -0,0 +1,353 @@
+"""On-demand request profiling.
+
+A request is profiled when it carries the X-Profile header and is allowed to
+(the header value equals PROFILE_TOKEN, or the bearer token is an admin's),
+or when it is picked at random with probability PROFILE_SAMPLE_RATE.
+
+While at least one request is being profiled, a sampler thread records the
+Python stack of the threads running those requests' endpoint functions every
+PROFILE_INTERVAL_MS: the threadpool worker for a sync handler, the event loop
+thread (minus idle samples) for an async one. Finished profiles are written
+to PROFILE_STORAGE_DIR together with the route, status, duration and the
+request's SQL statements and their total time, and the response carries an
+X-Profile-Id header. /profiles (admin only) lists them and serves each one as
+speedscope JSON, which https://www.speedscope.app opens as a flame graph.
+
+When nothing is being profiled the cost is a header lookup per request and a
+context variable read per endpoint call; the sampler thread sleeps.
+PROFILING_ENABLED=False removes even that.
+"""
+import asyncio
+import functools
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from . import auth, query_stats
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "True").lower() == "true"
+PROFILE_HEADER = b"x-profile"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "200"))
+PROFILE_STORAGE_DIR = os.getenv("PROFILE_STORAGE_DIR", os.path.join("storage", "profiles"))
+# Never picked by PROFILE_SAMPLE_RATE
+PROFILE_EXEMPT_PATHS = ("/profiles", "/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+MAX_STACK_DEPTH = 128
+PROFILE_ID_RE = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+
+class Profile:
+    """Stack samples for one request, in speedscope's "sampled" layout."""
+
+    def __init__(self, method: str, path: str, trigger: str):
+        now = datetime.now(timezone.utc)
+        self.id = f"{now:%Y%m%dT%H%M%S}-{secrets.token_hex(4)}"
+        self.created_at = now
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started = time.perf_counter()
+        self.threads: Dict[int, int] = {}  # thread id -> nesting depth
+        self.frames: List[dict] = []
+        self._frame_index: Dict[tuple, int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+
+    @contextmanager
+    def attach(self):
+        """Sample the calling thread until the block exits."""
+        tid = threading.get_ident()
+        self.threads[tid] = self.threads.get(tid, 0) + 1
+        try:
+            yield
+        finally:
+            if self.threads[tid] > 1:
+                self.threads[tid] -= 1
+            else:
+                del self.threads[tid]
+
+    def sample(self, frames, weight_ms: float, now: float) -> None:
+        if now - self.started > PROFILE_MAX_SECONDS:
+            return
+        for tid in tuple(self.threads):
+            frame = frames.get(tid)
+            # An event loop waiting in its selector is idle, not working for this request
+            if frame is None or frame.f_code.co_filename.endswith("selectors.py"):
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                index = self._frame_index.get(key)
+                if index is None:
+                    index = self._frame_index[key] = len(self.frames)
+                    self.frames.append({
+                        "name": getattr(code, "co_qualname", code.co_name),
+                        "file": code.co_filename,
+                        "line": code.co_firstlineno,
+                    })
+                stack.append(index)
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(round(weight_ms, 3))
+
+    def speedscope(self) -> dict:
+        name = f"{self.method} {self.path}"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "property-management-api",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(self.weights), 3),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+_current: ContextVar[Optional[Profile]] = ContextVar("request_profile", default=None)
+
+
+# --- sampler ----------------------------------------------------------------
+
+_active: Dict[str, Profile] = {}
+_active_lock = threading.Lock()
+_wake = threading.Event()
+_sampler: Optional[threading.Thread] = None
+
+
+def _sample_loop() -> None:
+    interval = PROFILE_INTERVAL_MS / 1000
+    last = None
+    while True:
+        _wake.wait()
+        time.sleep(interval)
+        now = time.perf_counter()
+        weight = interval if last is None else now - last
+        last = now
+        with _active_lock:
+            profiles = list(_active.values())
+            if not profiles:
+                _wake.clear()
+                last = None
+                continue
+        frames = sys._current_frames()
+        for profile in profiles:
+            profile.sample(frames, weight * 1000, now)
+        del frames
+
+
+def _start(profile: Profile) -> None:
+    global _sampler
+    with _active_lock:
+        _active[profile.id] = profile
+        if _sampler is None or not _sampler.is_alive():
+            _sampler = threading.Thread(target=_sample_loop, name="request-profiler", daemon=True)
+            _sampler.start()
+        _wake.set()
+
+
+def _finish(profile: Profile) -> None:
+    with _active_lock:
+        _active.pop(profile.id, None)
+
+
+def instrument_routes(app) -> None:
+    """Let the sampler follow each endpoint function onto the thread that runs it."""
+    if not PROFILING_ENABLED:
+        return
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            route.dependant.call = _profiled(route.dependant.call)
+
+
+def _profiled(call):
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def profiled_async(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return await call(*args, **kwargs)
+            with profile.attach():
+                return await call(*args, **kwargs)
+        return profiled_async
+
+    @functools.wraps(call)
+    def profiled(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        with profile.attach():
+            return call(*args, **kwargs)
+    return profiled
+
+
+# --- triggering -------------------------------------------------------------
+
+def _header_allowed(value: str, authorization: str) -> bool:
+    if PROFILE_TOKEN and hmac.compare_digest(value.encode(), PROFILE_TOKEN.encode()):
+        return True
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return auth.verify_token(token.strip()).role == "admin"
+    except HTTPException:
+        return False
+
+
+def _trigger(scope) -> Optional[str]:
+    header = authorization = None
+    for key, value in scope["headers"]:
+        if key == PROFILE_HEADER:
+            header = value.decode("latin-1")
+        elif key == b"authorization":
+            authorization = value.decode("latin-1")
+    if header and header.lower() not in ("0", "false") and _header_allowed(header, authorization or ""):
+        return "header"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE and not scope["path"].startswith(PROFILE_EXEMPT_PATHS):
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """Profile the requests picked by the X-Profile header or PROFILE_SAMPLE_RATE."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        trigger = _trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], trigger)
+        stats = query_stats.current_stats()
+        if stats is not None:
+            stats.statement_time = Counter()
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        token = _current.set(profile)
+        _start(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _finish(profile)
+            _current.reset(token)
+            duration_ms = (time.perf_counter() - profile.started) * 1000
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            await run_in_threadpool(_store, profile, route, status_code, duration_ms, stats)
+
+
+# --- storage ----------------------------------------------------------------
+
+def _store(profile: Profile, route: str, status_code: int, duration_ms: float, stats) -> None:
+    statements = []
+    if stats is not None and stats.statement_time:
+        statements = [
+            {"statement": shape[:2000], "count": stats.shapes[shape], "total_ms": round(seconds * 1000, 2)}
+            for shape, seconds in stats.statement_time.most_common(50)
+        ]
+    meta = {
+        "id": profile.id,
+        "created_at": profile.created_at.isoformat(),
+        "method": profile.method,
+        "path": profile.path,
+        "route": route,
+        "status": status_code,
+        "trigger": profile.trigger,
+        "duration_ms": round(duration_ms, 2),
+        "db_queries": stats.query_count if stats is not None else None,
+        "db_ms": round(stats.db_time_ms, 2) if stats is not None else None,
+        "samples": len(profile.samples),
+        "interval_ms": PROFILE_INTERVAL_MS,
+    }
+    try:
+        os.makedirs(PROFILE_STORAGE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_STORAGE_DIR, f"{profile.id}.json"), "w", encoding="utf-8") as f:
+            json.dump(profile.speedscope(), f, separators=(",", ":"))
+        # Written last: a profile is listed once its metadata exists
+        with open(os.path.join(PROFILE_STORAGE_DIR, f"{profile.id}.meta.json"), "w", encoding="utf-8") as f:
+            json.dump({**meta, "statements": statements}, f)
+        _prune()
+    except OSError as e:
+        logger.error(f"Could not store profile {profile.id}: {str(e)}")
+        return
+    logger.info(
+        f"Profiled {profile.method} {route} ({duration_ms:.2f}ms, {len(profile.samples)} samples): {profile.id}",
+        extra={"event": "profile", "profile_id": profile.id, "route": route, "duration_ms": round(duration_ms, 2)},
+    )
+
+
+def _prune() -> None:
+    ids = stored_ids()
+    for profile_id in ids[PROFILE_MAX_STORED:]:
+        for suffix in (".meta.json", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_STORAGE_DIR, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def stored_ids() -> List[str]:
+    """Ids of the stored profiles, newest first."""
+    try:
+        names = os.listdir(PROFILE_STORAGE_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted((n[: -len(".meta.json")] for n in names if n.endswith(".meta.json")), reverse=True)
+
+
+def load_meta(profile_id: str) -> Optional[dict]:
+    return _load(profile_id, ".meta.json")
+
+
+def load_speedscope(profile_id: str) -> Optional[dict]:
+    return _load(profile_id, ".json")
+
+
+def _load(profile_id: str, suffix: str) -> Optional[dict]:
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(PROFILE_STORAGE_DIR, profile_id + suffix), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
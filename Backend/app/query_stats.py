@@ -0,0 +1,140 @@
+"""Per-request SQL instrumentation.
+
+Cursor events on the engine record how many statements each request runs and
+how long it waits on the database. The numbers are kept on a RequestQueryStats
+object stored in a context variable: the request middleware creates it before
+calling the route, and because sync handlers run in threadpool workers that
+copy the request's context, the handler thread updates the same object.
+
+Statements slower than SLOW_QUERY_MS are logged together with their route, and
+a request that runs the same statement shape more than N_PLUS_ONE_THRESHOLD
+times is flagged as a likely N+1 query pattern.
+"""
+import contextvars
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "True").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LIST_RE = re.compile(r"\((?:\s*(?:%\(\w+\)s|\?|:\w+|\$\d+)\s*,?)+\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so executions that differ only by values compare equal."""
+    shape = _LITERAL_RE.sub("?", statement)
+    shape = _PARAM_LIST_RE.sub("(?)", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+class RequestQueryStats:
+    """Query counters for a single request."""
+
+    __slots__ = ("scope", "query_count", "db_time", "shapes", "statement_time")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope or {}
+        self.query_count = 0
+        self.db_time = 0.0
+        self.shapes: Counter = Counter()
+        # Seconds per statement shape; only collected for profiled requests
+        self.statement_time: Optional[Counter] = None
+
+    @property
+    def route(self) -> str:
+        # The route is only known once the router has matched the request
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", "")
+
+    @property
+    def db_time_ms(self) -> float:
+        return self.db_time * 1000
+
+    def repeated_statements(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        """Statement shapes executed more than `threshold` times."""
+        return [(shape, count) for shape, count in self.shapes.items() if count > threshold]
+
+
+_current_stats: contextvars.ContextVar[Optional[RequestQueryStats]] = contextvars.ContextVar(
+    "request_query_stats", default=None
+)
+
+
+def begin_request(scope: dict) -> RequestQueryStats:
+    """Start collecting statistics for the current request."""
+    stats = RequestQueryStats(scope)
+    _current_stats.set(stats)
+    return stats
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_start_time")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_time += elapsed
+        shape = statement_shape(statement)
+        stats.shapes[shape] += 1
+        if stats.statement_time is not None:
+            stats.statement_time[shape] += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        route = stats.route if stats is not None else "<background>"
+        logger.warning(
+            f"Slow query ({elapsed * 1000:.2f}ms) on {route}: {_WHITESPACE_RE.sub(' ', statement).strip()}"
+        )
+
+
+def _handle_error(exception_context):
+    # Keep the start-time stack balanced when a statement fails
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(engine) -> None:
+    """Attach the cursor listeners to an engine (no-op when disabled)."""
+    if not SQL_INSTRUMENTATION:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def server_timing(stats: RequestQueryStats, total_seconds: float) -> str:
+    """Format the Server-Timing header value for a finished request."""
+    return (
+        f'db;dur={stats.db_time_ms:.2f};desc="{stats.query_count} queries", '
+        f"app;dur={total_seconds * 1000:.2f}"
+    )
+
+
+def report_repeated_statements(stats: RequestQueryStats, method: str) -> None:
+    """Log statement shapes that look like an N+1 pattern for this request."""
+    for shape, count in stats.repeated_statements():
+        logger.warning(
+            f"Possible N+1 on {method} {stats.route}: statement ran {count} times: {shape[:300]}"
+        )
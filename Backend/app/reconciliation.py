@@ -0,0 +1,311 @@
+"""Match bank statement lines against ledger transactions.
+
+The statement CSV is parsed row by row into compact tuples (the file is never
+held in memory as text). Ledger transactions in the statement's date range
+(plus the matching window) are then loaded in one streamed query and put in
+a hash index keyed by (signed amount in cents, date). Each statement line
+looks up its amount on its own date, then one day either side, and so on up
+to RECONCILE_DATE_WINDOW days, and takes the first date with a candidate: the
+nearest date wins. Matched entries are removed from the index, so a park's
+many same-amount rent payments are never rescanned and matching stays linear
+in the number of lines.
+
+Ledger amounts are stored unsigned; the transaction type gives the
+direction. Payments and income are money in (positive, like deposits on the
+statement), every other cash type (expenses, refunds) money out. Charges,
+credits and write-offs move no money and are never candidates.
+
+On a date with several candidates, entries sharing a reference number with
+the line (a token with a digit: unit, cheque or invoice number) are
+preferred, and description similarity picks among at most
+RECONCILE_MAX_CANDIDATES of them; a best similarity below min_similarity
+moves on to the next date. Matching is one-to-one.
+"""
+import csv
+import difflib
+import logging
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import islice
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, NamedTuple, Optional, TextIO, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from .ledger import NON_CASH_TYPES, PAYMENT_TYPES
+from .models.models import Transaction as TransactionModel
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_DATE_WINDOW = int(os.getenv("RECONCILE_DATE_WINDOW", "3"))
+RECONCILE_MIN_SIMILARITY = float(os.getenv("RECONCILE_MIN_SIMILARITY", "0.0"))
+# Same-day candidates compared by description similarity for one statement line
+RECONCILE_MAX_CANDIDATES = int(os.getenv("RECONCILE_MAX_CANDIDATES", "8"))
+RECONCILE_MAX_LINES = int(os.getenv("RECONCILE_MAX_LINES", "500000"))
+RECONCILE_DATE_FORMATS = [
+    f.strip() for f in os.getenv("RECONCILE_DATE_FORMATS", "%Y-%m-%d,%m/%d/%Y,%m/%d/%y,%d.%m.%Y").split(",") if f.strip()
+]
+
+# Accepted header names (lower case) for each statement column
+DATE_HEADERS = ("date", "posting date", "posted date", "transaction date", "value date")
+DESCRIPTION_HEADERS = ("description", "memo", "details", "payee", "narrative", "name")
+AMOUNT_HEADERS = ("amount", "transaction amount")
+CREDIT_HEADERS = ("credit", "deposit", "deposits", "credit amount")
+DEBIT_HEADERS = ("debit", "withdrawal", "withdrawals", "debit amount")
+
+# Cash types that are money received; other cash types are money paid out
+INFLOW_TYPES = tuple(t for t in PAYMENT_TYPES if t not in NON_CASH_TYPES) + ("income",)
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+class StatementError(ValueError):
+    """The uploaded file is not a statement we can parse."""
+
+
+class StatementLine(NamedTuple):
+    line: int
+    date: date
+    cents: int  # signed: deposits positive, withdrawals negative
+    description: str
+
+
+class LedgerEntry(NamedTuple):
+    id: int
+    date: date
+    cents: int  # signed like statement lines: money in positive, money out negative
+    type: Optional[str]
+    description: str
+
+
+def normalize_description(text: Optional[str]) -> str:
+    return _NON_WORD_RE.sub(" ", (text or "").lower()).strip()
+
+
+def similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+def _parse_date(value: str) -> date:
+    value = value.strip()
+    for fmt in RECONCILE_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise StatementError(f"Unrecognized date '{value}'")
+
+
+def _parse_cents(value: str) -> int:
+    value = value.strip().replace(",", "").replace("$", "")
+    negative = value.startswith("(") and value.endswith(")")
+    if negative:
+        value = value[1:-1]
+    try:
+        cents = int((Decimal(value) * 100).to_integral_value())
+    except InvalidOperation:
+        raise StatementError(f"Unrecognized amount '{value}'")
+    return -cents if negative else cents
+
+
+def _find_column(header: List[str], names: Tuple[str, ...]) -> Optional[int]:
+    for index, name in enumerate(header):
+        if name in names:
+            return index
+    return None
+
+
+def parse_statement(stream: TextIO) -> Iterable[StatementLine]:
+    """Yield statement lines from a bank CSV export, one row at a time.
+
+    Needs a header row with a date column, a description column and either a
+    signed amount column or separate credit/debit columns.
+    """
+    reader = csv.reader(stream)
+    header = None
+    for row in reader:
+        if any(cell.strip() for cell in row):
+            header = [cell.strip().lower() for cell in row]
+            break
+    if header is None:
+        raise StatementError("Statement is empty")
+
+    date_col = _find_column(header, DATE_HEADERS)
+    desc_col = _find_column(header, DESCRIPTION_HEADERS)
+    amount_col = _find_column(header, AMOUNT_HEADERS)
+    credit_col = _find_column(header, CREDIT_HEADERS)
+    debit_col = _find_column(header, DEBIT_HEADERS)
+    if date_col is None or (amount_col is None and credit_col is None and debit_col is None):
+        raise StatementError("Statement needs a date column and an amount (or credit/debit) column")
+
+    for row in reader:
+        line = reader.line_num
+        if not any(cell.strip() for cell in row):
+            continue
+        if line > RECONCILE_MAX_LINES:
+            raise StatementError(f"Statement has more than {RECONCILE_MAX_LINES} lines")
+        try:
+            if amount_col is not None:
+                cents = _parse_cents(row[amount_col])
+            else:
+                credit = row[credit_col].strip() if credit_col is not None else ""
+                debit = row[debit_col].strip() if debit_col is not None else ""
+                cents = _parse_cents(credit) if credit else -abs(_parse_cents(debit or "0"))
+            yield StatementLine(
+                line,
+                _parse_date(row[date_col]),
+                cents,
+                row[desc_col].strip() if desc_col is not None and desc_col < len(row) else "",
+            )
+        except IndexError:
+            raise StatementError(f"Line {line}: missing columns")
+        except StatementError as e:
+            raise StatementError(f"Line {line}: {e}")
+
+
+def load_ledger(db: Session, start: date, end: date, batch_size: int = 5000) -> List[LedgerEntry]:
+    """Cash transactions dated start..end; charges, credits and write-offs are not bank movements."""
+    stmt = (
+        select(TransactionModel.id, TransactionModel.date, TransactionModel.amount,
+               TransactionModel.type, TransactionModel.description)
+        .where(TransactionModel.date >= start, TransactionModel.date <= end)
+        .where(func.lower(func.coalesce(TransactionModel.type, "")).not_in(NON_CASH_TYPES))
+        .execution_options(yield_per=batch_size)
+    )
+    entries = []
+    for tx_id, tx_date, amount, tx_type, description in db.execute(stmt):
+        if amount is None:
+            continue
+        entries.append(LedgerEntry(tx_id, tx_date, signed_cents(tx_type, amount), tx_type, description or ""))
+    return entries
+
+
+def signed_cents(tx_type: Optional[str], amount) -> int:
+    """A ledger amount in cents, positive for money in and negative for money out."""
+    cents = abs(int((Decimal(str(amount)) * 100).to_integral_value()))
+    return cents if (tx_type or "").lower() in INFLOW_TYPES else -cents
+
+
+def _references(description: str) -> List[str]:
+    """Tokens with a digit in them (unit, cheque and invoice numbers), from a normalized description."""
+    return [token for token in description.split() if any(c.isdigit() for c in token)]
+
+
+def match(lines: List[StatementLine], ledger: List[LedgerEntry], window: int = RECONCILE_DATE_WINDOW,
+          min_similarity: float = RECONCILE_MIN_SIMILARITY) -> Tuple[list, List[StatementLine], List[LedgerEntry]]:
+    """Pair statement lines with ledger entries; returns (matches, unmatched lines, unmatched entries)."""
+    # Signed on both sides, so a withdrawal never matches a payment received
+    ledger = [entry for entry in ledger if (entry.type or "").lower() not in NON_CASH_TYPES]
+    # Dicts keep insertion (id) order and drop a matched entry in O(1)
+    index: Dict[Tuple[int, int], Dict[int, LedgerEntry]] = defaultdict(dict)
+    by_reference: Dict[Tuple[int, int, str], Dict[int, LedgerEntry]] = defaultdict(dict)
+    normalized: Dict[int, str] = {}
+    for entry in ledger:
+        day = entry.date.toordinal()
+        index[(entry.cents, day)][entry.id] = entry
+        normalized[entry.id] = normalize_description(entry.description)
+        for reference in _references(normalized[entry.id]):
+            by_reference[(entry.cents, day, reference)][entry.id] = entry
+
+    # Nearest dates first: 0, -1, +1, -2, +2, ...
+    offsets = [0] + [sign * days for days in range(1, window + 1) for sign in (-1, 1)]
+    used = set()
+    matches = []
+    unmatched_lines = []
+    for line in lines:
+        amount = line.cents
+        line_day = line.date.toordinal()
+        description = normalize_description(line.description)
+        references = _references(description)
+        best = None
+        for offset in offsets:
+            day = line_day + offset
+            bucket = index.get((amount, day))
+            if not bucket:
+                continue
+            # Entries sharing a reference number first, otherwise the first few of the day
+            candidates = {}
+            for reference in references:
+                candidates.update(islice(by_reference.get((amount, day, reference), {}).items(), RECONCILE_MAX_CANDIDATES))
+            if not candidates:
+                candidates = dict(islice(bucket.items(), RECONCILE_MAX_CANDIDATES))
+            ranked = sorted(
+                (-similarity(description, normalized[entry_id]), entry_id)
+                for entry_id in islice(candidates, RECONCILE_MAX_CANDIDATES)
+            )
+            if -ranked[0][0] >= min_similarity:
+                best, score = candidates[ranked[0][1]], -ranked[0][0]
+                break
+        if best is None:
+            unmatched_lines.append(line)
+            continue
+        used.add(best.id)
+        day = best.date.toordinal()
+        del index[(amount, day)][best.id]
+        for reference in _references(normalized[best.id]):
+            by_reference[(amount, day, reference)].pop(best.id, None)
+        matches.append((line, best, abs(day - line_day), score))
+
+    unmatched_entries = [entry for entry in ledger if entry.id not in used]
+    return matches, unmatched_lines, unmatched_entries
+
+
+def _money(cents: int) -> str:
+    return str(Decimal(cents) / 100)
+
+
+def reconcile(db: Session, stream: TextIO, window: int = RECONCILE_DATE_WINDOW,
+              min_similarity: float = RECONCILE_MIN_SIMILARITY) -> Dict:
+    """Parse a statement, match it against the ledger and build the report."""
+    lines = list(parse_statement(stream))
+    if not lines:
+        raise StatementError("Statement has no transactions")
+    start = min(line.date for line in lines)
+    end = max(line.date for line in lines)
+    ledger = load_ledger(db, start - timedelta(days=window), end + timedelta(days=window))
+    matches, unmatched_lines, unmatched_entries = match(lines, ledger, window, min_similarity)
+
+    # Ledger rows just outside the statement period were only loaded as candidates
+    unmatched_entries = [entry for entry in unmatched_entries if start <= entry.date <= end]
+    logger.info(
+        f"Reconciled {len(lines)} statement lines against {len(ledger)} transactions: "
+        f"{len(matches)} matched, {len(unmatched_lines)} + {len(unmatched_entries)} unmatched"
+    )
+    return {
+        "period": {"start": start.isoformat(), "end": end.isoformat()},
+        "summary": {
+            "statement_lines": len(lines),
+            "ledger_transactions": len(ledger),
+            "matched": len(matches),
+            "unmatched_statement_lines": len(unmatched_lines),
+            "unmatched_transactions": len(unmatched_entries),
+            "statement_total": _money(sum(line.cents for line in lines)),
+            "unmatched_statement_total": _money(sum(line.cents for line in unmatched_lines)),
+        },
+        "matches": [
+            {
+                "line": line.line,
+                "transaction_id": entry.id,
+                "date": line.date.isoformat(),
+                "amount": _money(line.cents),
+                "days_apart": days,
+                "description_similarity": round(score, 3),
+            }
+            for line, entry, days, score in matches
+        ],
+        "unmatched_statement_lines": [
+            {"line": line.line, "date": line.date.isoformat(), "amount": _money(line.cents),
+             "description": line.description}
+            for line in unmatched_lines
+        ],
+        "unmatched_transactions": [
+            {"id": entry.id, "date": entry.date.isoformat(), "amount": _money(entry.cents),
+             "type": entry.type, "description": entry.description}
+            for entry in unmatched_entries
+        ],
+    }
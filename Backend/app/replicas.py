@@ -0,0 +1,169 @@
+"""Route read-only endpoints to PostgreSQL read replicas.
+
+DATABASE_REPLICA_URLS lists the replicas (comma separated). GET handlers
+that depend on get_read_db get a session on the next usable replica, round
+robin; everything else keeps using get_db and the primary.
+
+Each replica is watched by the health monitor ("replica:<n>"): one that is
+unreachable or more than REPLICA_MAX_LAG_SECONDS behind is skipped until a
+later check passes, and without a usable replica reads go to the primary. A
+replica that fails when a request opens its session is skipped right away.
+
+Read-your-writes: a successful write response sets a short-lived cookie
+(REPLICA_STICKY_SECONDS); requests carrying it, or the header
+"X-Read-Consistency: primary", read from the primary so clients see their own
+changes before the replicas have replayed them.
+"""
+import itertools
+import logging
+import os
+import time
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, text
+
+from . import health, metrics, named_statements, query_stats
+from .database import (
+    SessionLocal, get_db, engine_options, IS_SQLITE, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+STICKY_COOKIE = "pm_read_primary"
+CONSISTENCY_HEADER = "x-read-consistency"
+
+REPLICA_LAG = metrics.REGISTRY.gauge(
+    "pm_db_replica_lag_seconds", "Replication lag measured by the last replica health check.", ("replica",),
+)
+READS_ROUTED = metrics.REGISTRY.counter(
+    "pm_db_reads_routed_total", "Read-only requests by the database that served them.", ("target",),
+)
+
+if DATABASE_REPLICA_URLS and IS_SQLITE:
+    logger.warning("DATABASE_REPLICA_URLS is ignored in embedded (SQLite) mode")
+    DATABASE_REPLICA_URLS = []
+
+
+class Replica:
+    __slots__ = ("name", "engine", "check", "skip_until")
+
+    def __init__(self, index: int, url: str):
+        self.name = f"replica:{index}"
+        self.engine = create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            **engine_options
+        )
+        query_stats.instrument_engine(self.engine)
+        named_statements.instrument_engine(self.engine)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=lambda: self.engine.dispose(close=False))
+        self.check = health.replica_check(
+            url, REPLICA_MAX_LAG_SECONDS,
+            {"connect_timeout": int(health.HEALTH_CHECK_TIMEOUT), "application_name": "property_manager_health"},
+        )
+        self.skip_until = 0.0
+
+    def usable(self, now: float) -> bool:
+        result = health.monitor.result(self.name)
+        return result.status == "up" and result.is_fresh() and now >= self.skip_until
+
+
+replicas: List[Replica] = [Replica(i, url) for i, url in enumerate(DATABASE_REPLICA_URLS)]
+_next = itertools.count()
+
+
+def register_checks() -> None:
+    for replica in replicas:
+        health.monitor.add_check(replica.name, replica.check)
+
+
+def _collect_lag():
+    for replica in replicas:
+        if replica.check.lag_seconds is not None:
+            REPLICA_LAG.set(replica.check.lag_seconds, replica.name)
+
+
+metrics.REGISTRY.add_collector(_collect_lag)
+
+
+def pick() -> Optional[Replica]:
+    """Next usable replica in round-robin order, or None to use the primary."""
+    if not replicas:
+        return None
+    now = time.time()
+    start = next(_next)
+    for offset in range(len(replicas)):
+        replica = replicas[(start + offset) % len(replicas)]
+        if replica.usable(now):
+            return replica
+    return None
+
+
+def wants_primary(request: Request) -> bool:
+    return (
+        STICKY_COOKIE in request.cookies
+        or request.headers.get(CONSISTENCY_HEADER, "").lower() == "primary"
+    )
+
+
+def get_read_db(request: Request):
+    """Like get_db, but on a replica when one is usable and the client isn't pinned to the primary."""
+    replica = None if wants_primary(request) else pick()
+    if replica is None:
+        READS_ROUTED.inc("primary")
+        yield from get_db()
+        return
+
+    db = SessionLocal(bind=replica.engine)
+    try:
+        db.execute(text("SELECT 1"))
+    except Exception as e:
+        db.close()
+        # Skip it until the next health check has had a chance to look at it
+        replica.skip_until = time.time() + health.HEALTH_CHECK_INTERVAL
+        logger.warning(f"Replica {replica.name} failed, reading from the primary: {str(e)}")
+        READS_ROUTED.inc("primary")
+        yield from get_db()
+        return
+
+    READS_ROUTED.inc(replica.name)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ReadYourWritesMiddleware:
+    """Pin a client to the primary for a few seconds after each successful write."""
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = (
+            f"{STICKY_COOKIE}=1; Max-Age={REPLICA_STICKY_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+        ).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", self.cookie)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def dispose() -> None:
+    for replica in replicas:
+        replica.engine.dispose()
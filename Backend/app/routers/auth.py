@@ -0,0 +1,161 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Optional
+import asyncio
+import logging
+import threading
+
+from ..database import SessionLocal
+from ..models.models import User as UserModel
+from ..schemas.schemas import UserCreate, UserRead, Token
+from ..schemas.responses import APIError
+from .. import auth
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/auth",
+    tags=["Auth"],
+    responses={500: {"model": APIError, "description": "Internal server error"}},
+)
+
+# Arbitrary constant identifying the first-user advisory lock
+_BOOTSTRAP_LOCK_KEY = 640_042
+# The desktop build (SQLite) is a single process, so a thread lock is enough there
+_bootstrap_lock = threading.Lock()
+
+
+def _load_user(email: str) -> Optional[UserModel]:
+    # Emails are stored lowercased, so the unique index on users.email serves this
+    with SessionLocal() as db:
+        return db.execute(
+            select(UserModel).where(UserModel.email == email.strip().lower())
+        ).scalar_one_or_none()
+
+
+def _count_users(db: Session) -> int:
+    return db.scalar(select(func.count()).select_from(UserModel))
+
+
+def _lock_bootstrap(db: Session) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        # Held until the transaction ends, so across workers only one first user commits
+        db.execute(select(func.pg_advisory_xact_lock(_BOOTSTRAP_LOCK_KEY)))
+
+
+@router.post("/token",
+    response_model=Token,
+    summary="Log In",
+    description="""
+    Exchange an email and password (OAuth2 password form: `username`,
+    `password`) for a bearer token.
+
+    Send the token as `Authorization: Bearer <token>`, or as the
+    `access_token` query parameter for SSE and WebSocket connections.
+    """,
+    responses={
+        200: {"description": "Token issued"},
+        401: {"description": "Wrong email or password"},
+        503: {"description": "Too many logins in progress"}
+    }
+)
+async def login(form: OAuth2PasswordRequestForm = Depends()):
+    """Issue an access token"""
+    user = await asyncio.to_thread(_load_user, form.username)
+    # Verified even for unknown emails, so both failures take as long
+    valid = await auth.verify_password(form.password, user.hashed_password if user else None)
+    if not valid or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Token(access_token=auth.create_access_token(user), expires_in=auth.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+@router.get("/me",
+    response_model=UserRead,
+    summary="Current User",
+    description="The user the bearer token belongs to.",
+    responses={
+        200: {"description": "User retrieved successfully"},
+        401: {"description": "Missing or invalid token"}
+    }
+)
+def read_current_user(principal: auth.Principal = Depends(auth.require_user)):
+    """Return the authenticated user"""
+    with SessionLocal() as db:
+        user = db.get(UserModel, principal.user_id)
+        if user is None or not user.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User no longer exists")
+        return UserRead.model_validate(user)
+
+
+@router.post("/users",
+    response_model=UserRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create User",
+    description="""
+    Create a login. Requires an admin token, except for the very first user,
+    who becomes the admin.
+    """,
+    responses={
+        201: {"description": "User created"},
+        400: {"description": "Invalid role or email already registered"},
+        403: {"description": "Admin role required"}
+    }
+)
+async def create_user(payload: UserCreate, principal: Optional[auth.Principal] = Depends(auth.authenticate)):
+    """Create a user"""
+    if payload.role not in auth.ROLES:
+        raise HTTPException(status_code=400, detail=f"Role must be one of {', '.join(auth.ROLES)}")
+
+    def count_users() -> int:
+        with SessionLocal() as db:
+            return _count_users(db)
+
+    bootstrap = await asyncio.to_thread(count_users) == 0
+    if not bootstrap:
+        await auth.require_admin(await auth.require_user(principal))
+
+    hashed = await auth.hash_password(payload.password)
+
+    def insert_user(as_first: bool) -> Optional[UserModel]:
+        with SessionLocal() as db:
+            user = UserModel(
+                email=payload.email.strip().lower(),
+                hashed_password=hashed,
+                full_name=payload.full_name,
+                role="admin" if as_first else payload.role,
+                tenant_id=payload.tenant_id,
+                is_active=True,
+            )
+            if as_first:
+                # Count again under the lock, in the inserting transaction:
+                # of two concurrent first requests only one becomes admin
+                with _bootstrap_lock:
+                    _lock_bootstrap(db)
+                    if _count_users(db):
+                        return None
+                    db.add(user)
+                    db.commit()
+            else:
+                db.add(user)
+                db.commit()
+            db.refresh(user)
+            return user
+
+    try:
+        user = await asyncio.to_thread(insert_user, bootstrap)
+        if user is None:
+            # Someone else created the first user meanwhile: an admin token is required after all
+            await auth.require_admin(await auth.require_user(principal))
+            user = await asyncio.to_thread(insert_user, False)
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    logger.info(f"Created user {user.id} with role {user.role}")
+    return UserRead.model_validate(user)
@@ -0,0 +1,125 @@
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import json
+import logging
+
+from ..changefeed import hub, ENTITIES, CHANGEFEED_HEARTBEAT
+from .. import tenancy
+from ..schemas.responses import APIError
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["Changes"],
+    responses={500: {"model": APIError, "description": "Internal server error"}},
+)
+
+
+def parse_entities(entities: Optional[str]):
+    """Parse a comma separated entity filter; None means all entities."""
+    if not entities:
+        return None
+    requested = {e.strip() for e in entities.split(",") if e.strip()}
+    unknown = requested - set(ENTITIES)
+    if unknown:
+        raise ValueError(f"Unknown entities: {', '.join(sorted(unknown))}")
+    return requested
+
+
+@router.get("/stream",
+    summary="Change Stream (SSE)",
+    description="""
+    Server-Sent Events stream of row changes.
+
+    Parameters:
+    - entities: Optional comma separated filter, e.g. `properties,tenants`
+      (properties, tenants, leases, transactions, maintenance_requests)
+
+    Events:
+    - `changes`: `{"changes": [{"entity": "properties", "id": 1, "op": "update"}, ...]}`
+    - `resync`: changes were missed; fetch `/sync` with the last token
+
+    Bursts are coalesced into one event; a comment line is sent as a heartbeat.
+    """,
+    responses={
+        200: {"description": "Event stream", "content": {"text/event-stream": {}}},
+        400: {"description": "Unknown entity in filter"}
+    }
+)
+async def stream_changes(
+    request: Request,
+    entities: Optional[str] = Query(None, description="Comma separated entities to follow")
+):
+    """Stream change notifications as Server-Sent Events"""
+    try:
+        wanted = parse_entities(entities)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    subscriber = hub.subscribe(wanted, schema=tenancy.current_schema())
+
+    async def events():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                message = await subscriber.next_message(timeout=CHANGEFEED_HEARTBEAT)
+                if message is None:
+                    yield ": heartbeat\n\n"
+                    continue
+                kind = message.pop("type")
+                yield f"event: {kind}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def websocket_changes(websocket: WebSocket, entities: Optional[str] = None):
+    """Push change notifications over a WebSocket.
+
+    Messages are JSON objects shaped like the SSE events, with a "type" of
+    "changes" or "resync". Clients may send {"entities": [...]} to change
+    their filter.
+    """
+    try:
+        wanted = parse_entities(entities)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+    subscriber = hub.subscribe(wanted, schema=tenancy.current_schema())
+
+    async def send_changes():
+        while True:
+            message = await subscriber.next_message(timeout=CHANGEFEED_HEARTBEAT)
+            await websocket.send_json(message if message is not None else {"type": "heartbeat"})
+
+    async def receive_filters():
+        while True:
+            data = await websocket.receive_json()
+            try:
+                subscriber.entities = parse_entities(",".join(data.get("entities") or []))
+            except (ValueError, AttributeError, TypeError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+
+    tasks = [asyncio.create_task(send_changes()), asyncio.create_task(receive_filters())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.error(f"Change feed WebSocket error: {str(error)}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.unsubscribe(subscriber)
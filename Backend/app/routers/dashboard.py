@@ -0,0 +1,198 @@
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import select, func, distinct, literal, true
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Optional
+from datetime import date, datetime
+import logging
+import os
+import threading
+import time
+
+from ..database import SessionLocal
+from ..models.models import (
+    Property as PropertyModel,
+    Lease as LeaseModel,
+    Transaction as TransactionModel,
+    MaintenanceRequest as MaintenanceRequestModel,
+)
+from ..changefeed import hub
+from ..ledger import NON_CASH_TYPES
+from .. import tenancy
+from ..schemas.responses import APIError
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "10"))
+# Transaction types counted as expenses; every other cash type counts as revenue
+# (charges, credits and write-offs are not money received, see ledger.py)
+DASHBOARD_EXPENSE_TYPES = [
+    t.strip().lower()
+    for t in os.getenv("DASHBOARD_EXPENSE_TYPES", "expense,maintenance,repair,utility,tax,insurance").split(",")
+    if t.strip()
+]
+OCCUPIED_STATUSES = ("rented", "occupied")
+CLOSED_MAINTENANCE_STATUSES = ("completed", "closed", "cancelled")
+# A write to any of these tables invalidates the cached aggregates
+DASHBOARD_TABLES = ("properties", "leases", "transactions", "maintenance_requests")
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["Dashboard"],
+    responses={500: {"model": APIError, "description": "Internal server error"}},
+)
+
+_cache: Dict[Any, tuple] = {}
+_cache_lock = threading.Lock()
+_cache_generation = 0
+
+
+def invalidate_cache(changes=None) -> None:
+    """Drop cached aggregates; used as a change feed callback."""
+    global _cache_generation
+    if changes is not None and not any(entity in DASHBOARD_TABLES for entity, _, _ in changes):
+        return
+    with _cache_lock:
+        _cache_generation += 1
+        _cache.clear()
+
+
+hub.add_callback(invalidate_cache)
+
+
+def dashboard_statement(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """Build the single SELECT that computes every dashboard aggregate."""
+    status = func.lower(PropertyModel.status)
+    properties = select(
+        func.count().label("total_properties"),
+        func.count().filter(status == "available").label("available_properties"),
+        func.count().filter(status.in_(OCCUPIED_STATUSES)).label("rented_properties"),
+        func.count().filter(status == "maintenance").label("maintenance_properties"),
+    ).cte("property_counts")
+
+    leases = select(
+        func.count(distinct(LeaseModel.property_id)).label("leased_properties"),
+        func.count().label("active_leases"),
+        func.coalesce(func.sum(LeaseModel.rent_amount), 0).label("monthly_rent_roll"),
+    ).where(func.lower(LeaseModel.status) == "active").cte("lease_counts")
+
+    kind = func.lower(TransactionModel.type)
+    is_expense = kind.in_(DASHBOARD_EXPENSE_TYPES)
+    # A rent charge and the payment settling it would otherwise both count
+    is_revenue = ~is_expense & kind.not_in(NON_CASH_TYPES)
+    tx_query = select(
+        func.coalesce(func.sum(TransactionModel.amount).filter(is_revenue), 0).label("revenue"),
+        func.coalesce(func.sum(TransactionModel.amount).filter(is_expense), 0).label("expenses"),
+        func.count().label("transaction_count"),
+    )
+    if start_date is not None:
+        tx_query = tx_query.where(TransactionModel.date >= start_date)
+    if end_date is not None:
+        tx_query = tx_query.where(TransactionModel.date <= end_date)
+    transactions = tx_query.cte("transaction_totals")
+
+    maintenance_status = func.lower(func.coalesce(MaintenanceRequestModel.status, literal("open")))
+    maintenance = select(
+        func.count().filter(~maintenance_status.in_(CLOSED_MAINTENANCE_STATUSES)).label("open_maintenance"),
+        func.count().filter(maintenance_status.in_(CLOSED_MAINTENANCE_STATUSES)).label("closed_maintenance"),
+    ).cte("maintenance_counts")
+
+    # Each CTE yields exactly one row, so the cross join is one row too
+    return select(properties, leases, transactions, maintenance).select_from(
+        properties.join(leases, true()).join(transactions, true()).join(maintenance, true())
+    )
+
+
+def compute_dashboard(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+    row = db.execute(dashboard_statement(start_date, end_date)).mappings().one()
+    total = row["total_properties"]
+    occupied = row["leased_properties"]
+    revenue = row["revenue"]
+    expenses = row["expenses"]
+    return {
+        "properties": {
+            "total": total,
+            "occupied": occupied,
+            "vacant": max(total - occupied, 0),
+            "occupancy_rate": round(occupied / total, 4) if total else 0.0,
+            "by_status": {
+                "available": row["available_properties"],
+                "rented": row["rented_properties"],
+                "maintenance": row["maintenance_properties"],
+            },
+        },
+        "leases": {
+            "active": row["active_leases"],
+            "monthly_rent_roll": str(row["monthly_rent_roll"]),
+        },
+        "finances": {
+            "revenue": str(revenue),
+            "expenses": str(expenses),
+            "net": str(revenue - expenses),
+            "transaction_count": row["transaction_count"],
+            "start_date": start_date.isoformat() if start_date else None,
+            "end_date": end_date.isoformat() if end_date else None,
+        },
+        "maintenance": {
+            "open": row["open_maintenance"],
+            "closed": row["closed_maintenance"],
+        },
+    }
+
+
+@router.get("",
+    response_model=Dict[str, Any],
+    summary="Manager Dashboard",
+    description="""
+    Aggregates for the manager portal, computed in a single database round trip.
+
+    Parameters:
+    - start_date: Optional first transaction date included in the finances
+    - end_date: Optional last transaction date included in the finances
+
+    Returns a dictionary containing:
+    - properties: total, occupied (with an active lease), vacant, occupancy_rate, counts by status
+    - leases: active lease count and monthly rent roll
+    - finances: revenue, expenses and net over the date range
+    - maintenance: open and closed request counts
+    - generated_at / cached: when the numbers were computed and whether they came from cache
+
+    Results are cached for DASHBOARD_CACHE_TTL seconds and dropped as soon as a
+    property, lease, transaction or maintenance request changes.
+    """,
+    responses={
+        200: {"description": "Dashboard aggregates retrieved successfully"},
+        500: {"description": "Database error"}
+    }
+)
+def get_dashboard(
+    start_date: Optional[date] = Query(None, description="Include transactions on or after this date"),
+    end_date: Optional[date] = Query(None, description="Include transactions on or before this date"),
+):
+    """Return portfolio aggregates for the manager dashboard"""
+    # Customers share the cache but never each other's entries
+    key = (tenancy.current_schema(), start_date, end_date)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(key)
+        generation = _cache_generation
+    if cached is not None and cached[0] > now:
+        # Cache hits never touch the connection pool
+        return {**cached[1], "cached": True}
+
+    try:
+        with SessionLocal() as db:
+            result = compute_dashboard(db, start_date, end_date)
+    except Exception as e:
+        logger.error(f"Error computing dashboard: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error retrieving dashboard"
+        )
+    result["generated_at"] = datetime.now().isoformat()
+
+    with _cache_lock:
+        # Skip caching if a write landed while we were reading
+        if generation == _cache_generation:
+            _cache[key] = (now + DASHBOARD_CACHE_TTL, result)
+    return {**result, "cached": False}
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Optional
+from datetime import date
+import asyncio
+import logging
+
+from ..replicas import get_read_db
+from ..models.models import RenewalTask as RenewalTaskModel
+from ..schemas.responses import APIError
+from .. import auth, lease_scanner
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/leases",
+    tags=["Leases"],
+    responses={500: {"model": APIError, "description": "Internal server error"}},
+)
+
+
+@router.get("/renewal-tasks",
+    response_model=Dict[str, Any],
+    summary="List Renewal Tasks",
+    description="""
+    Renewal tasks created by the lease scanner, soonest lease end first.
+
+    Parameters:
+    - status: Filter by task status (default `open`)
+    - skip: Number of records to skip (pagination offset)
+    - limit: Maximum number of records to return
+    """,
+    responses={
+        200: {"description": "Renewal tasks retrieved successfully"}
+    }
+)
+def list_renewal_tasks(
+    status: Optional[str] = Query("open", description="Task status to filter by"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    db: Session = Depends(get_read_db)
+):
+    """List renewal tasks"""
+    query = db.query(RenewalTaskModel)
+    if status:
+        query = query.filter(RenewalTaskModel.status == status)
+    total = query.count()
+    tasks = query.order_by(RenewalTaskModel.lease_end_date, RenewalTaskModel.id).offset(skip).limit(limit).all()
+    return {
+        "renewal_tasks": [
+            {
+                "id": t.id,
+                "lease_id": t.lease_id,
+                "tenant_id": t.tenant_id,
+                "property_id": t.property_id,
+                "lease_end_date": t.lease_end_date.isoformat() if t.lease_end_date else None,
+                "status": t.status,
+                "created_at": t.created_at.isoformat() if t.created_at else None,
+            }
+            for t in tasks
+        ],
+        "total": total,
+        "page_info": {
+            "skip": skip,
+            "limit": limit,
+            "has_more": (skip + limit) < total
+        }
+    }
+
+
+@router.post("/scan",
+    response_model=Dict[str, Any],
+    summary="Run Lease Scan",
+    description="""
+    Run the lease expiry and renewal scan now instead of waiting for the next
+    scheduled run.
+
+    Parameters:
+    - as_of: Date to scan as of (defaults to today; future dates are rejected
+      since the scan expires leases as of that date)
+
+    Returns how many renewal tasks were created and leases expired, or
+    `skipped: true` when another worker is already scanning. Admin only.
+    """,
+    responses={
+        200: {"description": "Scan finished"},
+        400: {"description": "as_of is in the future"},
+        403: {"description": "Admin role required"}
+    }
+)
+async def run_lease_scan(
+    as_of: Optional[date] = Query(None, description="Scan as of this date"),
+    _admin: auth.Principal = Depends(auth.require_admin)
+):
+    """Run the lease scanner once"""
+    if as_of is not None and as_of > date.today():
+        raise HTTPException(status_code=400, detail="as_of cannot be in the future")
+    return await asyncio.to_thread(lease_scanner.run_scan, as_of)
@@ -0,0 +1,125 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, status
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Optional
+from datetime import date
+from decimal import Decimal
+import logging
+
+from ..database import get_db
+from ..replicas import get_read_db
+from ..models.models import Tenant as TenantModel
+from ..schemas.schemas import TransactionCreate, TransactionRead
+from ..schemas.responses import APIError
+from .. import ledger
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/ledger",
+    tags=["Ledger"],
+    responses={500: {"model": APIError, "description": "Internal server error"}},
+)
+
+
+@router.post("/transactions",
+    response_model=TransactionRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="Post Transaction",
+    description="""
+    Record a ledger transaction and update the tenant and lease balances atomically.
+
+    Parameters:
+    - tenant_id / lease_id / property_id: who and what the transaction belongs to
+      (tenant and property default to the lease's)
+    - type: charge, rent, fee, late_fee or deposit increase the balance owed;
+      payment, credit, refund_applied or writeoff reduce it; other types
+      (e.g. income, expense) are recorded without affecting tenant balances
+    - amount: positive amount
+    - date: transaction date (defaults to today)
+    """,
+    responses={
+        201: {"description": "Transaction posted"},
+        400: {"description": "Tenant, lease or property not found, or the lease does not belong to the tenant"},
+        422: {"description": "Validation error in request body"}
+    }
+)
+def post_transaction(payload: TransactionCreate, db: Session = Depends(get_db)):
+    """Post a transaction and update running balances"""
+    try:
+        tx = ledger.post_transaction(db, **payload.model_dump())
+    except ledger.LedgerError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    db.refresh(tx)
+    return {
+        "id": tx.id,
+        "tenant_id": tx.tenant_id,
+        "lease_id": tx.lease_id,
+        "property_id": tx.property_id,
+        "type": tx.type,
+        "amount": str(tx.amount) if tx.amount is not None else None,
+        "description": tx.description,
+        "date": tx.date.isoformat() if tx.date else None,
+        "created_at": tx.created_at.isoformat() if tx.created_at else None,
+    }
+
+
+@router.get("/balances/{tenant_id}",
+    response_model=Dict[str, Any],
+    summary="Tenant Balance",
+    description="""
+    Current amount owed by a tenant, in total and per lease.
+
+    Read from the maintained balance tables; no ledger rows are summed.
+    """,
+    responses={
+        200: {"description": "Balance retrieved successfully"},
+        404: {"description": "Tenant not found"}
+    }
+)
+def get_tenant_balance(
+    tenant_id: int = Path(..., title="Tenant ID", description="The ID of the tenant"),
+    db: Session = Depends(get_read_db)
+):
+    """Return the tenant's maintained balances"""
+    if db.get(TenantModel, tenant_id) is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    return ledger.get_balances(db, tenant_id)
+
+
+@router.get("/aging",
+    response_model=Dict[str, Any],
+    summary="Accounts Receivable Aging",
+    description="""
+    Delinquency report: what each tenant owes, bucketed by the age of the unpaid charges.
+
+    Payments are applied to the oldest charges first. Buckets are `current` (0-30 days),
+    `days_31_60`, `days_61_90` and `days_90_plus`, measured from `as_of`.
+
+    Parameters:
+    - as_of: Report date (defaults to today); later transactions are ignored
+    - min_balance: Only include tenants owing at least this much
+    - limit: Maximum number of tenants, largest balances first
+    """,
+    responses={
+        200: {"description": "Aging report computed successfully"},
+        500: {"description": "Database error"}
+    }
+)
+def get_aging_report(
+    as_of: Optional[date] = Query(None, description="Report date (defaults to today)"),
+    min_balance: Decimal = Query(Decimal("0.01"), gt=0, description="Minimum amount owed"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Maximum number of tenants"),
+    db: Session = Depends(get_read_db)
+):
+    """Compute the AR aging report"""
+    try:
+        return ledger.aging_report(db, as_of, min_balance, limit)
+    except Exception as e:
+        logger.error(f"Error computing aging report: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error computing aging report"
+        )
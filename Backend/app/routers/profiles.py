@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from typing import Dict, Any
+import logging
+
+from ..schemas.responses import APIError
+from .. import auth, profiling
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/profiles",
+    tags=["Profiling"],
+    dependencies=[Depends(auth.require_admin)],
+    responses={
+        403: {"description": "Admin role required"},
+        500: {"model": APIError, "description": "Internal server error"}
+    },
+)
+
+
+@router.get("/",
+    response_model=Dict[str, Any],
+    summary="List Profiles",
+    description="""
+    Recently stored request profiles, newest first, with their route, status,
+    duration and database time.
+
+    A request is profiled when it sends `X-Profile: 1` with an admin token
+    (or `X-Profile: <PROFILE_TOKEN>`), or when PROFILE_SAMPLE_RATE picks it;
+    its response then carries the profile id in `X-Profile-Id`.
+
+    Parameters:
+    - limit: Maximum number of profiles to return
+    """,
+    responses={
+        200: {"description": "Profiles retrieved successfully"}
+    }
+)
+def list_profiles(limit: int = Query(50, ge=1, le=500, description="Maximum number of profiles to return")):
+    """List stored profiles"""
+    ids = profiling.stored_ids()
+    profiles = []
+    for profile_id in ids[:limit]:
+        meta = profiling.load_meta(profile_id)
+        if meta is not None:
+            meta.pop("statements", None)
+            profiles.append(meta)
+    return {"profiles": profiles, "total": len(ids)}
+
+
+@router.get("/{profile_id}",
+    response_model=Dict[str, Any],
+    summary="Get Profile",
+    description="""
+    A profile's request details and the SQL statements the request ran, with
+    their execution count and total time (slowest first).
+    """,
+    responses={
+        200: {"description": "Profile retrieved successfully"},
+        404: {"description": "Profile not found"}
+    }
+)
+def get_profile(profile_id: str):
+    """Get a profile's details"""
+    meta = profiling.load_meta(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return meta
+
+
+@router.get("/{profile_id}/speedscope",
+    summary="Download Flame Graph",
+    description="""
+    The sampled stacks in speedscope's JSON format. Open the file at
+    https://www.speedscope.app to browse it as a flame graph.
+    """,
+    responses={
+        200: {"description": "Speedscope profile"},
+        404: {"description": "Profile not found"}
+    }
+)
+def get_profile_speedscope(profile_id: str):
+    """Download a profile as speedscope JSON"""
+    profile = profiling.load_speedscope(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return JSONResponse(
+        content=profile,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'},
+    )
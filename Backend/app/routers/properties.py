@@ -8,7 +8,9 @@ import logging
 logger = logging.getLogger(__name__)
 
 from ..database import get_db
-from ..models.models import Property as PropertyModel
+from ..replicas import get_read_db
+from ..models.models import Property as PropertyModel, Tombstone as TombstoneModel
+from ..named_statements import PROPERTY_BY_ID, PROPERTY_COUNTS, PROPERTY_PAGES
 from ..schemas.schemas import (
     PropertyCreate,
     PropertyRead,
@@ -103,20 +105,18 @@ def list_properties(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     status: str = Query(None, description="Filter by property status"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Retrieve a paginated list of properties with optional status filter"""
     try:
-        # Build query with optional status filter
-        query = db.query(PropertyModel)
-        if status:
-            query = query.filter(PropertyModel.status == status)
-            
+        # Prebuilt statements (see named_statements.py); the status filter picks the variant
+        filters = {"status": status} if status else {}
+
         # Get total count
-        total = query.count()
+        total = PROPERTY_COUNTS[bool(status)].execute(db, **filters).scalar_one()
         
         # Apply pagination
-        props = query.offset(skip).limit(limit).all()
+        props = PROPERTY_PAGES[bool(status)].execute(db, skip=skip, limit=limit, **filters).scalars().all()
         
         # Convert SQLAlchemy objects to plain dicts with primitive types
         properties = []
@@ -153,6 +153,123 @@ def list_properties(
         )
 
 
+@router.get("/suggested-rents",
+    response_model=Dict[str, Any],
+    summary="Suggest Rents for Vacant Properties",
+    description="""
+    Price every property that is not currently let in one call.
+    
+    Parameters:
+    - k: Number of comparable let units each suggestion is based on
+    
+    Each suggestion is the inverse-distance weighted rent per unit of area of
+    the k most similar let units (bedrooms, bathrooms, area), scaled to the
+    property's area, with the interquartile range of those estimates as low
+    and high. The comparables index is kept in memory and refreshed as
+    properties change.
+    """,
+    responses={
+        200: {"description": "Suggested rents computed successfully"},
+        500: {"description": "Database error"}
+    }
+)
+def suggest_vacant_rents(
+    k: int = Query(10, ge=1, le=100, description="Number of comparables per property"),
+):
+    """Suggest rents for all vacant properties"""
+    from .. import comparables  # NumPy is only loaded once comparables are used
+    try:
+        suggestions = comparables.suggest_vacant_rents(k)
+    except Exception as e:
+        logger.error(f"Error suggesting rents: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error suggesting rents"
+        )
+    return {
+        "suggestions": suggestions,
+        "total": len(suggestions),
+        "k": k
+    }
+
+
+@router.get("/{property_id}/comparables",
+    response_model=Dict[str, Any],
+    summary="Get Comparable Properties",
+    description="""
+    Find the let units most similar to a property.
+    
+    Parameters:
+    - property_id: Unique identifier of the property
+    - k: Number of comparables to return
+    
+    Similarity is a weighted, normalized distance over bedrooms, bathrooms and
+    area (see COMPARABLES_WEIGHTS); features the property lacks are ignored.
+    Comparables are ordered nearest first.
+    """,
+    responses={
+        200: {"description": "Comparables retrieved successfully"},
+        404: {"description": "Property not found"},
+        500: {"description": "Database error"}
+    }
+)
+def get_comparables(
+    property_id: int = Path(..., title="Property ID", description="The ID of the property to compare"),
+    k: int = Query(10, ge=1, le=100, description="Number of comparables to return"),
+):
+    """Return the k nearest let units to a property"""
+    from .. import comparables
+    try:
+        result = comparables.comparables(property_id, k)
+    except Exception as e:
+        logger.error(f"Error finding comparables for property {property_id}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error retrieving comparables"
+        )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Property not found")
+    return result
+
+
+@router.get("/{property_id}/suggested-rent",
+    response_model=Dict[str, Any],
+    summary="Suggest Rent for a Property",
+    description="""
+    Suggest a rent for a property from its k nearest let comparables.
+    
+    Parameters:
+    - property_id: Unique identifier of the property
+    - k: Number of comparables the suggestion is based on
+    
+    Returns the suggested rent, a low/high range and the comparables used.
+    suggested_rent is null when there are no let units to compare with.
+    """,
+    responses={
+        200: {"description": "Suggested rent computed successfully"},
+        404: {"description": "Property not found"},
+        500: {"description": "Database error"}
+    }
+)
+def get_suggested_rent(
+    property_id: int = Path(..., title="Property ID", description="The ID of the property to price"),
+    k: int = Query(10, ge=1, le=100, description="Number of comparables to use"),
+):
+    """Suggest a rent for a property"""
+    from .. import comparables
+    try:
+        result = comparables.suggest_rent(property_id, k)
+    except Exception as e:
+        logger.error(f"Error suggesting rent for property {property_id}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error suggesting rent"
+        )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Property not found")
+    return result
+
+
 @router.get("/{property_id}",
     response_model=PropertyRead,
     summary="Get Property Details",
@@ -172,11 +289,11 @@ def list_properties(
 )
 def get_property(
     property_id: int = Path(..., title="Property ID", description="The ID of the property to retrieve"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Retrieve a specific property by its ID"""
     try:
-        prop = db.query(PropertyModel).filter(PropertyModel.id == property_id).first()
+        prop = PROPERTY_BY_ID.execute(db, id=property_id).scalar_one_or_none()
         if not prop:
             raise HTTPException(status_code=404, detail="Property not found")
             
@@ -214,7 +331,7 @@ def get_property(
     """
 )
 def update_property(property_id: int, payload: PropertyUpdate, db: Session = Depends(get_db)):
-    db_property = db.query(PropertyModel).filter(PropertyModel.id == property_id).first()
+    db_property = PROPERTY_BY_ID.execute(db, id=property_id).scalar_one_or_none()
     if db_property is None:
         raise HTTPException(status_code=404, detail="Property not found")
 
@@ -245,7 +362,7 @@ def update_property(property_id: int, payload: PropertyUpdate, db: Session = Dep
     """
 )
 def patch_property(property_id: int, payload: PropertyPatch, db: Session = Depends(get_db)):
-    db_property = db.query(PropertyModel).filter(PropertyModel.id == property_id).first()
+    db_property = PROPERTY_BY_ID.execute(db, id=property_id).scalar_one_or_none()
     if db_property is None:
         raise HTTPException(status_code=404, detail="Property not found")
 
@@ -271,10 +388,12 @@ def patch_property(property_id: int, payload: PropertyPatch, db: Session = Depen
 
 @router.delete("/{property_id}")
 def delete_property(property_id: int, db: Session = Depends(get_db)):
-    db_property = db.query(PropertyModel).filter(PropertyModel.id == property_id).first()
+    db_property = PROPERTY_BY_ID.execute(db, id=property_id).scalar_one_or_none()
     if db_property is None:
         raise HTTPException(status_code=404, detail="Property not found")
 
     db.delete(db_property)
+    # Tell syncing clients about the delete (same transaction)
+    db.add(TombstoneModel(entity="properties", entity_id=property_id))
     db.commit()
     return {"message": f"Property {property_id} deleted successfully"}
\ No newline at end of file
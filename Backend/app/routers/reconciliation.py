@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from sqlalchemy.orm import Session
+from typing import Dict, Any
+import codecs
+import logging
+
+from ..database import get_db
+from ..schemas.responses import APIError
+from .. import reconciliation
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/reconciliation",
+    tags=["Reconciliation"],
+    responses={500: {"model": APIError, "description": "Internal server error"}},
+)
+
+
+@router.post("/statements",
+    response_model=Dict[str, Any],
+    summary="Reconcile Bank Statement",
+    description="""
+    Upload a bank statement CSV and match its lines against ledger transactions.
+
+    The CSV needs a header row with a date column, a description column and either a
+    signed amount column or separate credit/debit columns. Lines match transactions with
+    the same amount and direction (deposits match payments and income, withdrawals match
+    expenses and refunds) dated within `date_window_days`. The closest date wins; on that
+    date a shared reference number (unit, cheque or invoice) and then the most similar
+    description pick the transaction. Charges (rent, fees), credits and write-offs are not
+    bank movements and are never matched.
+
+    Parameters:
+    - file: The statement CSV (UTF-8)
+    - date_window_days: Maximum days between statement and ledger dates
+    - min_similarity: Minimum description similarity (0-1) required for a match
+
+    Returns the matches plus unmatched statement lines and unmatched ledger transactions
+    for the statement period.
+    """,
+    responses={
+        200: {"description": "Statement reconciled"},
+        400: {"description": "Statement could not be parsed"}
+    }
+)
+def reconcile_statement(
+    file: UploadFile = File(..., description="Bank statement CSV"),
+    date_window_days: int = Query(reconciliation.RECONCILE_DATE_WINDOW, ge=0, le=31,
+                                  description="Maximum days between statement and ledger dates"),
+    min_similarity: float = Query(reconciliation.RECONCILE_MIN_SIMILARITY, ge=0, le=1,
+                                  description="Minimum description similarity for a match"),
+    db: Session = Depends(get_db)
+):
+    """Match a bank statement against the ledger and report differences"""
+    # Decode while reading so the upload is parsed row by row from its spool file
+    stream = codecs.getreader("utf-8-sig")(file.file, errors="replace")
+    try:
+        return reconciliation.reconcile(db, stream, date_window_days, min_similarity)
+    except reconciliation.StatementError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reconciling statement {file.filename}: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error reconciling statement"
+        )
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, Any
+import logging
+import time
+
+from ..schemas.responses import APIError
+from .. import search_index
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"],
+    responses={500: {"model": APIError, "description": "Internal server error"}},
+)
+
+
+@router.get("/suggest",
+    response_model=Dict[str, Any],
+    summary="Typeahead Suggestions",
+    description="""
+    Suggest properties and tenants as the user types.
+    
+    Parameters:
+    - q: What has been typed so far; every word must start a word of an
+      address, tenant name or email, or the digits of a phone number
+    - limit: Maximum number of suggestions
+    - type: Optional restriction to "property" or "tenant"
+    
+    Answered from an in-memory prefix index (see search_index.py) that is built
+    at startup and follows writes through the change feed, so typing never
+    queries the database. Suggestions are ranked by where the words matched:
+    whole-word and leading matches (house number, first name) first, names and
+    addresses before emails and phones.
+    """,
+    responses={
+        200: {"description": "Suggestions retrieved successfully"},
+        500: {"description": "Database error"}
+    }
+)
+def suggest(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+    type: str = Query(None, pattern="^(property|tenant)$", description="Only suggest properties or tenants"),
+):
+    """Return ranked property and tenant suggestions for a prefix"""
+    started = time.perf_counter()
+    terms = search_index.query_terms(q)
+    if not terms:
+        return {"query": q, "results": [], "took_ms": 0.0}
+    try:
+        # Only builds when this customer has never been indexed
+        idx = search_index.index()
+    except Exception as e:
+        logger.error(f"Error building search index: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error retrieving suggestions"
+        )
+    results = idx.suggest(terms, limit, type)
+    return {
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
@@ -0,0 +1,144 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, status
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from typing import Dict, Any
+from datetime import date
+import importlib.util
+import logging
+
+from ..database import get_db
+from ..models.models import StatementJob as StatementJobModel, File as FileModel
+from ..schemas.responses import APIError
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/statements",
+    tags=["Statements"],
+    responses={500: {"model": APIError, "description": "Internal server error"}},
+)
+
+
+class StatementJobCreate(BaseModel):
+    period_start: date
+    period_end: date
+    format: str = Field(default="html", description="html, or pdf when WeasyPrint is installed")
+
+
+@router.post("/jobs",
+    response_model=Dict[str, Any],
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Generate Statements",
+    description="""
+    Start generating a statement for every tenant with an active lease.
+
+    Parameters:
+    - period_start / period_end: Billing period (inclusive)
+    - format: `html` (default) or `pdf` (requires WeasyPrint on the server)
+
+    Returns the job immediately; poll `GET /statements/jobs/{job_id}` for progress.
+    Rendered statements are stored as files linked to the tenant and the job.
+    """,
+    responses={
+        202: {"description": "Job accepted"},
+        400: {"description": "Invalid period or unsupported format"}
+    }
+)
+def create_statement_job(payload: StatementJobCreate, db: Session = Depends(get_db)):
+    """Queue a statement generation job"""
+    from .. import statements  # the job engine (process pool, renderer) is only loaded once statements are used
+    if payload.period_end < payload.period_start:
+        raise HTTPException(status_code=400, detail="period_end is before period_start")
+    if payload.format not in statements.STATEMENT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{payload.format}'")
+    if payload.format == "pdf" and importlib.util.find_spec("weasyprint") is None:
+        raise HTTPException(status_code=400, detail="PDF output requires WeasyPrint, which is not installed")
+
+    job = StatementJobModel(
+        period_start=payload.period_start,
+        period_end=payload.period_end,
+        file_format=payload.format,
+        status="pending",
+        total=0,
+        completed=0,
+        failed=0,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    statements.submit_job(job.id)
+    return statements.job_as_dict(job)
+
+
+@router.get("/jobs/{job_id}",
+    response_model=Dict[str, Any],
+    summary="Statement Job Status",
+    description="""
+    Progress of a statement job: status (pending, running, completed,
+    completed_with_errors, failed) and rendered/failed counts out of the total.
+    """,
+    responses={
+        200: {"description": "Job status retrieved successfully"},
+        404: {"description": "Job not found"}
+    }
+)
+def get_statement_job(
+    job_id: int = Path(..., title="Job ID", description="The ID of the statement job"),
+    db: Session = Depends(get_db)
+):
+    """Return a statement job's status"""
+    from .. import statements
+    job = db.get(StatementJobModel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Statement job not found")
+    return statements.job_as_dict(job)
+
+
+@router.get("/jobs/{job_id}/files",
+    response_model=Dict[str, Any],
+    summary="Statement Job Files",
+    description="""
+    Files produced by a statement job, paginated.
+
+    Parameters:
+    - skip: Number of records to skip (pagination offset)
+    - limit: Maximum number of records to return
+    """,
+    responses={
+        200: {"description": "Files retrieved successfully"},
+        404: {"description": "Job not found"}
+    }
+)
+def list_statement_files(
+    job_id: int = Path(..., title="Job ID", description="The ID of the statement job"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    db: Session = Depends(get_db)
+):
+    """List the files a statement job produced"""
+    if db.get(StatementJobModel, job_id) is None:
+        raise HTTPException(status_code=404, detail="Statement job not found")
+    query = db.query(FileModel).filter(FileModel.statement_job_id == job_id)
+    total = query.count()
+    files = query.order_by(FileModel.id).offset(skip).limit(limit).all()
+    return {
+        "files": [
+            {
+                "id": f.id,
+                "tenant_id": f.tenant_id,
+                "property_id": f.property_id,
+                "file_name": f.file_name,
+                "file_path": f.file_path,
+                "file_type": f.file_type,
+                "uploaded_at": f.uploaded_at.isoformat() if f.uploaded_at else None,
+            }
+            for f in files
+        ],
+        "total": total,
+        "page_info": {
+            "skip": skip,
+            "limit": limit,
+            "has_more": (skip + limit) < total
+        }
+    }
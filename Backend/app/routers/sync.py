@@ -0,0 +1,210 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Optional
+from datetime import datetime, timedelta, timezone
+import base64
+import binascii
+import logging
+import os
+
+from ..database import get_db
+from ..models.models import (
+    Property as PropertyModel,
+    Tenant as TenantModel,
+    Lease as LeaseModel,
+    Transaction as TransactionModel,
+    MaintenanceRequest as MaintenanceRequestModel,
+    Tombstone as TombstoneModel,
+)
+from ..schemas.responses import APIError
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Rows are stamped with the writing transaction's start time, so a row can
+# become visible after a sync that already read past its timestamp. Every
+# delta therefore re-reads this many seconds before the token; clients upsert
+# by id, so the overlap only costs a few duplicates.
+SYNC_OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS", "30"))
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"],
+    responses={500: {"model": APIError, "description": "Internal server error"}},
+)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _money(value):
+    return str(value) if value is not None else None
+
+
+def _property(p):
+    return {
+        "id": p.id,
+        "address": p.address,
+        "bedrooms": p.bedrooms,
+        "bathrooms": p.bathrooms,
+        "area": p.area,
+        "rent_amount": _money(p.rent_amount),
+        "status": p.status,
+        "amenities": p.amenities,
+        "notes": p.notes,
+        "created_at": _iso(p.created_at),
+        "updated_at": _iso(p.updated_at),
+    }
+
+
+def _tenant(t):
+    return {
+        "id": t.id,
+        "first_name": t.first_name,
+        "last_name": t.last_name,
+        "email": t.email,
+        "phone": t.phone,
+        "status": t.status,
+        "created_at": _iso(t.created_at),
+        "updated_at": _iso(t.updated_at),
+    }
+
+
+def _lease(lease):
+    return {
+        "id": lease.id,
+        "property_id": lease.property_id,
+        "tenant_id": lease.tenant_id,
+        "start_date": _iso(lease.start_date),
+        "end_date": _iso(lease.end_date),
+        "rent_amount": _money(lease.rent_amount),
+        "status": lease.status,
+        "created_at": _iso(lease.created_at),
+        "updated_at": _iso(lease.updated_at),
+    }
+
+
+def _transaction(tx):
+    return {
+        "id": tx.id,
+        "property_id": tx.property_id,
+        "tenant_id": tx.tenant_id,
+        "lease_id": tx.lease_id,
+        "type": tx.type,
+        "amount": _money(tx.amount),
+        "description": tx.description,
+        "date": _iso(tx.date),
+        "created_at": _iso(tx.created_at),
+        "updated_at": _iso(tx.updated_at),
+    }
+
+
+def _maintenance_request(m):
+    return {
+        "id": m.id,
+        "property_id": m.property_id,
+        "tenant_id": m.tenant_id,
+        "description": m.description,
+        "status": m.status,
+        "created_at": _iso(m.created_at),
+        "completed_at": _iso(m.completed_at),
+        "updated_at": _iso(m.updated_at),
+    }
+
+
+# Collection name -> (model, serializer); the names are also the tombstone entities
+COLLECTIONS = {
+    "properties": (PropertyModel, _property),
+    "tenants": (TenantModel, _tenant),
+    "leases": (LeaseModel, _lease),
+    "transactions": (TransactionModel, _transaction),
+    "maintenance_requests": (MaintenanceRequestModel, _maintenance_request),
+}
+
+
+def encode_token(moment: datetime) -> str:
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip("=")
+
+
+def decode_token(token: str) -> datetime:
+    """Parse a sync token; raises ValueError when it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+    moment = datetime.fromisoformat(raw)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+@router.get("",
+    response_model=Dict[str, Any],
+    summary="Delta Sync",
+    description="""
+    Return everything that changed since a previous sync, in one response.
+
+    Parameters:
+    - since: `next_token` from the previous response; omit it for a full snapshot
+
+    Returns a dictionary containing:
+    - properties, tenants, leases, transactions, maintenance_requests: rows created
+      or updated since the token (clients upsert them by id)
+    - deleted: ids removed since the token, per collection
+    - next_token: pass this as `since` on the next call
+    - full: true when the response is a full snapshot rather than a delta
+
+    A delta may repeat a few rows from the previous response; applying it is idempotent.
+    """,
+    responses={
+        200: {"description": "Changes retrieved successfully"},
+        400: {"description": "Malformed sync token"},
+        500: {"description": "Database error"}
+    }
+)
+def sync_changes(
+    since: Optional[str] = Query(None, description="Token returned by the previous sync"),
+    db: Session = Depends(get_db)
+):
+    """Return rows changed and deleted since the given sync token"""
+    cutoff = None
+    if since:
+        try:
+            cutoff = decode_token(since) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid sync token")
+
+    try:
+        # Taken before reading, so nothing committed from here on is missed next time
+        server_now = db.scalar(select(func.now()))
+        if server_now.tzinfo is None:
+            server_now = server_now.replace(tzinfo=timezone.utc)
+
+        result: Dict[str, Any] = {}
+        for name, (model, serialize) in COLLECTIONS.items():
+            query = db.query(model)
+            if cutoff is not None:
+                query = query.filter(model.updated_at >= cutoff)
+            result[name] = [serialize(row) for row in query.order_by(model.id).all()]
+
+        deleted = {name: [] for name in COLLECTIONS}
+        if cutoff is not None:
+            tombstones = (
+                db.query(TombstoneModel.entity, TombstoneModel.entity_id)
+                .filter(TombstoneModel.deleted_at >= cutoff)
+                .all()
+            )
+            for entity, entity_id in tombstones:
+                if entity in deleted:
+                    deleted[entity].append(entity_id)
+
+        result["deleted"] = deleted
+        result["next_token"] = encode_token(server_now)
+        result["full"] = cutoff is None
+        return result
+    except Exception as e:
+        logger.error(f"Error computing sync delta: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Error retrieving changes"
+        )
@@ -5,9 +5,12 @@ from datetime import datetime
 import logging
 
 from ..database import get_db
-from ..models.models import Tenant as TenantModel, Property as PropertyModel, Lease as LeaseModel
+from ..replicas import get_read_db
+from ..models.models import Tenant as TenantModel, Property as PropertyModel, Lease as LeaseModel, Tombstone as TombstoneModel
+from ..named_statements import PROPERTY_BY_ID, TENANT_BY_ID, TENANT_COUNTS, TENANT_PAGES
 from ..schemas.schemas import TenantCreate, TenantRead, TenantPatch
 from ..schemas.responses import APIError
+from ..lease_scanner import default_end_date
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -97,29 +100,23 @@ def list_tenants(
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     status: str = Query(None, description="Filter by tenant status"),
     search: str = Query(None, description="Search by name or email"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Retrieve a paginated list of tenants with optional filters"""
     try:
-        # Build base query
-        query = db.query(TenantModel)
-        
-        # Apply filters
+        # Prebuilt statements (see named_statements.py); the filters given pick the variant
+        filters = {}
         if status:
-            query = query.filter(TenantModel.status == status)
+            filters["status"] = status
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                (TenantModel.first_name.ilike(search_term)) |
-                (TenantModel.last_name.ilike(search_term)) |
-                (TenantModel.email.ilike(search_term))
-            )
+            filters["pattern"] = f"%{search}%"
+        variant = (bool(status), bool(search))
             
         # Get total count
-        total = query.count()
+        total = TENANT_COUNTS[variant].execute(db, **filters).scalar_one()
         
         # Apply pagination
-        tenants = query.offset(skip).limit(limit).all()
+        tenants = TENANT_PAGES[variant].execute(db, skip=skip, limit=limit, **filters).scalars().all()
         
         # Convert SQLAlchemy objects to dicts with primitive types
         tenant_list = []
@@ -174,11 +171,11 @@ def list_tenants(
 )
 def get_tenant(
     tenant_id: int = Path(..., title="Tenant ID", description="The ID of the tenant to retrieve"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Retrieve a specific tenant by their ID"""
     try:
-        t = db.query(TenantModel).filter(TenantModel.id == tenant_id).first()
+        t = TENANT_BY_ID.execute(db, id=tenant_id).scalar_one_or_none()
         if not t:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -205,7 +202,7 @@ def get_tenant(
 
 @router.put("/{tenant_id}", response_model=TenantRead)
 def update_tenant(tenant_id: int, payload: TenantCreate, db: Session = Depends(get_db)):
-    db_tenant = db.query(TenantModel).filter(TenantModel.id == tenant_id).first()
+    db_tenant = TENANT_BY_ID.execute(db, id=tenant_id).scalar_one_or_none()
     if db_tenant is None:
         raise HTTPException(status_code=404, detail="Tenant not found")
 
@@ -227,7 +224,7 @@ def update_tenant(tenant_id: int, payload: TenantCreate, db: Session = Depends(g
 
 @router.patch("/{tenant_id}", response_model=TenantRead)
 def patch_tenant(tenant_id: int, payload: TenantPatch, db: Session = Depends(get_db)):
-    db_tenant = db.query(TenantModel).filter(TenantModel.id == tenant_id).first()
+    db_tenant = TENANT_BY_ID.execute(db, id=tenant_id).scalar_one_or_none()
     if db_tenant is None:
         raise HTTPException(status_code=404, detail="Tenant not found")
 
@@ -250,11 +247,13 @@ def patch_tenant(tenant_id: int, payload: TenantPatch, db: Session = Depends(get
 
 @router.delete("/{tenant_id}")
 def delete_tenant(tenant_id: int, db: Session = Depends(get_db)):
-    db_tenant = db.query(TenantModel).filter(TenantModel.id == tenant_id).first()
+    db_tenant = TENANT_BY_ID.execute(db, id=tenant_id).scalar_one_or_none()
     if db_tenant is None:
         raise HTTPException(status_code=404, detail="Tenant not found")
 
     db.delete(db_tenant)
+    # Tell syncing clients about the delete (same transaction)
+    db.add(TombstoneModel(entity="tenants", entity_id=tenant_id))
     db.commit()
     return {"message": f"Tenant {tenant_id} deleted successfully"}
 
@@ -267,10 +266,10 @@ def approve_and_assign_tenant(
 ):
     """Approve an applicant tenant, create an active lease, and mark property rented.
     Returns updated tenant data including property assignment."""
-    tenant = db.query(TenantModel).filter(TenantModel.id == tenant_id).first()
+    tenant = TENANT_BY_ID.execute(db, id=tenant_id).scalar_one_or_none()
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
-    prop = db.query(PropertyModel).filter(PropertyModel.id == property_id).first()
+    prop = PROPERTY_BY_ID.execute(db, id=property_id).scalar_one_or_none()
     if not prop:
         raise HTTPException(status_code=404, detail="Property not found")
 
@@ -288,7 +287,7 @@ def approve_and_assign_tenant(
         property_id=prop.id,
         tenant_id=tenant.id,
         start_date=datetime.utcnow().date(),
-        end_date=None,
+        end_date=default_end_date(datetime.utcnow().date()),
         rent_amount=prop.rent_amount,
         status="active"
     )
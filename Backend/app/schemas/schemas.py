@@ -3,6 +3,7 @@ from pydantic import ConfigDict
 from typing import Optional
 from decimal import Decimal
 from datetime import datetime
+import datetime as dt
 
 
 class PropertyBase(BaseModel):
@@ -75,3 +76,52 @@ class TenantRead(TenantBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+
+class TransactionCreate(BaseModel):
+    tenant_id: Optional[int] = None
+    lease_id: Optional[int] = None
+    property_id: Optional[int] = None
+    type: str = Field(description="charge, rent, fee, late_fee, deposit, payment, credit, ... or income/expense")
+    amount: Decimal = Field(gt=0, decimal_places=2)
+    description: Optional[str] = None
+    date: Optional[dt.date] = None
+
+
+class TransactionRead(BaseModel):
+    id: int
+    tenant_id: Optional[int] = None
+    lease_id: Optional[int] = None
+    property_id: Optional[int] = None
+    type: Optional[str] = None
+    amount: Optional[Decimal] = None
+    description: Optional[str] = None
+    date: Optional[dt.date] = None
+    created_at: Optional[datetime]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserCreate(BaseModel):
+    email: str = Field(min_length=3, max_length=255)
+    password: str = Field(min_length=8, max_length=72, description="bcrypt uses at most 72 bytes")
+    full_name: Optional[str] = None
+    role: str = Field(default="manager", description="admin, manager or tenant")
+    tenant_id: Optional[int] = None
+
+
+class UserRead(BaseModel):
+    id: int
+    email: str
+    full_name: Optional[str] = None
+    role: str
+    tenant_id: Optional[int] = None
+    is_active: bool
+    created_at: Optional[datetime]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int = Field(description="Seconds until the token expires")
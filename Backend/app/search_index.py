@@ -0,0 +1,412 @@
+"""In-memory prefix index for typeahead search (/search/suggest).
+
+Property addresses and tenant names, emails and phones are split into
+lowercase, accent-folded tokens (a phone also as its digits, an email also
+whole), and all (token, document) pairs are kept sorted. A query term's
+matches are the entries from bisect_left(term) onwards that start with it,
+so a suggestion is a few bisects and a scan of at most SEARCH_SCAN_LIMIT
+entries (of the requested type), answered from memory without a database
+round trip: well under a millisecond with 100k properties and 100k tenants.
+
+The scan limit truncates: it takes the first SEARCH_SCAN_LIMIT entries in
+token order and ranks only those. Exact token matches sort first and are
+seen first, but for a short, common prefix a better-weighted longer token
+past the limit is missed until the user types more of it.
+
+Each worker builds the index of every customer schema at startup from a
+streamed query, off the event loop; a customer added later is indexed on
+its first search. Writes reach the index through the change feed: a
+background task reloads just the changed properties and tenants and updates
+the index, usually within milliseconds of the commit. A change feed resync
+rebuilds it.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from . import tenancy
+from .changefeed import hub
+from .database import SessionLocal
+from .models.models import Property as PropertyModel, Tenant as TenantModel
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "True").lower() == "true"
+SEARCH_BUILD_BATCH = int(os.getenv("SEARCH_BUILD_BATCH", "5000"))
+# Index entries a query looks at, in token order; bounds the cost of one- or
+# two-letter queries, which therefore rank only the first matches (see above)
+SEARCH_SCAN_LIMIT = int(os.getenv("SEARCH_SCAN_LIMIT", "500"))
+# Change batches larger than this are merged by re-sorting instead of inserted one by one
+SEARCH_MERGE_THRESHOLD = int(os.getenv("SEARCH_MERGE_THRESHOLD", "200"))
+
+ENTITIES = {"properties": "property", "tenants": "tenant"}
+KINDS = ("property", "tenant")
+
+# Token weights used for ranking; the first token of a field (house number,
+# first name) gets one more, a term equal to a whole token two more
+ADDRESS_WEIGHT = 3
+NAME_WEIGHT = 3
+EMAIL_WEIGHT = 2
+PHONE_WEIGHT = 2
+EXACT_BONUS = 2
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_PHONE_RE = re.compile(r"\+?[\d(][\d().\s-]*")
+_EMAIL_LIKE_RE = re.compile(r"@|\w\.\w")
+_MAX_CHAR = chr(0x10FFFF)  # term + _MAX_CHAR sorts after every token starting with term
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents, so "José" matches "jose"."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _digits(text: str) -> str:
+    return "".join(c for c in text if c.isdigit())
+
+
+def query_terms(q: str) -> List[str]:
+    """Split a query the way documents are tokenized."""
+    q = _fold(q).strip()
+    if _PHONE_RE.fullmatch(q):
+        # "555 123" is one phone number, not two words
+        return [_digits(q)]
+    terms = []
+    for raw in q.split():
+        if _PHONE_RE.fullmatch(raw):
+            terms.append(_digits(raw))
+        elif _EMAIL_LIKE_RE.search(raw):
+            # Matched against whole emails
+            terms.append(raw.strip(".,;:'\"()<>"))
+        else:
+            terms.extend(_WORD_RE.findall(raw))
+    return [t for t in terms if t]
+
+
+class Document(NamedTuple):
+    kind: str
+    id: int
+    label: str
+    detail: Optional[str]
+    tokens: Dict[str, int]  # token -> weight
+
+
+def _add_tokens(tokens: Dict[str, int], words: Iterable[str], weight: int) -> None:
+    for i, word in enumerate(words):
+        word = sys.intern(word)  # the same words recur across thousands of rows
+        value = weight + 1 if i == 0 else weight
+        if tokens.get(word, 0) < value:
+            tokens[word] = value
+
+
+def property_document(id: int, address: Optional[str], status: Optional[str]) -> Document:
+    tokens: Dict[str, int] = {}
+    _add_tokens(tokens, _WORD_RE.findall(_fold(address or "")), ADDRESS_WEIGHT)
+    return Document("property", id, address or "", status, tokens)
+
+
+def tenant_document(id: int, first_name: Optional[str], last_name: Optional[str],
+                    email: Optional[str], phone: Optional[str]) -> Document:
+    name = " ".join(part for part in (first_name, last_name) if part)
+    tokens: Dict[str, int] = {}
+    _add_tokens(tokens, _WORD_RE.findall(_fold(name)), NAME_WEIGHT)
+    if email:
+        email = _fold(email.strip())
+        tokens.setdefault(email, EMAIL_WEIGHT)
+        _add_tokens(tokens, _WORD_RE.findall(email.split("@", 1)[0]), EMAIL_WEIGHT)
+    digits = _digits(phone or "")
+    if len(digits) >= 3:
+        tokens.setdefault(digits, PHONE_WEIGHT)
+    return Document("tenant", id, name or email or "", email or phone, tokens)
+
+
+def _ref(kind: str, id: int) -> int:
+    # Entries for one token are ordered by id, properties and tenants interleaved
+    return id * 2 + KINDS.index(kind)
+
+
+def _property_rows(db, ids=None):
+    query = select(PropertyModel.id, PropertyModel.address, PropertyModel.status)
+    if ids is not None:
+        query = query.where(PropertyModel.id.in_(ids))
+    return db.execute(query.execution_options(yield_per=SEARCH_BUILD_BATCH))
+
+
+def _tenant_rows(db, ids=None):
+    query = select(TenantModel.id, TenantModel.first_name, TenantModel.last_name, TenantModel.email, TenantModel.phone)
+    if ids is not None:
+        query = query.where(TenantModel.id.in_(ids))
+    return db.execute(query.execution_options(yield_per=SEARCH_BUILD_BATCH))
+
+
+def _best(doc: Document, term: str) -> Optional[int]:
+    """Weight of the best token of doc that term is a prefix of."""
+    weight = doc.tokens.get(term)
+    if weight is not None:
+        return weight + EXACT_BONUS
+    best = None
+    for token, weight in doc.tokens.items():
+        if token.startswith(term) and (best is None or weight > best):
+            best = weight
+    return best
+
+
+class SearchIndex:
+    """Sorted tokens with the documents they belong to, for one customer schema.
+
+    keys[i] is a token and refs[i] the document (see _ref) it came from;
+    entries are sorted by (token, ref).
+    """
+
+    def __init__(self, schema: Optional[str]):
+        self.schema = schema
+        self.keys: List[str] = []
+        self.refs: List[int] = []
+        self.docs: Dict[int, Document] = {}
+        self.built = False
+        self.stale = False
+        self.pending: Set[Tuple[str, int]] = set()
+        self.lock = threading.Lock()         # keys, refs and docs
+        self.update_lock = threading.Lock()  # one build or update at a time
+
+    def ensure_built(self) -> None:
+        if not self.built:
+            with self.update_lock:
+                if not self.built:
+                    self._build()
+
+    def rebuild(self) -> None:
+        with self.update_lock:
+            self._build()
+
+    def _build(self) -> None:
+        started = time.perf_counter()
+        # Changes from here on are applied after the build
+        self.stale, self.pending = False, set()
+        docs = {}
+        with tenancy.use_schema(self.schema), SessionLocal() as db:
+            for rows in _property_rows(db).partitions():
+                for row in rows:
+                    docs[_ref("property", row.id)] = property_document(*row)
+            for rows in _tenant_rows(db).partitions():
+                for row in rows:
+                    docs[_ref("tenant", row.id)] = tenant_document(*row)
+        keys, refs = _sorted_entries(docs)
+        with self.lock:
+            self.keys, self.refs, self.docs = keys, refs, docs
+        self.built = True
+        logger.info(
+            f"Built search index for {self.schema or 'default schema'}: {len(docs)} documents, "
+            f"{len(keys)} tokens in {(time.perf_counter() - started) * 1000:.2f}ms"
+        )
+
+    def apply_pending(self) -> None:
+        """Reload the changed rows and update their entries."""
+        with self.update_lock:
+            changed, self.pending = self.pending, set()
+            if not changed or not self.built:
+                return
+            ids = {kind: [id for k, id in changed if k == kind] for kind in KINDS}
+            docs = {}
+            with tenancy.use_schema(self.schema), SessionLocal() as db:
+                if ids["property"]:
+                    docs.update((_ref("property", r.id), property_document(*r)) for r in _property_rows(db, ids["property"]))
+                if ids["tenant"]:
+                    docs.update((_ref("tenant", r.id), tenant_document(*r)) for r in _tenant_rows(db, ids["tenant"]))
+            refs = {_ref(kind, id) for kind, id in changed}
+
+            if len(refs) > SEARCH_MERGE_THRESHOLD:
+                # Cheaper than thousands of list insertions: filter, append and re-sort
+                # (only this thread modifies the index, so reading it unlocked is safe)
+                kept = [(key, ref) for key, ref in zip(self.keys, self.refs) if ref not in refs]
+                kept += [(token, ref) for ref, doc in docs.items() for token in doc.tokens]
+                kept.sort()
+                new_docs = {ref: doc for ref, doc in self.docs.items() if ref not in refs}
+                new_docs.update(docs)
+                keys, entry_refs = [k for k, _ in kept], [r for _, r in kept]
+                with self.lock:
+                    self.keys, self.refs, self.docs = keys, entry_refs, new_docs
+                return
+
+            with self.lock:
+                for ref in refs:
+                    self._remove(ref)
+                    if ref in docs:
+                        self._add(ref, docs[ref])
+
+    def _span(self, token: str, lo: int = 0) -> Tuple[int, int]:
+        lo = bisect_left(self.keys, token, lo)
+        return lo, bisect_right(self.keys, token, lo)
+
+    def _add(self, ref: int, doc: Document) -> None:
+        self.docs[ref] = doc
+        for token in doc.tokens:
+            lo, hi = self._span(token)
+            i = bisect_left(self.refs, ref, lo, hi)
+            self.keys.insert(i, token)
+            self.refs.insert(i, ref)
+
+    def _remove(self, ref: int) -> None:
+        doc = self.docs.pop(ref, None)
+        if doc is None:
+            return
+        for token in doc.tokens:
+            lo, hi = self._span(token)
+            i = bisect_left(self.refs, ref, lo, hi)
+            if i < hi and self.refs[i] == ref:
+                del self.keys[i]
+                del self.refs[i]
+
+    def suggest(self, terms: List[str], limit: int, kind: Optional[str] = None) -> List[dict]:
+        """Documents matching every term (by prefix), best first."""
+        # Filtered in the scan, so SEARCH_SCAN_LIMIT counts only entries of the wanted kind
+        parity = None if kind is None else KINDS.index(kind)
+        matched: Dict[int, Tuple[int, Document]] = {}
+        with self.lock:
+            keys, refs, docs = self.keys, self.refs, self.docs
+            # Scan the term with the fewest matches; the others are checked per document
+            spans = [(bisect_left(keys, term), bisect_left(keys, term + _MAX_CHAR), term) for term in terms]
+            lo, hi, primary = min(spans, key=lambda span: span[1] - span[0])
+            others = [term for term in terms if term is not primary]
+            scanned = 0
+            for i in range(lo, hi):
+                ref = refs[i]
+                if parity is not None and ref % 2 != parity:
+                    continue
+                scanned += 1
+                if scanned > SEARCH_SCAN_LIMIT:
+                    break
+                # Documents are taken while locked: _remove may drop them from docs right after
+                doc = docs[ref]
+                weight = doc.tokens[keys[i]]
+                if keys[i] == primary:
+                    weight += EXACT_BONUS
+                if ref not in matched or weight > matched[ref][0]:
+                    matched[ref] = (weight, doc)
+
+        ranked = []
+        for ref, (score, doc) in matched.items():
+            for term in others:
+                best = _best(doc, term)
+                if best is None:
+                    break
+                score += best
+            else:
+                ranked.append((-score, len(doc.label), doc.label, ref))
+        return [
+            {"type": doc.kind, "id": doc.id, "label": doc.label, "detail": doc.detail, "score": -score}
+            for score, _, _, ref in heapq.nsmallest(limit, ranked)
+            for doc in (matched[ref][1],)
+        ]
+
+    def size(self) -> int:
+        return len(self.keys)
+
+
+def _sorted_entries(docs: Dict[int, Document]) -> Tuple[List[str], List[int]]:
+    entries = sorted((token, ref) for ref, doc in docs.items() for token in doc.tokens)
+    return [key for key, _ in entries], [ref for _, ref in entries]
+
+
+_indexes: Dict[Optional[str], SearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def index(schema: Optional[str] = None) -> SearchIndex:
+    """The index of the given (default: the current) customer schema, built on first use."""
+    schema = schema if schema is not None else tenancy.current_schema()
+    idx = _indexes.get(schema)
+    if idx is None:
+        with _indexes_lock:
+            idx = _indexes.setdefault(schema, SearchIndex(schema))
+    idx.ensure_built()
+    if _task is None:
+        # No background task (e.g. scripts and tests without startup)
+        if idx.stale:
+            idx.rebuild()
+        elif idx.pending:
+            idx.apply_pending()
+    return idx
+
+
+def build_all() -> None:
+    for schema in tenancy.all_schemas():
+        index(schema)
+
+
+def _on_changes(changes) -> None:
+    if changes is None:
+        # Rebuilt in the background; searches use the current entries meanwhile
+        for idx in list(_indexes.values()):
+            idx.stale = True
+    else:
+        keys = [(ENTITIES[entity], id) for entity, id, _ in changes if entity in ENTITIES]
+        if not keys:
+            return
+        # Callbacks don't say which customer changed; ids are marked in every index
+        for idx in list(_indexes.values()):
+            idx.pending.update(keys)
+    if _wake is not None:
+        _wake.set()
+
+
+hub.add_callback(_on_changes)
+
+
+# --- background updates -----------------------------------------------------
+
+async def _loop() -> None:
+    try:
+        await asyncio.to_thread(build_all)
+    except Exception:
+        logger.exception("Search index build failed; indexes are built on first use")
+    while True:
+        await _wake.wait()
+        _wake.clear()
+        for idx in list(_indexes.values()):
+            try:
+                if idx.stale:
+                    await asyncio.to_thread(idx.rebuild)
+                elif idx.pending:
+                    await asyncio.to_thread(idx.apply_pending)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Search index update failed for {idx.schema or 'default schema'}")
+
+
+_task: Optional[asyncio.Task] = None
+_wake: Optional[asyncio.Event] = None
+
+
+def start() -> None:
+    global _task, _wake
+    if SEARCH_INDEX_ENABLED and _task is None:
+        _wake = asyncio.Event()
+        _task = asyncio.get_running_loop().create_task(_loop())
+
+
+async def stop() -> None:
+    global _task, _wake
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = _wake = None
@@ -0,0 +1,90 @@
+"""Render tenant statements to files.
+
+Runs inside the statement process pool, so it only depends on the standard
+library (plus WeasyPrint when PDF output is requested): spawned workers
+import this module, not the web application, its engine or its metrics.
+Statement data arrives as plain dicts built by app.statements.
+"""
+import html
+import os
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+_STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; font-size: 12px; color: #222; margin: 32px; }
+h1 { font-size: 20px; margin: 0 0 4px; }
+table { border-collapse: collapse; width: 100%; margin-top: 16px; }
+th, td { padding: 4px 6px; border-bottom: 1px solid #ddd; text-align: left; }
+td.amount, th.amount { text-align: right; }
+.summary td { border: none; }
+.total { font-weight: bold; }
+"""
+
+
+def _money(value) -> str:
+    return f"${Decimal(value):,.2f}"
+
+
+def render_html(statement: Dict) -> str:
+    e = html.escape
+    rows = []
+    for tx in statement["transactions"]:
+        rows.append(
+            f"<tr><td>{e(tx['date'])}</td><td>{e(tx['type'] or '')}</td>"
+            f"<td>{e(tx['description'] or '')}</td>"
+            f"<td class=\"amount\">{_money(tx['charge']) if tx['charge'] else ''}</td>"
+            f"<td class=\"amount\">{_money(tx['payment']) if tx['payment'] else ''}</td></tr>"
+        )
+    if not rows:
+        rows.append("<tr><td colspan=\"5\">No activity this period.</td></tr>")
+    tenant = statement["tenant"]
+    summary = statement["summary"]
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Statement {e(statement['period_start'])} - {e(statement['period_end'])}</title>
+<style>{_STYLE}</style></head>
+<body>
+<h1>Tenant Statement</h1>
+<div>{e(tenant['name'])}<br>{'<br>'.join(e(address) for address in statement['addresses'])}</div>
+<div>Period: {e(statement['period_start'])} to {e(statement['period_end'])}</div>
+<table class="summary">
+<tr><td>Opening balance</td><td class="amount">{_money(summary['opening_balance'])}</td></tr>
+<tr><td>Charges</td><td class="amount">{_money(summary['charges'])}</td></tr>
+<tr><td>Late fees</td><td class="amount">{_money(summary['late_fees'])}</td></tr>
+<tr><td>Payments and credits</td><td class="amount">-{_money(summary['payments'])}</td></tr>
+<tr class="total"><td>Balance due</td><td class="amount">{_money(summary['closing_balance'])}</td></tr>
+</table>
+<table>
+<tr><th>Date</th><th>Type</th><th>Description</th><th class="amount">Charge</th><th class="amount">Payment</th></tr>
+{''.join(rows)}
+</table>
+</body></html>
+"""
+
+
+def statement_file_name(statement: Dict, file_format: str) -> str:
+    return f"statement_{statement['period_end']}_tenant{statement['tenant']['id']}.{file_format}"
+
+
+def render_chunk(statements: List[Dict], output_dir: str, file_format: str) -> List[Tuple[int, Optional[int], Optional[str], Optional[str]]]:
+    """Render and write a batch of statements.
+
+    Returns (tenant_id, property_id, path, error) per statement; only the ids
+    travel back to the parent process.
+    """
+    if file_format == "pdf":
+        from weasyprint import HTML  # optional dependency, only needed for PDF output
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    for statement in statements:
+        path = os.path.join(output_dir, statement_file_name(statement, file_format))
+        try:
+            document = render_html(statement)
+            if file_format == "pdf":
+                HTML(string=document).write_pdf(path)
+            else:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(document)
+            results.append((statement["tenant"]["id"], statement["property_id"], path, None))
+        except Exception as e:
+            results.append((statement["tenant"]["id"], statement["property_id"], None, str(e)))
+    return results
@@ -0,0 +1,229 @@
+"""Month-end tenant statements, generated as background jobs.
+
+A job gathers everything for the billing period in three set-based queries
+(tenants with active leases, opening balances, period transactions), closes
+its database session, and then renders the statements in chunks on a
+process pool. Workers are spawned rather than forked, so they never inherit
+the web worker's connections or threads. Each finished chunk is recorded
+as File rows together with the job's progress counters, so
+GET /statements/jobs/{id} shows progress while the job runs.
+
+Jobs run one at a time per web worker on a dedicated thread; a job that was
+running when its worker exited stays "running" and can simply be re-created.
+"""
+import contextvars
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from . import tenancy
+from .database import SessionLocal
+from .ledger import CHARGE_TYPES, PAYMENT_TYPES, signed_amount
+from .models.models import (
+    Tenant as TenantModel,
+    Lease as LeaseModel,
+    Property as PropertyModel,
+    Transaction as TransactionModel,
+    File as FileModel,
+    StatementJob as StatementJobModel,
+)
+from .statement_render import render_chunk
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_STORAGE_DIR = os.getenv("STATEMENT_STORAGE_DIR", os.path.join("storage", "statements"))
+STATEMENT_WORKERS = int(os.getenv("STATEMENT_WORKERS", str(os.cpu_count() or 2)))
+STATEMENT_CHUNK_SIZE = int(os.getenv("STATEMENT_CHUNK_SIZE", "100"))
+STATEMENT_FORMATS = ("html", "pdf")
+CONTENT_TYPES = {"html": "text/html", "pdf": "application/pdf"}
+
+_job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="statement-jobs")
+
+
+def collect_statements(db: Session, period_start: date, period_end: date) -> List[Dict]:
+    """Build picklable statement data for every tenant with an active lease."""
+    active = (
+        select(LeaseModel.tenant_id)
+        .where(func.lower(LeaseModel.status) == "active", LeaseModel.tenant_id.isnot(None))
+        .distinct()
+        .subquery()
+    )
+
+    # 1. Tenants and their active leases
+    lease_rows = db.execute(
+        select(
+            TenantModel.id, TenantModel.first_name, TenantModel.last_name, TenantModel.email,
+            LeaseModel.id, LeaseModel.property_id, PropertyModel.address,
+        )
+        .join(LeaseModel, LeaseModel.tenant_id == TenantModel.id)
+        .outerjoin(PropertyModel, PropertyModel.id == LeaseModel.property_id)
+        .where(func.lower(LeaseModel.status) == "active")
+        .order_by(TenantModel.id, LeaseModel.id)
+    ).all()
+
+    # 2. Balance carried into the period
+    opening = dict(db.execute(
+        select(TransactionModel.tenant_id, func.sum(signed_amount()))
+        .where(TransactionModel.tenant_id.in_(select(active.c.tenant_id)), TransactionModel.date < period_start)
+        .group_by(TransactionModel.tenant_id)
+    ).all())
+
+    # 3. Activity within the period
+    tx_rows = db.execute(
+        select(
+            TransactionModel.tenant_id, TransactionModel.date, TransactionModel.type,
+            TransactionModel.description, TransactionModel.amount,
+        )
+        .where(
+            TransactionModel.tenant_id.in_(select(active.c.tenant_id)),
+            TransactionModel.date >= period_start,
+            TransactionModel.date <= period_end,
+            func.lower(TransactionModel.type).in_(CHARGE_TYPES + PAYMENT_TYPES),
+        )
+        .order_by(TransactionModel.tenant_id, TransactionModel.date, TransactionModel.id)
+    ).all()
+
+    statements: Dict[int, Dict] = {}
+    for tenant_id, first_name, last_name, email, lease_id, property_id, address in lease_rows:
+        statement = statements.get(tenant_id)
+        if statement is None:
+            statement = statements[tenant_id] = {
+                "tenant": {
+                    "id": tenant_id,
+                    "name": " ".join(part for part in (first_name, last_name) if part) or email or f"Tenant {tenant_id}",
+                },
+                "property_id": property_id,
+                "lease_ids": [],
+                "addresses": [],
+                "period_start": period_start.isoformat(),
+                "period_end": period_end.isoformat(),
+                "transactions": [],
+            }
+        statement["lease_ids"].append(lease_id)
+        if address:
+            statement["addresses"].append(address)
+
+    for tenant_id, tx_date, tx_type, description, amount in tx_rows:
+        statement = statements.get(tenant_id)
+        if statement is None:
+            continue
+        amount = Decimal(str(amount or 0))
+        is_charge = (tx_type or "").lower() in CHARGE_TYPES
+        statement["transactions"].append({
+            "date": tx_date.isoformat(),
+            "type": tx_type,
+            "description": description,
+            "charge": str(amount) if is_charge else None,
+            "payment": None if is_charge else str(amount),
+        })
+
+    for tenant_id, statement in statements.items():
+        opening_balance = Decimal(str(opening.get(tenant_id) or 0))
+        charges = late_fees = payments = Decimal(0)
+        for tx in statement["transactions"]:
+            if tx["payment"] is not None:
+                payments += Decimal(tx["payment"])
+            elif (tx["type"] or "").lower() == "late_fee":
+                late_fees += Decimal(tx["charge"])
+            else:
+                charges += Decimal(tx["charge"])
+        statement["summary"] = {
+            "opening_balance": str(opening_balance),
+            "charges": str(charges),
+            "late_fees": str(late_fees),
+            "payments": str(payments),
+            "closing_balance": str(opening_balance + charges + late_fees - payments),
+        }
+    return list(statements.values())
+
+
+def _update_job(job_id: int, **values) -> None:
+    with SessionLocal() as db:
+        job = db.get(StatementJobModel, job_id)
+        for field, value in values.items():
+            setattr(job, field, value)
+        db.commit()
+
+
+def run_job(job_id: int) -> None:
+    """Generate every statement of a job (blocking)."""
+    try:
+        with SessionLocal() as db:
+            job = db.get(StatementJobModel, job_id)
+            job.status = "running"
+            job.started_at = func.now()
+            db.commit()
+            period_start, period_end, file_format = job.period_start, job.period_end, job.file_format
+            statements = collect_statements(db, period_start, period_end)
+            job.total = len(statements)
+            # Job ids are per customer schema in multi-tenant mode
+            job.output_dir = os.path.abspath(os.path.join(STATEMENT_STORAGE_DIR, tenancy.current_schema() or "", f"job_{job_id}"))
+            output_dir = job.output_dir
+            db.commit()
+
+        chunks = [statements[i:i + STATEMENT_CHUNK_SIZE] for i in range(0, len(statements), STATEMENT_CHUNK_SIZE)]
+        completed = failed = 0
+        if chunks:
+            workers = max(1, min(STATEMENT_WORKERS, len(chunks)))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(render_chunk, chunk, output_dir, file_format) for chunk in chunks]
+                for future in as_completed(futures):
+                    results = future.result()
+                    with SessionLocal() as db:
+                        for tenant_id, property_id, path, error in results:
+                            if error is not None:
+                                failed += 1
+                                logger.warning(f"Statement for tenant {tenant_id} (job {job_id}) failed: {error}")
+                                continue
+                            completed += 1
+                            db.add(FileModel(
+                                tenant_id=tenant_id,
+                                property_id=property_id,
+                                file_name=os.path.basename(path),
+                                file_path=path,
+                                file_type=CONTENT_TYPES[file_format],
+                                statement_job_id=job_id,
+                            ))
+                        job = db.get(StatementJobModel, job_id)
+                        job.completed = completed
+                        job.failed = failed
+                        db.commit()
+
+        _update_job(job_id, status="completed" if not failed else "completed_with_errors", finished_at=func.now())
+        logger.info(f"Statement job {job_id} finished: {completed} rendered, {failed} failed")
+    except Exception as e:
+        logger.error(f"Statement job {job_id} failed: {str(e)}", exc_info=True)
+        try:
+            _update_job(job_id, status="failed", error=str(e), finished_at=func.now())
+        except Exception:
+            logger.exception(f"Could not record failure of statement job {job_id}")
+
+
+def submit_job(job_id: int) -> None:
+    # Carry the request's customer schema over to the job thread
+    _job_executor.submit(contextvars.copy_context().run, run_job, job_id)
+
+
+def job_as_dict(job: StatementJobModel) -> Dict:
+    return {
+        "id": job.id,
+        "period_start": job.period_start.isoformat() if job.period_start else None,
+        "period_end": job.period_end.isoformat() if job.period_end else None,
+        "status": job.status,
+        "format": job.file_format,
+        "total": job.total,
+        "completed": job.completed,
+        "failed": job.failed,
+        "output_dir": job.output_dir,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
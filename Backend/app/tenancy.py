@@ -0,0 +1,254 @@
+"""Schema-per-customer multi-tenancy.
+
+With MULTI_TENANT set, each customer (management company) gets its own copy
+of the tables in its own PostgreSQL schema, and one deployment with one
+connection pool serves all of them.
+
+* The customer comes from the X-Customer header or, with CUSTOMER_DOMAIN set,
+  from the subdomain (acme.<CUSTOMER_DOMAIN>). Slugs are looked up in the
+  customers registry table (CUSTOMER_REGISTRY_SCHEMA.customers), cached for
+  CUSTOMER_CACHE_TTL seconds.
+* CustomerMiddleware puts the customer's schema in a context variable for the
+  rest of the request (threadpool handlers inherit it).
+* Every session transaction maps the models' schema (DB_SCHEMA) to that
+  schema with schema_translate_map on its connection. Statements are compiled
+  once and the schema name is filled in per execution, so the pool and the
+  statement cache are shared by all customers.
+
+Customers are provisioned through the regular migrations:
+
+    python -m app.tenancy create acme --name "Acme Parks"
+    python -m app.tenancy upgrade        # migrate every customer schema
+
+and a single schema can be migrated with `alembic -x schema=pm_acme upgrade head`.
+"""
+import argparse
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import (
+    Boolean, Column, DateTime, Integer, MetaData, String, Table, event, func, inspect, select, text,
+)
+
+from .database import engine, Base, DB_SCHEMA, IS_SQLITE
+
+logger = logging.getLogger(__name__)
+
+MULTI_TENANT = os.getenv("MULTI_TENANT", "False").lower() == "true" and not IS_SQLITE
+CUSTOMER_HEADER = "x-customer"
+CUSTOMER_DOMAIN = os.getenv("CUSTOMER_DOMAIN", "").strip().lower()
+CUSTOMER_REGISTRY_SCHEMA = os.getenv("CUSTOMER_REGISTRY_SCHEMA", "public")
+CUSTOMER_SCHEMA_PREFIX = os.getenv("CUSTOMER_SCHEMA_PREFIX", "pm_")
+CUSTOMER_CACHE_TTL = float(os.getenv("CUSTOMER_CACHE_TTL", "60"))
+# Served without a customer (probes, metrics, docs)
+CUSTOMER_EXEMPT_PATHS = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+_SLUG_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,47}$")
+
+registry_metadata = MetaData(schema=CUSTOMER_REGISTRY_SCHEMA)
+customers = Table(
+    "customers", registry_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("slug", String(48), nullable=False, unique=True),
+    Column("schema_name", String(63), nullable=False, unique=True),
+    Column("name", String(200)),
+    Column("is_active", Boolean, nullable=False, default=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+_current_schema: ContextVar[Optional[str]] = ContextVar("pm_customer_schema", default=None)
+
+
+def current_schema() -> Optional[str]:
+    """The customer schema of the running request or job; None outside multi-tenant mode."""
+    return _current_schema.get()
+
+
+@contextmanager
+def use_schema(schema: Optional[str]):
+    """Run the enclosed database work against a customer's schema."""
+    token = _current_schema.set(schema)
+    try:
+        yield
+    finally:
+        _current_schema.reset(token)
+
+
+def _apply_schema(session, transaction, connection) -> None:
+    schema = _current_schema.get()
+    session.info["pm_schema"] = schema
+    if MULTI_TENANT:
+        # Always set: a pinned connection may still carry another customer's map
+        connection.execution_options(schema_translate_map={DB_SCHEMA: schema or DB_SCHEMA})
+
+
+def install(session_factory) -> None:
+    """Point sessions from session_factory at the current customer's schema."""
+    if MULTI_TENANT:
+        event.listen(session_factory, "after_begin", _apply_schema)
+
+
+# --- registry ---------------------------------------------------------------
+
+_cache: Dict[str, Tuple[Optional[str], float]] = {}
+
+
+def lookup(slug: str) -> Optional[str]:
+    """Schema of an active customer (blocking, cached)."""
+    now = time.monotonic()
+    cached = _cache.get(slug)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    with engine.connect() as connection:
+        schema = connection.execute(
+            select(customers.c.schema_name).where(customers.c.slug == slug, customers.c.is_active.is_(True))
+        ).scalar()
+    _cache[slug] = (schema, now + CUSTOMER_CACHE_TTL)
+    return schema
+
+
+def all_schemas() -> List[str]:
+    """Schemas of every active customer, or [None] (the default schema) outside multi-tenant mode."""
+    if not MULTI_TENANT:
+        return [None]
+    with engine.connect() as connection:
+        return list(connection.execute(
+            select(customers.c.schema_name).where(customers.c.is_active.is_(True)).order_by(customers.c.id)
+        ).scalars())
+
+
+def customer_slug(headers: Dict[str, str]) -> Optional[str]:
+    slug = headers.get(CUSTOMER_HEADER)
+    if not slug and CUSTOMER_DOMAIN:
+        host = headers.get("host", "").split(":", 1)[0].lower()
+        if host.endswith("." + CUSTOMER_DOMAIN):
+            slug = host[: -len(CUSTOMER_DOMAIN) - 1]
+    slug = (slug or "").strip().lower()
+    return slug if _SLUG_RE.match(slug) else None
+
+
+class CustomerMiddleware:
+    """Resolve the request's customer and run the request against its schema."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or scope["path"] == "/" or scope["path"].startswith(CUSTOMER_EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        slug = customer_slug(headers)
+        schema = None
+        if slug is not None:
+            cached = _cache.get(slug)
+            if cached is not None and cached[1] > time.monotonic():
+                schema = cached[0]
+            else:
+                schema = await run_in_threadpool(lookup, slug)
+
+        if schema is None:
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 4404})
+                return
+            response = JSONResponse(
+                status_code=404 if slug else 400,
+                content={
+                    "error": f"Unknown customer '{slug}'" if slug else "Customer not specified",
+                    "detail": f"Send the {CUSTOMER_HEADER} header"
+                              + (f" or use <customer>.{CUSTOMER_DOMAIN}" if CUSTOMER_DOMAIN else ""),
+                    "path": scope["path"],
+                    "timestamp": datetime.now().isoformat(),
+                },
+            )
+            await response(scope, receive, send)
+            return
+
+        with use_schema(schema):
+            await self.app(scope, receive, send)
+
+
+# --- provisioning -----------------------------------------------------------
+
+def _alembic_config(schema: str):
+    from alembic.config import Config
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(backend_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(backend_dir, "migrations"))
+    config.attributes["schema"] = schema
+    return config
+
+
+def migrate(schema: str, revision: str = "head") -> None:
+    """Bring a customer schema up to date, creating it if needed.
+
+    A new schema gets its tables straight from the models and is stamped at
+    the latest revision (as the embedded database is); an existing one runs
+    the pending revisions.
+    """
+    from alembic import command
+    from .models import models  # noqa: F401  registers every table on Base.metadata
+
+    config = _alembic_config(schema)
+    with engine.connect() as connection:
+        connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        connection.commit()
+        existing = inspect(connection).has_table("alembic_version", schema=schema)
+        if not existing:
+            Base.metadata.create_all(connection.execution_options(schema_translate_map={DB_SCHEMA: schema}))
+            connection.commit()
+    if existing:
+        command.upgrade(config, revision)
+    else:
+        command.stamp(config, "head")
+
+
+def create_customer(slug: str, name: Optional[str] = None) -> str:
+    slug = slug.strip().lower()
+    if not _SLUG_RE.match(slug):
+        raise ValueError("Customer slugs are lower-case letters, digits, '-' and '_'")
+    schema = CUSTOMER_SCHEMA_PREFIX + slug.replace("-", "_")
+    with engine.begin() as connection:
+        connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{CUSTOMER_REGISTRY_SCHEMA}"'))
+        registry_metadata.create_all(connection)
+    migrate(schema)
+    with engine.begin() as connection:
+        connection.execute(customers.insert().values(slug=slug, schema_name=schema, name=name, is_active=True))
+    _cache.pop(slug, None)
+    logger.info(f"Provisioned customer '{slug}' in schema {schema}")
+    return schema
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.tenancy", description="Manage customer schemas.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="provision a customer schema and register it")
+    create.add_argument("slug")
+    create.add_argument("--name")
+    upgrade = commands.add_parser("upgrade", help="migrate every registered customer schema")
+    upgrade.add_argument("revision", nargs="?", default="head")
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        print(create_customer(args.slug, args.name))
+    else:
+        with engine.connect() as connection:
+            schemas = list(connection.execute(select(customers.c.schema_name).order_by(customers.c.id)).scalars())
+        for schema in schemas:
+            print(f"Migrating {schema}...")
+            migrate(schema, args.revision)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,420 @@
+"""
+Synthetic data generator: a large, deterministic portfolio for benchmarks.
+
+Run from the Backend directory against a disposable database (the same
+DATABASE_URL / DB_SCHEMA settings as the app; the tables must exist):
+
+    python benchmarks/datagen.py --preset small --jobs 8
+    python benchmarks/datagen.py --preset large --jobs 16 --truncate
+    python benchmarks/datagen.py --preset medium --dry-run    # counts and fingerprint only
+
+Presets (properties x leases per property; every lease has its own tenant):
+
+    tiny     200 properties,     600 tenants,   ~15k transactions
+    small    5k properties,      25k tenants,   ~700k transactions
+    medium   25k properties,     200k tenants,  ~5M transactions
+    large    100k properties,    1M tenants,    ~25M transactions, 2M maintenance requests
+
+Each property has back-to-back leases going back from --as-of (the last one
+usually still active), monthly rent charges, payments (some late, with a
+late fee, a few recent ones still unpaid), a deposit per lease, maintenance
+requests with their repair expenses, and the matching tenant/lease balance
+rows the ledger would have maintained.
+
+The data is generated in chunks of --chunk-size properties. A chunk holds
+everything that belongs to its properties (tenants included), each property
+draws from its own RNG seeded from (--seed, property number), and ids are
+derived from the property number rather than from insertion order. The
+output therefore only depends on the preset, --seed and --as-of, not on
+--jobs or --chunk-size. The printed fingerprint (a hash over every
+generated row, taken per property and combined in property order, so it
+doesn't depend on the chunking either) confirms that two loads with the same
+options hold the same dataset.
+
+On PostgreSQL --jobs processes load chunks in parallel, each chunk with COPY
+in one transaction; sequences are then moved past the generated ids and the
+tables analyzed. An embedded (SQLite) database is filled in a single process
+with plain inserts.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.database import engine, DB_SCHEMA, IS_SQLITE  # noqa: E402
+
+
+class Shape(NamedTuple):
+    properties: int
+    leases_per_property: int
+    maintenance_per_property: int  # average
+
+
+PRESETS = {
+    "tiny": Shape(200, 3, 2),
+    "small": Shape(5_000, 5, 4),
+    "medium": Shape(25_000, 8, 8),
+    "large": Shape(100_000, 10, 20),
+}
+DEFAULT_AS_OF = "2026-01-01"
+
+# Id layout: every id is a function of the property number, so chunks never collide
+MAX_TERM_MONTHS = 24
+TX_SLOTS_PER_LEASE = MAX_TERM_MONTHS * 3 + 2  # rent, payment and late fee per month; deposit charge and payment
+LATE_FEE = Decimal("50.00")
+
+# Loaded in this order so foreign keys are satisfied within a chunk
+TABLES = {
+    "properties": ("id", "address", "bedrooms", "bathrooms", "area", "rent_amount", "status", "amenities"),
+    "tenants": ("id", "first_name", "last_name", "email", "phone", "status"),
+    "leases": ("id", "property_id", "tenant_id", "start_date", "end_date", "rent_amount", "status"),
+    "transactions": ("id", "property_id", "tenant_id", "lease_id", "type", "amount", "description", "date"),
+    "maintenance_requests": ("id", "property_id", "tenant_id", "description", "status", "created_at", "completed_at"),
+    "tenant_balances": ("tenant_id", "balance"),
+    "lease_balances": ("lease_id", "tenant_id", "balance"),
+}
+SERIAL_TABLES = ("properties", "tenants", "leases", "transactions", "maintenance_requests")
+
+FIRST_NAMES = (
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Maria",
+    "Wei", "Mei", "Ahmed", "Fatima", "Raj", "Priya", "Kenji", "Yuki", "Olga", "Ivan", "Aisha", "Omar",
+)
+LAST_NAMES = (
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Nguyen", "Chen", "Patel", "Kim", "Tanaka", "Ivanova", "Khan", "Okafor", "Silva", "Cohen", "Park",
+)
+STREETS = (
+    "Oak", "Maple", "Cedar", "Pine", "Elm", "Birch", "Willow", "Aspen", "Lake", "Hill", "River", "Park",
+    "Sunset", "Meadow", "Forest", "Spring", "Highland", "Valley", "Church", "Mill", "Ridge", "Harbor",
+)
+STREET_SUFFIXES = ("St", "Ave", "Rd", "Ln", "Dr", "Ct", "Blvd", "Way")
+CITIES = (
+    ("Springfield", 1.00), ("Riverton", 0.85), ("Lakewood", 1.10), ("Fairview", 0.95), ("Greenville", 0.80),
+    ("Bayside", 1.45), ("Oakridge", 1.05), ("Westport", 1.30), ("Hillcrest", 0.90), ("Brookfield", 1.20),
+)
+AMENITIES = ("parking", "laundry", "dishwasher", "balcony", "air conditioning", "pets allowed", "storage", "gym")
+REPAIRS = (
+    ("Leaking kitchen faucet", 120), ("Clogged bathroom drain", 90), ("Broken window latch", 60),
+    ("Heater not working", 350), ("AC not cooling", 400), ("Dishwasher not draining", 150),
+    ("Ceiling water stain", 500), ("Front door lock sticking", 80), ("Smoke detector beeping", 40),
+    ("Garbage disposal jammed", 110), ("Mold in bathroom", 650), ("Electrical outlet not working", 140),
+)
+
+
+def _month_start(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal("0.01"))
+
+
+def generate_chunk(first_property, last_property, shape, seed, as_of):
+    """Rows for properties first_property..last_property and everything that belongs to them.
+
+    Also returns, per property, how many rows each table holds once that
+    property is done, so serialize() can tell the properties apart.
+    """
+    rows = {table: [] for table in TABLES}
+    ends = []
+    as_of_month = as_of.year * 12 + as_of.month - 1
+    leases_per_property = shape.leases_per_property
+    max_maintenance = shape.maintenance_per_property * 2 + 1
+    # Property-level expenses are numbered after the last lease's transaction slots
+    expense_ids = shape.properties * leases_per_property * TX_SLOTS_PER_LEASE
+
+    for property_id in range(first_property, last_property + 1):
+        rng = random.Random(f"{seed}:{property_id}")
+        city, price_factor = rng.choice(CITIES)
+        bedrooms = rng.choices((0, 1, 2, 3, 4), (5, 30, 35, 22, 8))[0]
+        area = round(350 + bedrooms * 320 + rng.uniform(-120, 180))
+        rent = _money(round(area * 1.45 * price_factor * rng.uniform(0.9, 1.1), -1))
+
+        # Leases, newest first: the newest is usually still running at as_of
+        leases = []
+        occupied = rng.random() < 0.93
+        end_month = as_of_month - rng.randint(1, 3)
+        for n in range(leases_per_property):
+            term = rng.choices((6, 12, 24), (10, 75, 15))[0]
+            if n == 0 and occupied:
+                end_month = as_of_month + rng.randint(0, term - 1)
+            start_month = end_month - term + 1
+            leases.append((start_month, end_month))
+            end_month = start_month - 1 - rng.choices((0, 1, 2), (70, 20, 10))[0]
+        leases.reverse()
+
+        rows["properties"].append((
+            property_id,
+            f"{rng.randint(1, 9999)} {rng.choice(STREETS)} {rng.choice(STREET_SUFFIXES)}"
+            f"{f' Apt {rng.randint(1, 40)}' if rng.random() < 0.4 else ''}, {city}",
+            bedrooms,
+            rng.choice((1.0, 1.0, 1.5, 2.0, 2.5)) if bedrooms > 1 else 1.0,
+            area,
+            rent,
+            "rented" if occupied else rng.choices(("available", "maintenance"), (85, 15))[0],
+            ", ".join(sorted(rng.sample(AMENITIES, rng.randint(0, 4)))) or None,
+        ))
+
+        occupants = []
+        for n, (start_month, end_month) in enumerate(leases):
+            lease_id = (property_id - 1) * leases_per_property + n + 1
+            tenant_id = lease_id  # one tenant per lease
+            is_active = n == len(leases) - 1 and occupied
+            # Rent steps up about 3% a year towards today's rent
+            lease_rent = _money(round(float(rent) / 1.03 ** ((as_of_month - start_month) / 12), -1))
+            start, end = _month_start(start_month), _month_start(end_month + 1) - timedelta(days=1)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            rows["tenants"].append((
+                tenant_id, first, last, f"{first}.{last}.{tenant_id}@example.com".lower(),
+                f"555-{rng.randint(0, 9999999):07d}", "active" if is_active else "inactive",
+            ))
+            rows["leases"].append((
+                lease_id, property_id, tenant_id, start, end, lease_rent,
+                "active" if is_active else "expired",
+            ))
+            occupants.append((start_month, end_month, tenant_id))
+
+            tx_id = (lease_id - 1) * TX_SLOTS_PER_LEASE
+            balance = Decimal(0)
+            if start <= as_of:
+                rows["transactions"].append((tx_id + 1, property_id, tenant_id, lease_id, "deposit", lease_rent,
+                                             "Security deposit", start))
+                rows["transactions"].append((tx_id + 2, property_id, tenant_id, lease_id, "payment", lease_rent,
+                                             "Security deposit payment", start))
+            for month in range(start_month, min(end_month, as_of_month) + 1):
+                slot = tx_id + 3 + (month - start_month) * 3
+                due = _month_start(month)
+                rows["transactions"].append((slot, property_id, tenant_id, lease_id, "rent", lease_rent,
+                                             f"Rent {due:%m/%Y}", due))
+                balance += lease_rent
+                outcome = rng.random()
+                recent = as_of_month - month < 3
+                if outcome < 0.03 and recent and is_active:
+                    continue  # still unpaid
+                if outcome < 0.10 and due + timedelta(days=5) <= as_of:
+                    paid = due + timedelta(days=rng.randint(6, 25))
+                    rows["transactions"].append((slot + 2, property_id, tenant_id, lease_id, "late_fee", LATE_FEE,
+                                                 f"Late fee {due:%m/%Y}", due + timedelta(days=5)))
+                    amount = lease_rent + LATE_FEE
+                    balance += LATE_FEE
+                else:
+                    paid = due + timedelta(days=rng.randint(0, 4))
+                    amount = lease_rent
+                if paid <= as_of:
+                    rows["transactions"].append((slot + 1, property_id, tenant_id, lease_id, "payment", amount,
+                                                 f"Payment {due:%m/%Y}", paid))
+                    balance -= amount
+            rows["tenant_balances"].append((tenant_id, balance))
+            rows["lease_balances"].append((lease_id, tenant_id, balance))
+
+        history_start = leases[0][0]
+        for n in range(rng.randint(0, max_maintenance - 1)):
+            request_id = (property_id - 1) * max_maintenance + n + 1
+            month = rng.randint(history_start, as_of_month)
+            opened = datetime.combine(_month_start(month), datetime.min.time()) + timedelta(
+                days=rng.randint(0, 27), minutes=rng.randint(8 * 60, 20 * 60))
+            if opened.date() > as_of:
+                opened = datetime.combine(as_of, datetime.min.time()) - timedelta(hours=rng.randint(1, 72))
+            tenant_id = next((t for s, e, t in occupants if s <= month <= e), None)
+            description, cost = rng.choice(REPAIRS)
+            age_days = (as_of - opened.date()).days
+            if age_days > 30 or rng.random() < 0.5:
+                completed = opened + timedelta(days=rng.randint(0, min(age_days, 14)), hours=rng.randint(1, 8))
+                status = "completed"
+                rows["transactions"].append((
+                    expense_ids + request_id, property_id, None, None, "repair",
+                    _money(cost * rng.uniform(0.6, 1.8)), f"Repair: {description}", completed.date(),
+                ))
+            else:
+                completed = None
+                status = rng.choice(("open", "in_progress"))
+            rows["maintenance_requests"].append((request_id, property_id, tenant_id, description, status,
+                                                 opened, completed))
+        ends.append({table: len(table_rows) for table, table_rows in rows.items()})
+    return rows, ends
+
+
+def serialize(rows, ends):
+    """CSV text per table, and the chunk's property digests in property order.
+
+    Each property's rows are hashed on their own, so concatenating the chunks'
+    digests in order gives the same string whatever the chunk size.
+    """
+    texts = {}
+    for table, table_rows in rows.items():
+        start, texts[table] = 0, []
+        for end in ends:
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator="\n").writerows(table_rows[start:end[table]])
+            texts[table].append(buffer.getvalue())
+            start = end[table]
+    digests = []
+    for n in range(len(ends)):
+        digest = hashlib.sha256()
+        for table in rows:
+            digest.update(table.encode())
+            digest.update(texts[table][n].encode())
+        digests.append(digest.hexdigest())
+    return {table: "".join(parts) for table, parts in texts.items()}, "".join(digests)
+
+
+def _qualified(table, schema):
+    return f'"{schema}".{table}' if schema else table
+
+
+def load_chunk(chunk, bounds, shape, seed, as_of, schema, dry_run):
+    """Generate one chunk and COPY it in a single transaction; returns (chunk, row counts, digest)."""
+    rows, ends = generate_chunk(*bounds, shape, seed, as_of)
+    payloads, digest = serialize(rows, ends)
+
+    if not dry_run:
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SET synchronous_commit = off")
+            for table, columns in TABLES.items():
+                cursor.copy_expert(
+                    f"COPY {_qualified(table, schema)} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                    io.StringIO(payloads[table]),
+                )
+            connection.commit()
+        finally:
+            connection.close()
+    return chunk, {table: len(table_rows) for table, table_rows in rows.items()}, digest
+
+
+def load_chunk_sqlite(connection, rows):
+    cursor = connection.cursor()
+    for table, columns in TABLES.items():
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(str(v) if isinstance(v, (Decimal, date)) else v for v in row) for row in rows[table]],
+        )
+    connection.commit()
+
+
+def prepare(schema, truncate):
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if truncate:
+            if IS_SQLITE:
+                for table in reversed(list(TABLES)):
+                    cursor.execute(f"DELETE FROM {table}")
+            else:
+                tables = ", ".join(_qualified(t, schema) for t in TABLES)
+                cursor.execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+            connection.commit()
+        cursor.execute(f"SELECT count(*) FROM {_qualified('properties', schema)}")
+        if cursor.fetchone()[0]:
+            raise SystemExit("The properties table is not empty; use a fresh database or pass --truncate")
+    finally:
+        connection.close()
+
+
+def finish(schema):
+    """Move sequences past the generated ids and refresh planner statistics."""
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if IS_SQLITE:
+            cursor.execute("ANALYZE")
+        else:
+            for table in SERIAL_TABLES:
+                qualified = _qualified(table, schema)
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{qualified}', 'id'), "
+                    f"(SELECT coalesce(max(id), 0) + 1 FROM {qualified}), false)"
+                )
+            for table in TABLES:
+                cursor.execute(f"ANALYZE {_qualified(table, schema)}")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--properties", type=int, help="override the preset's number of properties")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--as-of", default=DEFAULT_AS_OF, help="date the generated history runs up to (YYYY-MM-DD)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 4, help="parallel loader processes")
+    parser.add_argument("--chunk-size", type=int, default=500, help="properties per chunk (and transaction)")
+    parser.add_argument("--schema", default=DB_SCHEMA, help="target schema, e.g. a customer schema (PostgreSQL)")
+    parser.add_argument("--truncate", action="store_true", help="empty the tables first")
+    parser.add_argument("--dry-run", action="store_true", help="generate without a database: counts and fingerprint")
+    args = parser.parse_args()
+
+    shape = PRESETS[args.preset]
+    if args.properties:
+        shape = shape._replace(properties=args.properties)
+    as_of = date.fromisoformat(args.as_of)
+    schema = None if IS_SQLITE else args.schema
+    chunks = [
+        (n, (first, min(first + args.chunk_size - 1, shape.properties)))
+        for n, first in enumerate(range(1, shape.properties + 1, args.chunk_size))
+    ]
+
+    if not args.dry_run:
+        prepare(schema, args.truncate)
+
+    started = time.perf_counter()
+    counts = {table: 0 for table in TABLES}
+    digests = [None] * len(chunks)
+
+    def record(chunk, chunk_counts, digest):
+        digests[chunk] = digest
+        for table, count in chunk_counts.items():
+            counts[table] += count
+        done = sum(d is not None for d in digests)
+        if done % max(len(chunks) // 20, 1) == 0 or done == len(chunks):
+            print(f"  {done}/{len(chunks)} chunks, {counts['transactions']:,} transactions, "
+                  f"{time.perf_counter() - started:.0f}s", file=sys.stderr)
+
+    if IS_SQLITE and not args.dry_run:
+        # One writer at a time: parallel processes would only wait on each other's locks
+        connection = engine.raw_connection()
+        try:
+            for n, bounds in chunks:
+                rows, ends = generate_chunk(*bounds, shape, args.seed, as_of)
+                load_chunk_sqlite(connection, rows)
+                record(n, {t: len(r) for t, r in rows.items()}, serialize(rows, ends)[1])
+        finally:
+            connection.close()
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(load_chunk, n, bounds, shape, args.seed, as_of, schema, args.dry_run)
+                for n, bounds in chunks
+            ]
+            for future in as_completed(futures):
+                record(*future.result())
+
+    if not args.dry_run:
+        finish(schema)
+
+    # Chunks are contiguous property ranges, so this is every property digest in property order
+    fingerprint = hashlib.sha256("".join(digests).encode()).hexdigest()[:16]
+    print(f"Preset {args.preset} (seed {args.seed}, as of {as_of}) in {time.perf_counter() - started:.1f}s")
+    for table, count in counts.items():
+        print(f"  {table:<22}{count:>12,}")
+    print(f"Fingerprint: {fingerprint}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Load benchmark: throughput and latency percentiles under a mixed workload.
+
+Run from the Backend directory with the dev requirements installed
+(pip install -r requirements-dev.txt):
+
+    python benchmarks/load.py --concurrency 32 --duration 30 --output load.json
+    python benchmarks/load.py --baseline benchmarks/baseline.json --max-regression 0.2
+
+By default the app is started with uvicorn against a throwaway SQLite file
+(embedded mode). Use --database-url to point it at a disposable local
+PostgreSQL instead, or --url to load an API that is already running.
+
+Before measuring, the database is seeded through the API with --properties
+and --tenants records. Then --concurrency async workers each pick an
+operation from the mix (a seeded RNG, so runs are repeatable) until
+--duration seconds have passed. The default mix is list/search/get heavy,
+with creates, patches and the assign workflow:
+
+    list_properties=30,get_property=20,search_tenants=15,get_tenant=10,
+    patch_property=10,create_property=8,assign=7
+
+Results are reported per endpoint: request count, errors, throughput and
+p50/p95/p99 latency. With --baseline the run fails (exit status 1) when an
+endpoint's p95 or the overall throughput is more than --max-regression worse
+than the baseline; --update-baseline writes this run as the new baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = "list_properties=30,get_property=20,search_tenants=15,get_tenant=10,patch_property=10,create_property=8,assign=7"
+SEARCH_TERMS = ("smith", "jo", "example.com", "lee", "an", "maria", "park", "zz-no-match")
+STREET_NAMES = ("Oak", "Maple", "Cedar", "Pine", "Elm", "Birch", "Willow", "Aspen")
+FIRST_NAMES = ("John", "Maria", "Ann", "Lee", "Joe", "Anna", "Sam", "Jordan")
+LAST_NAMES = ("Smith", "Johnson", "Lee", "Park", "Garcia", "Brown", "Jones", "Miller")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args):
+    """Start uvicorn on a free port; returns (process, base_url, temp_dir)."""
+    port = _free_port()
+    env = dict(os.environ)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["LEASE_SCAN_ENABLED"] = "False"
+    temp_dir = None
+    if args.database_url:
+        env["EMBEDDED_DB"] = "False"
+        env["DATABASE_URL"] = args.database_url
+    else:
+        temp_dir = tempfile.mkdtemp(prefix="pm-load-")
+        env["EMBEDDED_DB"] = "True"
+        env["EMBEDDED_DB_PATH"] = os.path.join(temp_dir, "load.db")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + args.timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"{base_url}/health/ready", timeout=0.5) as response:
+                if response.status == 200:
+                    return proc, base_url, temp_dir
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise TimeoutError(f"Server at {base_url} not ready within {args.timeout}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name}' (choose from {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    """Shared state of a run: known ids and recorded latencies."""
+
+    def __init__(self, client, seed):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.property_ids = []
+        self.tenant_ids = []
+        self.counter = 0
+        self.run_id = f"{seed}-{int(time.time())}"
+        self.recording = False
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def next_number(self):
+        self.counter += 1
+        return self.counter
+
+    async def request(self, label, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if self.recording:
+            self.samples[label].append(elapsed_ms)
+            if not ok:
+                self.errors[label] += 1
+        return response if ok else None
+
+    def property_payload(self):
+        n = self.next_number()
+        return {
+            "address": f"{n} {self.rng.choice(STREET_NAMES)} St (load {self.run_id})",
+            "bedrooms": self.rng.randint(1, 4),
+            "bathrooms": self.rng.choice((1, 1.5, 2, 2.5)),
+            "area": self.rng.randint(500, 2000),
+            "rent_amount": f"{self.rng.randint(600, 2400)}.00",
+            "status": "available",
+        }
+
+    def tenant_payload(self):
+        n = self.next_number()
+        first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+        return {
+            "first_name": first,
+            "last_name": last,
+            "email": f"{first.lower()}.{last.lower()}.{self.run_id}.{n}@example.com",
+            "phone": f"555-{self.rng.randint(1000, 9999)}",
+            "status": "applicant",
+        }
+
+    async def create_property(self):
+        response = await self.request("create_property", "POST", "/properties/", json=self.property_payload())
+        if response is not None:
+            self.property_ids.append(response.json()["id"])
+            return response.json()["id"]
+
+    async def create_tenant(self):
+        response = await self.request("create_tenant", "POST", "/tenants/", json=self.tenant_payload())
+        if response is not None:
+            self.tenant_ids.append(response.json()["id"])
+            return response.json()["id"]
+
+
+async def op_list_properties(w):
+    await w.request("list_properties", "GET", "/properties/",
+                    params={"skip": w.rng.randrange(0, max(len(w.property_ids) - 50, 1)), "limit": 50})
+
+
+async def op_get_property(w):
+    await w.request("get_property", "GET", f"/properties/{w.rng.choice(w.property_ids)}")
+
+
+async def op_search_tenants(w):
+    await w.request("search_tenants", "GET", "/tenants/", params={"search": w.rng.choice(SEARCH_TERMS), "limit": 50})
+
+
+async def op_get_tenant(w):
+    await w.request("get_tenant", "GET", f"/tenants/{w.rng.choice(w.tenant_ids)}")
+
+
+async def op_patch_property(w):
+    await w.request("patch_property", "PATCH", f"/properties/{w.rng.choice(w.property_ids)}",
+                    json={"notes": f"load note {w.next_number()}"})
+
+
+async def op_create_property(w):
+    await w.create_property()
+
+
+async def op_assign(w):
+    # Applicant moves into a new lot: two creates, then the assignment itself
+    property_id = await w.create_property()
+    tenant_id = await w.create_tenant()
+    if property_id is not None and tenant_id is not None:
+        await w.request("assign", "POST", f"/tenants/{tenant_id}/assign/{property_id}")
+
+
+OPERATIONS = {
+    "list_properties": op_list_properties,
+    "get_property": op_get_property,
+    "search_tenants": op_search_tenants,
+    "get_tenant": op_get_tenant,
+    "patch_property": op_patch_property,
+    "create_property": op_create_property,
+    "assign": op_assign,
+}
+
+
+async def seed(w, properties, tenants, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(factory):
+        async with semaphore:
+            await factory()
+
+    await asyncio.gather(*(bounded(w.create_property) for _ in range(properties)),
+                         *(bounded(w.create_tenant) for _ in range(tenants)))
+    if not w.property_ids or not w.tenant_ids:
+        raise RuntimeError("Seeding failed: no properties or tenants were created")
+
+
+async def worker(w, mix, deadline):
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        await OPERATIONS[w.rng.choices(names, weights)[0]](w)
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    rank = max(1, -(-len(sorted_samples) * pct // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+def summarize(samples, errors, duration):
+    ordered = sorted(samples)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / duration, 2),
+        "mean_ms": round(sum(ordered) / len(ordered), 2) if ordered else None,
+        "p50_ms": round(percentile(ordered, 50), 2) if ordered else None,
+        "p95_ms": round(percentile(ordered, 95), 2) if ordered else None,
+        "p99_ms": round(percentile(ordered, 99), 2) if ordered else None,
+        "max_ms": round(ordered[-1], 2) if ordered else None,
+    }
+
+
+async def run(args, base_url):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.request_timeout) as client:
+        w = Workload(client, args.seed)
+        await seed(w, args.properties, args.tenants, args.concurrency)
+        mix = parse_mix(args.mix)
+
+        if args.warmup > 0:
+            deadline = time.perf_counter() + args.warmup
+            await asyncio.gather(*(worker(w, mix, deadline) for _ in range(args.concurrency)))
+
+        w.recording = True
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(worker(w, mix, deadline) for _ in range(args.concurrency)))
+        duration = time.perf_counter() - started
+
+    all_samples = [s for samples in w.samples.values() for s in samples]
+    return {
+        "duration_s": round(duration, 2),
+        "overall": summarize(all_samples, sum(w.errors.values()), duration),
+        "endpoints": {
+            label: summarize(samples, w.errors[label], duration)
+            for label, samples in sorted(w.samples.items())
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, max_regression):
+    """Return a list of regressions beyond max_regression (a fraction)."""
+    failures = []
+    base_rps = baseline["overall"]["throughput_rps"]
+    rps = results["overall"]["throughput_rps"]
+    if base_rps and rps < base_rps * (1 - max_regression):
+        failures.append(f"throughput {rps} rps < baseline {base_rps} rps")
+    for label, base in baseline.get("endpoints", {}).items():
+        current = results["endpoints"].get(label)
+        if current is None or base.get("p95_ms") is None or current.get("p95_ms") is None:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            failures.append(f"{label}: p95 {current['p95_ms']}ms > baseline {base['p95_ms']}ms")
+        if current["errors"] > base.get("errors", 0):
+            failures.append(f"{label}: {current['errors']} errors (baseline {base.get('errors', 0)})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load an already running API instead of starting one")
+    parser.add_argument("--database-url", help="start the API against this (disposable) database instead of SQLite")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before the run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight pairs, comma separated")
+    parser.add_argument("--properties", type=int, default=500, help="properties created before the run")
+    parser.add_argument("--tenants", type=int, default=500, help="tenants created before the run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for the server to start")
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed slowdown vs. the baseline as a fraction (0.2 = 20%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run to --baseline")
+    args = parser.parse_args()
+
+    proc = temp_dir = None
+    base_url = args.url
+    if base_url is None:
+        proc, base_url, temp_dir = start_server(args)
+    try:
+        measured = asyncio.run(run(args, base_url))
+    finally:
+        if proc is not None:
+            stop_server(proc)
+
+    results = {
+        "benchmark": "load",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "database": "external" if args.url else ("postgresql" if args.database_url else "sqlite"),
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "properties": args.properties,
+            "tenants": args.tenants,
+            "seed": args.seed,
+        },
+        **measured,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if temp_dir is not None:
+        for name in os.listdir(temp_dir):
+            os.remove(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+
+    failed = False
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for failure in compare(results, baseline, args.max_regression):
+            print(f"FAIL: {failure}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Startup benchmark: import time and time-to-first-request for the API.
+
+Run from the Backend directory with the virtual environment activated:
+
+    python benchmarks/startup.py --runs 5 --output startup.json
+
+Each run uses a fresh interpreter, so the numbers include a cold import of
+FastAPI, SQLAlchemy and the app. "Time to first request" is measured from
+spawning uvicorn until GET /health/live returns 200; it does not depend on
+the database being reachable.
+
+Exits with status 1 when the median exceeds --max-import-ms or --max-ttfr-ms,
+so the script can gate releases.
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def measure_import(env):
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_first_request(env, timeout):
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health/live"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=0.5) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"No response from {url} within {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def summarize(samples):
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples), 2),
+        "median_ms": round(statistics.median(samples), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for the first response")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--max-import-ms", type=float, help="fail if the median import time exceeds this")
+    parser.add_argument("--max-ttfr-ms", type=float, help="fail if the median time to first request exceeds this")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Keep benchmark output quiet and don't let warm-up retries skew the numbers
+    env.setdefault("LOG_LEVEL", "WARNING")
+
+    import_samples = [measure_import(env) for _ in range(args.runs)]
+    ttfr_samples = [measure_first_request(env, args.timeout) for _ in range(args.runs)]
+
+    results = {
+        "benchmark": "startup",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "import": summarize(import_samples),
+        "time_to_first_request": summarize(ttfr_samples),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    if args.max_import_ms is not None and results["import"]["median_ms"] > args.max_import_ms:
+        print(f"FAIL: median import {results['import']['median_ms']}ms > {args.max_import_ms}ms")
+        failed = True
+    if args.max_ttfr_ms is not None and results["time_to_first_request"]["median_ms"] > args.max_ttfr_ms:
+        print(f"FAIL: median time to first request "
+              f"{results['time_to_first_request']['median_ms']}ms > {args.max_ttfr_ms}ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
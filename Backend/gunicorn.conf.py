@@ -0,0 +1,103 @@
+"""
+Production server configuration: gunicorn managing uvicorn worker processes.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Settings (environment variables):
+    WEB_CONCURRENCY            number of worker processes (default: CPU count, capped so every
+                               worker gets at least one pooled connection within
+                               DB_MAX_CONNECTIONS)
+    BIND                       listen address (default: 0.0.0.0:8000)
+    DB_MAX_CONNECTIONS         total Postgres connections all workers may hold (default: 40)
+    DB_RESERVED_PER_WORKER     connections per worker kept outside the request pool:
+                               the changefeed's LISTEN connection (app.changefeed
+                               opens it directly, not through the pool) and the
+                               health probe (default: 2)
+    MAX_REQUESTS               recycle a worker after this many requests (default: 10000, 0 = never)
+    MAX_REQUESTS_JITTER        random spread so workers don't recycle together (default: 1000)
+    GRACEFUL_TIMEOUT           seconds a recycled/stopping worker gets to finish requests (default: 30)
+    METRICS_MULTIPROC_DIR      directory for per-worker metric snapshots (default: /tmp/pm_metrics)
+
+The app is not preloaded: every worker imports it after the fork, so each
+worker creates its own engine and pool and no connection is ever shared
+between processes. (app.database also resets an inherited pool after fork
+as a second line of defence.)
+
+The Windows desktop edition runs a single uvicorn process instead (start.bat/start.ps1).
+"""
+import multiprocessing
+import os
+import shutil
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# Graceful recycling: bound memory growth and pick up config by replacing workers one at a time
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+preload_app = False
+accesslog = None  # the app writes its own sampled request log
+
+
+def pool_limits(budget, worker_count, reserved_per_worker):
+    """Split a global connection budget into per-worker (pool_size, max_overflow).
+
+    Every worker gets the same share and keeps all of it in the steady pool
+    (no overflow), so the total number of connections can never exceed the
+    budget, whatever the load.
+    """
+    per_worker = budget // max(worker_count, 1) - reserved_per_worker
+    if per_worker < 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={budget} is too small for {worker_count} workers "
+            f"({reserved_per_worker} reserved connection(s) each)"
+        )
+    return per_worker, 0
+
+
+def default_workers(cpu_count, budget, reserved_per_worker):
+    """One worker per CPU, but no more than the connection budget can give a pooled connection each."""
+    return max(min(cpu_count, budget // (reserved_per_worker + 1)), 1)
+
+
+_budget = int(os.getenv("DB_MAX_CONNECTIONS", "40"))
+# One for the changefeed listener, one for the health probe
+_reserved = int(os.getenv("DB_RESERVED_PER_WORKER", "2"))
+# An explicit WEB_CONCURRENCY is taken as is (and rejected below if the budget can't serve it)
+_cpu_count = multiprocessing.cpu_count()
+workers = int(os.getenv("WEB_CONCURRENCY") or default_workers(_cpu_count, _budget, _reserved))
+_pool_size, _max_overflow = pool_limits(_budget, workers, _reserved)
+
+# Workers inherit the master's environment, so app.database picks these up
+raw_env = [
+    f"DB_POOL_SIZE={_pool_size}",
+    f"DB_MAX_OVERFLOW={_max_overflow}",
+]
+os.environ.setdefault("METRICS_MULTIPROC_DIR", "/tmp/pm_metrics")
+
+
+def on_starting(server):
+    # Start every deployment with a clean metrics directory
+    directory = os.environ["METRICS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    server.log.info(
+        f"Starting {workers} workers with pool_size={_pool_size} max_overflow={_max_overflow} "
+        f"(budget {_budget} connections, {_reserved} reserved per worker)"
+    )
+    if not os.getenv("WEB_CONCURRENCY") and workers < _cpu_count:
+        server.log.warning(
+            f"Running {workers} workers on {_cpu_count} CPUs: DB_MAX_CONNECTIONS={_budget} allows no more; "
+            f"raise it or set WEB_CONCURRENCY"
+        )
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's counters in the merged totals, then drop its file
+    from app.metrics import archive_process
+
+    archive_process(worker.pid, os.environ["METRICS_MULTIPROC_DIR"])
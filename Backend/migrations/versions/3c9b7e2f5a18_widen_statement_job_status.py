@@ -0,0 +1,40 @@
+"""Widen statement_jobs.status for completed_with_errors
+
+Revision ID: 3c9b7e2f5a18
+Revises: f2a6c8d1e934
+Create Date: 2026-10-19 18:05:37.214409
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9b7e2f5a18'
+down_revision: Union[str, None] = 'f2a6c8d1e934'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite (the desktop build) doesn't enforce VARCHAR lengths and can't ALTER a column's type
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    op.alter_column('statement_jobs', 'status',
+               existing_type=sa.String(length=20),
+               type_=sa.String(length=30),
+               existing_nullable=False,
+               schema='pm')
+
+
+def downgrade() -> None:
+    # SQLite (the desktop build) doesn't enforce VARCHAR lengths and can't ALTER a column's type
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    op.alter_column('statement_jobs', 'status',
+               existing_type=sa.String(length=30),
+               type_=sa.String(length=20),
+               existing_nullable=False,
+               schema='pm')
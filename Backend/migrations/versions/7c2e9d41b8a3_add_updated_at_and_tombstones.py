@@ -0,0 +1,46 @@
+"""Add updated_at columns and tombstones for delta sync
+
+Revision ID: 7c2e9d41b8a3
+Revises: 5435ab0f73ad
+Create Date: 2026-10-19 09:12:04.518327
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9d41b8a3'
+down_revision: Union[str, None] = '5435ab0f73ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ('properties', 'tenants', 'leases', 'transactions', 'maintenance_requests')
+
+
+def upgrade() -> None:
+    for table in SYNCED_TABLES:
+        # Existing rows get the migration time, so the first delta after upgrading resends them once
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True), schema='pm')
+        op.create_index(op.f(f'ix_pm_{table}_updated_at'), table, ['updated_at'], unique=False, schema='pm')
+    op.create_table('tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=50), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    schema='pm'
+    )
+    op.create_index(op.f('ix_pm_tombstones_id'), 'tombstones', ['id'], unique=False, schema='pm')
+    op.create_index('ix_tombstones_deleted_at_entity', 'tombstones', ['deleted_at', 'entity'], unique=False, schema='pm')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tombstones_deleted_at_entity', table_name='tombstones', schema='pm')
+    op.drop_index(op.f('ix_pm_tombstones_id'), table_name='tombstones', schema='pm')
+    op.drop_table('tombstones', schema='pm')
+    for table in reversed(SYNCED_TABLES):
+        op.drop_index(op.f(f'ix_pm_{table}_updated_at'), table_name=table, schema='pm')
+        op.drop_column(table, 'updated_at', schema='pm')
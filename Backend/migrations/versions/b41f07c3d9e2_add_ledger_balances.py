@@ -0,0 +1,85 @@
+"""Add lease_id to transactions and maintained tenant/lease balances
+
+Revision ID: b41f07c3d9e2
+Revises: 7c2e9d41b8a3
+Create Date: 2026-10-19 11:02:37.104856
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f07c3d9e2'
+down_revision: Union[str, None] = '7c2e9d41b8a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keep in sync with app.ledger.CHARGE_TYPES / PAYMENT_TYPES
+CHARGE_TYPES = ('charge', 'rent', 'fee', 'late_fee', 'deposit')
+PAYMENT_TYPES = ('payment', 'credit', 'refund_applied', 'writeoff')
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('lease_id', sa.Integer(), nullable=True), schema='pm')
+    op.create_foreign_key('transactions_lease_id_fkey', 'transactions', 'leases', ['lease_id'], ['id'], source_schema='pm', referent_schema='pm')
+    op.create_index('ix_transactions_tenant_id_date', 'transactions', ['tenant_id', 'date'], unique=False, schema='pm')
+    op.create_table('tenant_balances',
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['pm.tenants.id'], ),
+    sa.PrimaryKeyConstraint('tenant_id'),
+    schema='pm'
+    )
+    op.create_table('lease_balances',
+    sa.Column('lease_id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=True),
+    sa.Column('balance', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['lease_id'], ['pm.leases.id'], ),
+    sa.ForeignKeyConstraint(['tenant_id'], ['pm.tenants.id'], ),
+    sa.PrimaryKeyConstraint('lease_id'),
+    schema='pm'
+    )
+    op.create_index(op.f('ix_pm_lease_balances_tenant_id'), 'lease_balances', ['tenant_id'], unique=False, schema='pm')
+
+    # Backfill from the existing ledger (existing rows have no lease_id yet).
+    # Built from Table objects rather than raw SQL (or sa.table(), which
+    # skips the map) so schema_translate_map retargets "pm" when migrating a
+    # customer schema.
+    metadata = sa.MetaData()
+    transactions = sa.Table('transactions', metadata,
+        sa.Column('tenant_id', sa.Integer()),
+        sa.Column('type', sa.String()),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2)),
+        schema='pm'
+    )
+    tenant_balances = sa.Table('tenant_balances', metadata,
+        sa.Column('tenant_id', sa.Integer()),
+        sa.Column('balance', sa.Numeric(precision=12, scale=2)),
+        schema='pm'
+    )
+    kind = sa.func.lower(transactions.c.type)
+    signed_amount = sa.case(
+        (kind.in_(CHARGE_TYPES), transactions.c.amount),
+        (kind.in_(PAYMENT_TYPES), -transactions.c.amount),
+        else_=0,
+    )
+    op.execute(tenant_balances.insert().from_select(
+        ['tenant_id', 'balance'],
+        sa.select(transactions.c.tenant_id, sa.func.sum(signed_amount))
+        .where(transactions.c.tenant_id.isnot(None))
+        .group_by(transactions.c.tenant_id)
+    ))
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pm_lease_balances_tenant_id'), table_name='lease_balances', schema='pm')
+    op.drop_table('lease_balances', schema='pm')
+    op.drop_table('tenant_balances', schema='pm')
+    op.drop_index('ix_transactions_tenant_id_date', table_name='transactions', schema='pm')
+    op.drop_constraint('transactions_lease_id_fkey', 'transactions', schema='pm', type_='foreignkey')
+    op.drop_column('transactions', 'lease_id', schema='pm')
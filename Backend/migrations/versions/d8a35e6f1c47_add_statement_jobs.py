@@ -0,0 +1,50 @@
+"""Add statement jobs and link generated files to them
+
+Revision ID: d8a35e6f1c47
+Revises: b41f07c3d9e2
+Create Date: 2026-10-19 13:41:52.877310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a35e6f1c47'
+down_revision: Union[str, None] = 'b41f07c3d9e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('statement_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('period_end', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('file_format', sa.String(length=10), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('output_dir', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='pm'
+    )
+    op.create_index(op.f('ix_pm_statement_jobs_id'), 'statement_jobs', ['id'], unique=False, schema='pm')
+    op.add_column('files', sa.Column('statement_job_id', sa.Integer(), nullable=True), schema='pm')
+    op.create_foreign_key('files_statement_job_id_fkey', 'files', 'statement_jobs', ['statement_job_id'], ['id'], source_schema='pm', referent_schema='pm')
+    op.create_index(op.f('ix_pm_files_statement_job_id'), 'files', ['statement_job_id'], unique=False, schema='pm')
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pm_files_statement_job_id'), table_name='files', schema='pm')
+    op.drop_constraint('files_statement_job_id_fkey', 'files', schema='pm', type_='foreignkey')
+    op.drop_column('files', 'statement_job_id', schema='pm')
+    op.drop_index(op.f('ix_pm_statement_jobs_id'), table_name='statement_jobs', schema='pm')
+    op.drop_table('statement_jobs', schema='pm')
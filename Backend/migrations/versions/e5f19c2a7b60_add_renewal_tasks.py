@@ -0,0 +1,47 @@
+"""Add renewal tasks and the lease status/end date index
+
+Revision ID: e5f19c2a7b60
+Revises: d8a35e6f1c47
+Create Date: 2026-10-19 15:02:37.418265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f19c2a7b60'
+down_revision: Union[str, None] = 'd8a35e6f1c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_leases_status_end_date', 'leases', ['status', 'end_date'], unique=False, schema='pm')
+    op.create_table('renewal_tasks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lease_id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=True),
+    sa.Column('property_id', sa.Integer(), nullable=True),
+    sa.Column('lease_end_date', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['lease_id'], ['pm.leases.id'], ),
+    sa.ForeignKeyConstraint(['property_id'], ['pm.properties.id'], ),
+    sa.ForeignKeyConstraint(['tenant_id'], ['pm.tenants.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('lease_id', 'lease_end_date', name='uq_renewal_tasks_lease_end'),
+    schema='pm'
+    )
+    op.create_index(op.f('ix_pm_renewal_tasks_id'), 'renewal_tasks', ['id'], unique=False, schema='pm')
+    op.create_index('ix_renewal_tasks_status_end_date', 'renewal_tasks', ['status', 'lease_end_date'], unique=False, schema='pm')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_renewal_tasks_status_end_date', table_name='renewal_tasks', schema='pm')
+    op.drop_index(op.f('ix_pm_renewal_tasks_id'), table_name='renewal_tasks', schema='pm')
+    op.drop_table('renewal_tasks', schema='pm')
+    op.drop_index('ix_leases_status_end_date', table_name='leases', schema='pm')
@@ -0,0 +1,42 @@
+"""Add users
+
+Revision ID: f2a6c8d1e934
+Revises: e5f19c2a7b60
+Create Date: 2026-10-19 16:20:11.503948
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6c8d1e934'
+down_revision: Union[str, None] = 'e5f19c2a7b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('full_name', sa.String(length=200), nullable=True),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['tenant_id'], ['pm.tenants.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    schema='pm'
+    )
+    op.create_index(op.f('ix_pm_users_id'), 'users', ['id'], unique=False, schema='pm')
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pm_users_id'), table_name='users', schema='pm')
+    op.drop_table('users', schema='pm')
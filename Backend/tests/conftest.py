@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+import pytest
+
+# The embedded (SQLite) mode, on a scratch file; must be set before app.database is imported
+_DB_DIR = tempfile.mkdtemp(prefix="pm_tests_")
+os.environ["EMBEDDED_DB"] = "True"
+os.environ["EMBEDDED_DB_PATH"] = os.path.join(_DB_DIR, "test.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables, dropped again afterwards."""
+    from app.database import Base, SessionLocal, engine
+    from app.models import models  # noqa: F401  registers every table on Base.metadata
+
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
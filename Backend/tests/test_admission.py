@@ -0,0 +1,77 @@
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.admission import AdmissionController, AdmissionControlMiddleware
+
+
+def test_admits_up_to_capacity_then_queues_in_order_and_sheds():
+    async def scenario():
+        controller = AdmissionController(capacity=2, queue_size=2, queue_timeout=1)
+        assert await controller.acquire() is None
+        assert await controller.acquire() is None
+        admitted = []
+
+        async def wait(name):
+            assert await controller.acquire() is None
+            admitted.append(name)
+        waiters = [asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))]
+        await asyncio.sleep(0)
+        assert (controller.active, controller.queued) == (2, 2)
+        # The queue is full: rejected at once, without waiting
+        assert await controller.acquire() == "queue_full"
+
+        controller.release()
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(*waiters)
+        assert admitted == ["first", "second"]
+        # Slots were handed over, never freed in between
+        assert (controller.active, controller.queued) == (2, 0)
+        controller.release()
+        controller.release()
+        assert controller.active == 0
+    asyncio.run(scenario())
+
+
+def test_queued_request_times_out():
+    async def scenario():
+        controller = AdmissionController(capacity=1, queue_size=5, queue_timeout=0.01)
+        assert await controller.acquire() is None
+        assert await controller.acquire() == "timeout"
+        assert (controller.active, controller.queued) == (1, 0)
+    asyncio.run(scenario())
+
+
+def test_slot_is_held_until_a_streamed_response_ends():
+    seen = []
+
+    async def report(request):
+        async def chunks():
+            for n in range(3):
+                # Still admitted while the body is being produced
+                seen.append(middleware.controller.active)
+                yield f"chunk {n}\n"
+        return StreamingResponse(chunks())
+
+    async def busy(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/report", report), Route("/health", busy)])
+    middleware = AdmissionControlMiddleware(app, capacity=1, queue_size=0, queue_timeout=0.01)
+    client = TestClient(middleware)
+
+    response = client.get("/report")
+    assert response.text == "chunk 0\nchunk 1\nchunk 2\n"
+    assert seen == [1, 1, 1]
+    assert middleware.controller.active == 0
+
+    # With the only slot taken, DB-bound requests are shed but probes still pass
+    middleware.controller.active = 1
+    rejected = client.get("/report")
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "1"
+    assert client.get("/health").status_code == 200
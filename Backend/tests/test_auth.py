@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app import auth, tenancy
+from app.models.models import User
+from app.routers.auth import _load_user
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    auth._token_cache.clear()
+    yield
+    auth._token_cache.clear()
+
+
+def user(id=1, role="manager", tenant_id=None):
+    return SimpleNamespace(id=id, email=f"user{id}@example.com", role=role, tenant_id=tenant_id)
+
+
+def rejected(token):
+    with pytest.raises(HTTPException) as error:
+        auth.verify_token(token)
+    assert error.value.status_code == 401
+    return error.value.detail
+
+
+def test_issued_token_verifies_to_its_principal():
+    principal = auth.verify_token(auth.create_access_token(user(7, "tenant", tenant_id=3)))
+    assert principal[:4] == (7, "user7@example.com", "tenant", 3)
+    assert principal.schema is None
+
+
+def test_invalid_and_expired_tokens_are_rejected(monkeypatch):
+    token = auth.create_access_token(user())
+    assert rejected(token[:-2] + ("AA" if token[-2:] != "AA" else "BB")) == "Invalid token"
+    assert rejected("not-a-jwt") == "Invalid token"
+
+    monkeypatch.setattr(auth, "ACCESS_TOKEN_EXPIRE_MINUTES", -1)
+    assert rejected(auth.create_access_token(user())) == "Token has expired"
+
+
+def test_cached_token_still_expires(monkeypatch):
+    token = auth.create_access_token(user())
+    principal = auth.verify_token(token)
+    assert token in auth._token_cache
+    monkeypatch.setattr(auth.time, "time", lambda: principal.expires_at + 1)
+    assert rejected(token) == "Token has expired"
+    assert token not in auth._token_cache
+
+
+def test_cache_is_keyed_by_token_so_a_new_role_is_never_served_stale():
+    before = auth.create_access_token(user(role="manager"))
+    assert auth.verify_token(before).role == "manager"
+    # After a role change the user logs in again: the new token carries the new role
+    after = auth.create_access_token(user(role="admin"))
+    assert after != before
+    assert auth.verify_token(after).role == "admin"
+    assert auth._token_cache[before].role == "manager"
+
+
+def test_cache_evicts_the_least_recently_used_token(monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_TOKEN_CACHE_SIZE", 2)
+    first, second, third = (auth.create_access_token(user(id)) for id in (1, 2, 3))
+    auth.verify_token(first)
+    auth.verify_token(second)
+    auth.verify_token(first)  # now the most recently used
+    auth.verify_token(third)
+    assert list(auth._token_cache) == [first, third]
+
+
+def test_token_is_only_good_for_the_customer_that_issued_it():
+    with tenancy.use_schema("cust_a"):
+        token = auth.create_access_token(user())
+        assert auth.verify_token(token).schema == "cust_a"
+    assert rejected(token) == "Token was issued for another customer"
+
+
+def test_login_lookup_ignores_case_and_whitespace(db):
+    db.add(User(email="ada@example.com", hashed_password="x", role="admin", is_active=True))
+    db.commit()
+    assert _load_user("  Ada@Example.COM ").email == "ada@example.com"
+    assert _load_user("bob@example.com") is None
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app import changefeed
+from app.changefeed import ChangeHub, Subscriber
+
+
+@pytest.fixture(autouse=True)
+def no_coalesce_delay(monkeypatch):
+    monkeypatch.setattr(changefeed, "CHANGEFEED_COALESCE_MS", 0)
+
+
+def drain(subscriber, timeout=0.01):
+    return asyncio.run(subscriber.next_message(timeout))
+
+
+def ops(message):
+    return {(c["entity"], c["id"]): c["op"] for c in message["changes"]}
+
+
+def test_changes_to_one_row_collapse_into_one():
+    subscriber = Subscriber()
+    subscriber.offer([("tenants", 1, "insert"), ("tenants", 1, "update")])
+    subscriber.offer([("tenants", 1, "update"), ("tenants", 2, "update")])
+    message = drain(subscriber)
+    assert message["type"] == "changes"
+    assert ops(message) == {("tenants", 1): "insert", ("tenants", 2): "update"}
+
+
+def test_delete_then_insert_is_reported_as_update():
+    subscriber = Subscriber()
+    subscriber.offer([("leases", 7, "delete"), ("leases", 7, "insert")])
+    assert ops(drain(subscriber)) == {("leases", 7): "update"}
+
+
+def test_entity_filter():
+    subscriber = Subscriber(entities=["properties"])
+    subscriber.offer([("tenants", 1, "insert")])
+    assert drain(subscriber) is None
+    subscriber.offer([("tenants", 2, "insert"), ("properties", 3, "update")])
+    assert ops(drain(subscriber)) == {("properties", 3): "update"}
+
+
+def test_falling_behind_turns_into_a_single_resync():
+    subscriber = Subscriber(max_pending=3)
+    subscriber.offer([("tenants", n, "insert") for n in range(5)])
+    subscriber.offer([("tenants", 9, "insert")])
+    assert drain(subscriber) == {"type": "resync"}
+    assert drain(subscriber) is None
+    # Back to normal delivery afterwards
+    subscriber.offer([("tenants", 1, "update")])
+    assert ops(drain(subscriber)) == {("tenants", 1): "update"}
+
+
+def test_updates_to_pending_rows_do_not_count_towards_the_limit():
+    subscriber = Subscriber(max_pending=2)
+    subscriber.offer([("tenants", 1, "insert"), ("tenants", 2, "insert")])
+    subscriber.offer([("tenants", 1, "update"), ("tenants", 2, "update")])
+    assert ops(drain(subscriber)) == {("tenants", 1): "insert", ("tenants", 2): "insert"}
+
+
+def test_hub_routes_by_schema_and_resyncs_everyone():
+    hub = ChangeHub()
+    seen = []
+    hub.add_callback(seen.append)
+    default = hub.subscribe()
+    acme = hub.subscribe(schema="pm_acme")
+
+    hub.publish([("properties", 1, "update")], schema="pm_acme")
+    assert drain(default) is None
+    assert ops(drain(acme)) == {("properties", 1): "update"}
+
+    hub.resync()
+    assert drain(default) == {"type": "resync"}
+    assert drain(acme) == {"type": "resync"}
+    assert seen == [[("properties", 1, "update")], None]
+
+    hub.unsubscribe(acme)
+    hub.publish([("properties", 2, "update")], schema="pm_acme")
+    assert drain(acme) is None
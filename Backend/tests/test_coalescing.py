@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.coalescing import SingleFlightMiddleware
+
+
+def make_app():
+    calls = []
+    release = asyncio.Event()
+
+    async def item(request):
+        calls.append(request.path_params["item_id"])
+        call = len(calls)
+        await release.wait()
+        return JSONResponse({"item": request.path_params["item_id"], "call": call})
+
+    async def write(request):
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/items/{item_id}", item), Route("/items/{item_id}", write, methods=["PUT"])])
+    middleware = SingleFlightMiddleware(app, routes=["/items/{item_id}"])
+    return middleware, calls, release
+
+
+def scope_request(path, headers=None, query=b""):
+    return Request({
+        "type": "http", "method": "GET", "path": path, "query_string": query,
+        "headers": [(k.encode(), v.encode()) for k, v in (headers or {}).items()],
+    })
+
+
+def test_key_ignores_query_order_but_not_credentials_or_generation():
+    middleware, _, _ = make_app()
+    key = middleware._key(scope_request("/items/1", query=b"b=2&a=1"))
+    assert middleware._key(scope_request("/items/1", query=b"a=1&b=2")) == key
+    assert middleware._key(scope_request("/items/1", {"authorization": "Bearer other"}, b"a=1&b=2")) != key
+    assert middleware._match("/items/1") == "/items/{item_id}"
+    assert middleware._match("/items/1/notes") is None
+    middleware._generation += 1
+    assert middleware._key(scope_request("/items/1", query=b"a=1&b=2")) != key
+
+
+def test_concurrent_identical_gets_share_one_execution_until_a_write():
+    async def scenario():
+        middleware, calls, release = make_app()
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            leader = asyncio.create_task(client.get("/items/1"))
+            await asyncio.sleep(0.05)
+            follower = asyncio.create_task(client.get("/items/1"))
+            other_user = asyncio.create_task(client.get("/items/1", headers={"Authorization": "Bearer x"}))
+            await asyncio.sleep(0.05)
+            # A write completes while the first flight is still running
+            assert (await client.put("/items/1")).status_code == 200
+            after_write = asyncio.create_task(client.get("/items/1"))
+            await asyncio.sleep(0.05)
+            release.set()
+            responses = await asyncio.gather(leader, follower, other_user, after_write)
+        assert len(calls) == 3
+        leader_body, follower_body, other_body, after_body = [r.json() for r in responses]
+        assert follower_body == leader_body
+        assert other_body["call"] != leader_body["call"]
+        assert after_body["call"] not in (leader_body["call"], other_body["call"])
+        assert not middleware._flights
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from app import comparables
+
+
+def make_snapshot(n, seed, continuous_rooms=False, missing=0.0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n + 1, dtype=np.int64)
+    if continuous_rooms:
+        # Every unit its own (bedrooms, bathrooms) group: grouping can't pay off
+        bedrooms = rng.uniform(0, 5, n)
+        bathrooms = rng.uniform(1, 3, n)
+    else:
+        bedrooms = rng.integers(0, 5, n).astype(float)
+        bathrooms = rng.choice([1.0, 1.5, 2.0, 2.5], n)
+    area = rng.integers(300, 2500, n).astype(float)
+    features = np.column_stack([bedrooms, bathrooms, area])
+    features[rng.random(features.shape) < missing] = np.nan
+    rents = rng.integers(800, 4000, n).astype(float)
+    statuses = rng.choice(np.array(["rented", "occupied", "vacant"], dtype=object), n)
+    valid = np.ones(n, dtype=bool)
+    return comparables._snapshot(ids, features, rents, statuses, valid, 0.0)
+
+
+def brute_force(snap, subject, k):
+    """Distances to the k nearest comparables, straight from the formula."""
+    w = np.where(np.isnan(snap.features[subject]), 0.0, comparables.WEIGHTS)
+    others = snap.candidates[snap.candidates != subject]
+    distances = np.sqrt((w * (snap.scaled[subject] - snap.scaled[others]) ** 2).sum(axis=1) / max(w.sum(), 1e-12))
+    return np.sort(distances)[:k]
+
+
+@pytest.mark.parametrize("continuous_rooms", [False, True])
+@pytest.mark.parametrize("missing", [0.0, 0.1])
+def test_nearest_matches_brute_force(monkeypatch, continuous_rooms, missing):
+    # Small blocks so several batches are exercised
+    monkeypatch.setattr(comparables, "COMPARABLES_BLOCK_CELLS", 2000)
+    snap = make_snapshot(1000, seed=7, continuous_rooms=continuous_rooms, missing=missing)
+    k = 5
+    grouped = len(snap.group_keys) * (2 * k + 2) < len(snap.candidates)
+    assert grouped != continuous_rooms
+    subjects = np.arange(len(snap.ids))
+    nearest, distances = comparables._nearest(snap, subjects, k)
+    assert nearest.shape == distances.shape == (len(subjects), k)
+    for subject in subjects:
+        np.testing.assert_allclose(distances[subject], brute_force(snap, subject, k), atol=1e-9)
+        assert subject not in nearest[subject]
+        assert set(nearest[subject]) <= set(snap.candidates)
+        # Each reported distance belongs to the reported candidate
+        w = np.where(np.isnan(snap.features[subject]), 0.0, comparables.WEIGHTS)
+        own = np.sqrt((w * (snap.scaled[subject] - snap.scaled[nearest[subject]]) ** 2).sum(axis=1) / max(w.sum(), 1e-12))
+        np.testing.assert_allclose(own, distances[subject], atol=1e-9)
+
+
+def test_fewer_comparables_than_k_are_padded():
+    snap = make_snapshot(12, seed=3)
+    k = len(snap.candidates) + 3
+    nearest, distances = comparables._nearest(snap, np.array([int(snap.candidates[0])]), k)
+    found = len(snap.candidates) - 1  # not its own comparable
+    assert (nearest[0, :found] >= 0).all()
+    assert (nearest[0, found:] == -1).all()
+    assert np.isinf(distances[0, found:]).all()
+
+
+def test_no_subjects_or_candidates():
+    snap = make_snapshot(20, seed=1)
+    nearest, distances = comparables._nearest(snap, np.array([], dtype=np.int64), 5)
+    assert nearest.shape == (0, 0)
+    empty = comparables._snapshot(
+        snap.ids, snap.features, np.full(len(snap.ids), np.nan), snap.statuses, snap.valid, 0.0,
+    )
+    nearest, distances = comparables._nearest(empty, np.arange(3), 5)
+    assert nearest.shape == distances.shape == (3, 0)
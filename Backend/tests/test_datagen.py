@@ -0,0 +1,71 @@
+import importlib.util
+import os
+from collections import defaultdict
+from datetime import date
+
+import pytest
+
+from app.ledger import balance_delta
+
+DATAGEN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "datagen.py")
+SHAPE_PROPERTIES = 12
+AS_OF = date(2026, 1, 1)
+
+
+@pytest.fixture(scope="module")
+def datagen():
+    spec = importlib.util.spec_from_file_location("datagen", DATAGEN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate(datagen, chunk_size, seed=42):
+    """Rows per table and the combined digest string, generated chunk by chunk."""
+    shape = datagen.PRESETS["tiny"]._replace(properties=SHAPE_PROPERTIES)
+    rows = {table: [] for table in datagen.TABLES}
+    digests = []
+    for first in range(1, SHAPE_PROPERTIES + 1, chunk_size):
+        chunk_rows, ends = datagen.generate_chunk(first, min(first + chunk_size - 1, SHAPE_PROPERTIES), shape, seed, AS_OF)
+        for table, table_rows in chunk_rows.items():
+            rows[table].extend(table_rows)
+        digests.append(datagen.serialize(chunk_rows, ends)[1])
+    return rows, "".join(digests)
+
+
+def test_output_does_not_depend_on_chunk_size(datagen):
+    rows, digest = generate(datagen, SHAPE_PROPERTIES)
+    for chunk_size in (1, 5, 7):
+        other_rows, other_digest = generate(datagen, chunk_size)
+        assert other_rows == rows
+        assert other_digest == digest
+
+
+def test_seed_changes_the_data(datagen):
+    assert generate(datagen, 4, seed=1)[1] == generate(datagen, 4, seed=1)[1]
+    assert generate(datagen, 4, seed=1)[1] != generate(datagen, 4, seed=2)[1]
+
+
+def test_serialize_payloads_hold_every_row(datagen):
+    shape = datagen.PRESETS["tiny"]._replace(properties=SHAPE_PROPERTIES)
+    rows, ends = datagen.generate_chunk(1, 3, shape, 42, AS_OF)
+    payloads, digest = datagen.serialize(rows, ends)
+    assert len(ends) == 3
+    assert len(digest) == 3 * 64
+    for table, table_rows in rows.items():
+        assert payloads[table].count("\n") == len(table_rows) == ends[-1][table]
+
+
+def test_ids_are_unique_and_balances_match_the_ledger(datagen):
+    rows, _ = generate(datagen, 5)
+    for table in datagen.SERIAL_TABLES:
+        ids = [row[0] for row in rows[table]]
+        assert len(ids) == len(set(ids)), table
+
+    owed = defaultdict(int)
+    for _, _, tenant_id, _, tx_type, amount, _, _ in rows["transactions"]:
+        if tenant_id is not None:
+            owed[tenant_id] += balance_delta(tx_type, amount)
+    balances = dict(rows["tenant_balances"])
+    assert balances == owed
+    assert any(balances.values())
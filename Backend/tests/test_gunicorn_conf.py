@@ -0,0 +1,68 @@
+import importlib.util
+import multiprocessing
+import os
+
+import pytest
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+
+@pytest.fixture
+def conf(monkeypatch, tmp_path):
+    """gunicorn.conf.py loaded as a module (it computes the pool split on import)."""
+    # Set here so the module's setdefault doesn't leak into the rest of the session
+    monkeypatch.setenv("METRICS_MULTIPROC_DIR", str(tmp_path))
+
+    def load(**env):
+        for name in ("WEB_CONCURRENCY", "DB_MAX_CONNECTIONS", "DB_RESERVED_PER_WORKER"):
+            monkeypatch.delenv(name, raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        spec = importlib.util.spec_from_file_location("gunicorn_conf", CONF_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
+
+
+def test_pool_limits_never_exceed_the_budget(conf):
+    pool_limits = conf(WEB_CONCURRENCY=1).pool_limits
+    for budget in (10, 40, 97):
+        for workers in (1, 2, 3, 4, 8):
+            for reserved in (0, 1, 2):
+                if budget // workers - reserved < 1:
+                    continue
+                pool_size, max_overflow = pool_limits(budget, workers, reserved)
+                assert max_overflow == 0
+                assert pool_size >= 1
+                assert workers * (pool_size + max_overflow + reserved) <= budget
+
+
+def test_pool_limits_rejects_a_budget_too_small_for_the_workers(conf):
+    pool_limits = conf(WEB_CONCURRENCY=1).pool_limits
+    with pytest.raises(ValueError, match="DB_MAX_CONNECTIONS=8"):
+        pool_limits(8, 4, 2)
+
+
+def test_default_reserve_covers_listener_and_health_probe(conf):
+    module = conf(WEB_CONCURRENCY=4, DB_MAX_CONNECTIONS=40)
+    assert module._reserved == 2
+    assert module.raw_env == ["DB_POOL_SIZE=8", "DB_MAX_OVERFLOW=0"]
+
+
+def test_reserve_can_be_overridden(conf):
+    module = conf(WEB_CONCURRENCY=4, DB_MAX_CONNECTIONS=40, DB_RESERVED_PER_WORKER=0)
+    assert module.raw_env == ["DB_POOL_SIZE=10", "DB_MAX_OVERFLOW=0"]
+
+
+@pytest.mark.parametrize("cpus, workers, pool_size", [(2, 2, 18), (13, 13, 1), (16, 13, 1), (64, 13, 1)])
+def test_default_workers_are_capped_by_the_budget(conf, monkeypatch, cpus, workers, pool_size):
+    monkeypatch.setattr(multiprocessing, "cpu_count", lambda: cpus)
+    module = conf(DB_MAX_CONNECTIONS=40)
+    assert module.workers == workers
+    assert module.raw_env == [f"DB_POOL_SIZE={pool_size}", "DB_MAX_OVERFLOW=0"]
+
+
+def test_explicit_worker_count_beyond_the_budget_is_rejected(conf):
+    with pytest.raises(ValueError, match="too small for 16 workers"):
+        conf(WEB_CONCURRENCY=16, DB_MAX_CONNECTIONS=40)
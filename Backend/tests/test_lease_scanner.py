@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import changefeed, lease_scanner
+from app.models.models import Lease, RenewalTask
+
+TODAY = date(2026, 6, 15)
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Several chunks per pass, so the keyset cursor has to carry over
+    monkeypatch.setattr(lease_scanner, "LEASE_SCAN_CHUNK", 2)
+
+
+def add_leases(db, *offsets, status="active"):
+    leases = [Lease(end_date=TODAY + timedelta(days=days), status=status) for days in offsets]
+    db.add_all(leases)
+    db.commit()
+    return [lease.id for lease in leases]
+
+
+def statuses(db):
+    return {lease.id: lease.status for lease in db.query(Lease)}
+
+
+def test_add_months_clamps_to_the_end_of_the_month():
+    assert lease_scanner.add_months(date(2026, 1, 31), 1) == date(2026, 2, 28)
+    assert lease_scanner.add_months(date(2026, 11, 30), 3) == date(2027, 2, 28)
+    assert lease_scanner.default_end_date(date(2026, 3, 1)) == date(2027, 2, 28)
+
+
+def test_expires_past_leases_across_chunks_but_not_those_ending_today(db, monkeypatch):
+    announced = []
+    monkeypatch.setattr(changefeed, "record_changes", lambda session, entity, ids, op: announced.extend(ids))
+    past = add_leases(db, -30, -10, -5, -5, -1)
+    current = add_leases(db, 0, 1, 90)
+    add_leases(db, -20, status="terminated")
+    db.expire_all()
+
+    assert lease_scanner.expire_leases(db, TODAY) == len(past)
+    db.expire_all()
+    assert {i: s for i, s in statuses(db).items() if s == "expired"} == {i: "expired" for i in past}
+    assert all(statuses(db)[i] == "active" for i in current)
+    # The change feed hears only about the rows that were actually changed
+    assert sorted(announced) == past
+    assert lease_scanner.expire_leases(db, TODAY) == 0
+
+
+def test_renewal_tasks_are_created_once_per_lease_term(db):
+    due = add_leases(db, 0, 3, 3, 20, lease_scanner.LEASE_RENEWAL_WINDOW_DAYS)
+    add_leases(db, -1, lease_scanner.LEASE_RENEWAL_WINDOW_DAYS + 2)
+    add_leases(db, 10, status="expired")
+
+    assert lease_scanner.create_renewal_tasks(db, TODAY) == len(due)
+    # A rescan (the next day, say) finds the same leases and adds nothing
+    assert lease_scanner.create_renewal_tasks(db, TODAY) == 0
+    assert lease_scanner.create_renewal_tasks(db, TODAY + timedelta(days=1)) == 0
+    tasks = db.query(RenewalTask).order_by(RenewalTask.lease_id).all()
+    assert [task.lease_id for task in tasks] == due
+    assert all(task.status == "open" for task in tasks)
+
+
+def test_leases_changed_after_the_chunk_was_read_are_not_counted(db, monkeypatch):
+    past = add_leases(db, -3, -2, -1)
+    announced = []
+    monkeypatch.setattr(changefeed, "record_changes", lambda session, entity, ids, op: announced.extend(ids))
+    active_chunks = lease_scanner._active_chunks
+
+    def renewed_meanwhile(session, first_end, last_end):
+        for rows in active_chunks(session, first_end, last_end):
+            # Another request renews the first lease of the chunk before the UPDATE runs
+            session.query(Lease).filter(Lease.id == rows[0].id).update({"status": "renewed"})
+            yield rows
+    monkeypatch.setattr(lease_scanner, "_active_chunks", renewed_meanwhile)
+
+    assert lease_scanner.expire_leases(db, TODAY) == 1
+    assert announced == [past[1]]
+    db.expire_all()
+    assert statuses(db) == {past[0]: "renewed", past[1]: "expired", past[2]: "renewed"}
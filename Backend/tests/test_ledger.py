@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app import ledger
+from app.ledger import LedgerError
+from app.models.models import Lease, Property, Tenant, TenantBalance
+
+TODAY = date.today()
+
+
+def days_ago(n):
+    return TODAY - timedelta(days=n)
+
+
+@pytest.fixture
+def lease(db):
+    prop = Property(address="1 Main St")
+    tenant = Tenant(first_name="Ada", last_name="Lovelace", email="ada@example.com")
+    db.add_all([prop, tenant])
+    db.flush()
+    lease = Lease(property_id=prop.id, tenant_id=tenant.id, start_date=days_ago(365), status="active")
+    db.add(lease)
+    db.commit()
+    return lease
+
+
+def post(db, lease, tx_type, amount, when):
+    ledger.post_transaction(db, lease_id=lease.id, type=tx_type, amount=Decimal(amount), date=when)
+
+
+def test_balance_delta_signs():
+    assert ledger.balance_delta("Rent", "100") == Decimal("100")
+    assert ledger.balance_delta("payment", "40") == Decimal("-40")
+    assert ledger.balance_delta("writeoff", "5") == Decimal("-5")
+    assert ledger.balance_delta("repair", "300") == 0
+    assert ledger.balance_delta(None, None) == 0
+
+
+def test_postings_maintain_balances(db, lease):
+    post(db, lease, "rent", "1000", days_ago(10))
+    post(db, lease, "late_fee", "50", days_ago(5))
+    post(db, lease, "payment", "600", days_ago(1))
+    post(db, lease, "repair", "300", days_ago(1))
+    db.commit()
+
+    balances = ledger.get_balances(db, lease.tenant_id)
+    assert Decimal(balances["balance"]) == Decimal("450")
+    assert [(lb["lease_id"], Decimal(lb["balance"])) for lb in balances["leases"]] == [(lease.id, Decimal("450"))]
+
+    db.query(TenantBalance).delete()
+    ledger.rebuild_balances(db)
+    db.commit()
+    assert Decimal(ledger.get_balances(db, lease.tenant_id)["balance"]) == Decimal("450")
+
+
+def test_postings_reject_unknown_references(db, lease):
+    with pytest.raises(LedgerError, match="Tenant 999 not found"):
+        ledger.post_transaction(db, tenant_id=999, type="rent", amount=Decimal("1"))
+    with pytest.raises(LedgerError, match="Property 999 not found"):
+        ledger.post_transaction(db, property_id=999, type="repair", amount=Decimal("1"))
+    with pytest.raises(LedgerError, match="Lease 999 not found"):
+        ledger.post_transaction(db, lease_id=999, type="rent", amount=Decimal("1"))
+    with pytest.raises(LedgerError, match="does not belong"):
+        ledger.post_transaction(db, lease_id=lease.id, tenant_id=lease.tenant_id + 1, type="rent", amount=Decimal("1"))
+
+
+def test_aging_allocates_payments_to_the_oldest_charges(db, lease):
+    for age in (100, 70, 40, 5):
+        post(db, lease, "rent", "100", days_ago(age))
+    post(db, lease, "payment", "150", days_ago(2))
+    db.commit()
+
+    report = ledger.aging_report(db)
+    assert report["tenants"] == [{
+        "tenant_id": lease.tenant_id,
+        "current": "100.00",
+        "days_31_60": "100.00",
+        "days_61_90": "50.00",
+        "days_90_plus": "0.00",
+        "total": "250.00",
+        "oldest_charge": days_ago(70).isoformat(),
+    }]
+    assert report["totals"]["total"] == "250.00"
+
+
+def test_settled_tenants_are_left_out(db, lease):
+    post(db, lease, "rent", "100", days_ago(20))
+    post(db, lease, "payment", "100", days_ago(10))
+    db.commit()
+    assert ledger.aging_report(db)["tenants"] == []
+
+
+def test_historical_aging_uses_the_balance_on_as_of(db, lease):
+    post(db, lease, "rent", "500", days_ago(60))
+    post(db, lease, "payment", "200", days_ago(30))
+    # Paid off after the report date
+    post(db, lease, "payment", "300", days_ago(10))
+    db.commit()
+
+    assert ledger.aging_report(db)["tenants"] == []
+    tenants = ledger.aging_report(db, as_of=days_ago(20))["tenants"]
+    assert [(t["tenant_id"], t["total"], t["days_31_60"]) for t in tenants] == [(lease.tenant_id, "300.00", "300.00")]
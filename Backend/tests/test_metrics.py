@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from app import metrics
+from app.metrics import Registry, bucket_quantile
+
+BUCKETS = (0.1, 0.2, 0.5, 1.0)
+
+
+def test_quantile_of_empty_histogram_is_none():
+    assert bucket_quantile(0.5, BUCKETS, [0, 0, 0, 0, 0]) is None
+
+
+def test_quantile_interpolates_within_the_bucket():
+    # 10 observations in (0.1, 0.2]: the median sits halfway through that bucket
+    assert bucket_quantile(0.5, BUCKETS, [0, 10, 0, 0, 0]) == pytest.approx(0.15)
+    # 4 in the first bucket, 4 in the third: p75 is halfway through (0.2, 0.5]
+    assert bucket_quantile(0.75, BUCKETS, [4, 0, 4, 0, 0]) == pytest.approx(0.35)
+
+
+def test_quantile_skips_empty_buckets():
+    assert bucket_quantile(0.5, BUCKETS, [1, 0, 0, 1, 0]) == pytest.approx(0.1)
+    assert bucket_quantile(0.99, BUCKETS, [1, 0, 0, 1, 0]) == pytest.approx(0.5 + 0.5 * 0.98)
+
+
+def test_quantile_in_overflow_bucket_reports_its_lower_edge():
+    assert bucket_quantile(0.99, BUCKETS, [1, 0, 0, 0, 99]) == 1.0
+
+
+def test_histogram_observations_land_in_inclusive_buckets():
+    registry = Registry()
+    histogram = registry.histogram("test_latency_seconds", "Test latency.", ("route",), buckets=BUCKETS)
+    for value in (0.1, 0.15, 0.5, 3.0):
+        histogram.observe(value, "/x")
+    (labels, (counts, total, count)), = histogram.snapshot()["series"]
+    assert labels == ["/x"]
+    assert counts == [1, 1, 1, 0, 1]
+    assert total == pytest.approx(3.75)
+    assert count == 4
+
+
+def test_merge_sums_histograms_and_drops_stale_gauges():
+    registry = Registry()
+    histogram = registry.histogram("test_latency_seconds", "Test latency.", buckets=BUCKETS)
+    gauge = registry.gauge("test_in_flight", "Test gauge.")
+    histogram.observe(0.15)
+    gauge.set(3)
+    live = registry.snapshot()
+    stale = registry.snapshot()
+    stale["written_at"] = time.time() - 10 * metrics.METRICS_FLUSH_INTERVAL
+
+    merged = registry.merge([live, stale])
+    counts, total, count = merged["test_latency_seconds"]["series"][()]
+    assert counts == [0, 2, 0, 0, 0]
+    assert count == 2
+    assert merged["test_latency_seconds"]["slots"][()] == [0, 2, 0, 0, 0]
+    assert merged["test_in_flight"]["series"][()] == 3
+
+    rendered = registry.render(merged)
+    assert 'test_latency_seconds_bucket{le="0.2"} 2' in rendered
+    assert 'test_latency_seconds_window{quantile="0.5"} 0.15' in rendered
+
+
+def test_merge_combines_live_gauges_by_their_aggregate():
+    registry = Registry()
+    in_flight = registry.gauge("test_in_flight", "Test gauge.")
+    started = registry.gauge("test_start_time_seconds", "Test start time.", aggregate="min")
+    in_flight.set(3)
+    started.set(1000.0)
+    first = registry.snapshot()
+    in_flight.set(4)
+    started.set(2000.0)
+    second = registry.snapshot()
+
+    merged = registry.merge([first, second])
+    assert merged["test_in_flight"]["series"][()] == 7
+    assert merged["test_start_time_seconds"]["series"][()] == 1000.0
+    with pytest.raises(ValueError, match="unknown gauge aggregate"):
+        registry.gauge("test_bad", "Test gauge.", aggregate="mean")
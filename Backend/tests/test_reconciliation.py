@@ -0,0 +1,121 @@
+import io
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app import reconciliation
+from app.models.models import Transaction
+from app.reconciliation import LedgerEntry, StatementError, StatementLine, signed_cents
+
+D = date(2026, 3, 10)
+
+
+def entry(id, cents, tx_type, days=0, description=""):
+    return LedgerEntry(id, D + timedelta(days=days), cents, tx_type, description)
+
+
+def line(n, cents, days=0, description=""):
+    return StatementLine(n, D + timedelta(days=days), cents, description)
+
+
+def paired(matches):
+    return {statement_line.line: ledger_entry.id for statement_line, ledger_entry, _, _ in matches}
+
+
+def test_signed_cents_follows_the_transaction_type():
+    assert signed_cents("Payment", Decimal("1200.00")) == 120000
+    assert signed_cents("income", "50.5") == 5050
+    assert signed_cents("repair", Decimal("300")) == -30000
+    assert signed_cents("refund", Decimal("-25")) == -2500
+
+
+def test_withdrawals_match_expenses_and_deposits_match_payments():
+    ledger = [
+        entry(1, signed_cents("payment", 300), "payment"),
+        entry(2, signed_cents("repair", 300), "repair"),
+        entry(3, signed_cents("credit", 300), "credit"),
+    ]
+    matches, lines_left, entries_left = reconciliation.match([line(1, -30000), line(2, 30000)], ledger)
+    assert paired(matches) == {1: 2, 2: 1}
+    assert lines_left == []
+    # Credits move no money and are never offered as candidates
+    assert entries_left == []
+
+
+def test_matches_only_within_the_date_window():
+    ledger = [entry(1, 10000, "payment", days=4), entry(2, 10000, "payment", days=-3)]
+    matches, lines_left, entries_left = reconciliation.match([line(1, 10000), line(2, 10000)], ledger, window=3)
+    assert paired(matches) == {1: 2}
+    assert [l.line for l in lines_left] == [2]
+    assert [e.id for e in entries_left] == [1]
+
+
+def test_nearest_date_wins_then_reference_then_description():
+    ledger = [
+        entry(1, 150000, "payment", days=0, description="Rent unit 4B"),
+        entry(2, 150000, "payment", days=1, description="Rent unit 7A"),
+        entry(3, 150000, "payment", days=1, description="Rent unit 7A late"),
+        entry(4, 150000, "payment", days=2, description="Rent unit 12"),
+        entry(5, 150000, "payment", days=2, description="Rent"),
+    ]
+    lines = [
+        line(1, 150000, days=0, description="RENT UNIT 7A"),
+        line(2, 150000, days=1, description="rent unit 7a late"),
+        line(3, 150000, days=2, description="Rent"),
+        line(4, 150000, days=1, description="rent unit 7a"),
+    ]
+    matches, lines_left, entries_left = reconciliation.match(lines, ledger)
+    # Line 1: only entry 1 is on its date. Line 4 takes the last 7A entry on its date.
+    assert paired(matches) == {1: 1, 2: 3, 3: 5, 4: 2}
+    assert [e.id for e in entries_left] == [4]
+    assert lines_left == []
+
+
+def test_many_same_amount_lines_match_in_linear_time():
+    n = 5000
+    ledger = [entry(i, 125000, "payment", days=i % 28, description=f"Rent unit {i}") for i in range(n)]
+    lines = [line(i, 125000, days=i % 28, description=f"RENT UNIT {i}") for i in reversed(range(n))]
+    started = time.perf_counter()
+    matches, lines_left, entries_left = reconciliation.match(lines, ledger)
+    assert time.perf_counter() - started < 5
+    assert len(matches) == n
+    # Each line finds its own unit on its own date through the reference number
+    assert all(statement_line.line == ledger_entry.id for statement_line, ledger_entry, _, _ in matches)
+    assert lines_left == [] and entries_left == []
+
+
+def test_min_similarity_rejects_unrelated_descriptions():
+    ledger = [entry(1, 5000, "payment", description="Parking fee")]
+    matches, lines_left, _ = reconciliation.match([line(1, 5000, description="Coffee shop")], ledger, min_similarity=0.8)
+    assert matches == []
+    assert len(lines_left) == 1
+
+
+def test_parse_statement_with_credit_and_debit_columns():
+    csv_text = (
+        "Posting Date,Payee,Credit,Debit\n"
+        "03/10/2026,Tenant payment,\"1,200.00\",\n"
+        "\n"
+        "2026-03-11,Plumber,,300.00\n"
+    )
+    lines = list(reconciliation.parse_statement(io.StringIO(csv_text)))
+    assert [(l.line, l.date, l.cents, l.description) for l in lines] == [
+        (2, date(2026, 3, 10), 120000, "Tenant payment"),
+        (4, date(2026, 3, 11), -30000, "Plumber"),
+    ]
+
+
+def test_parse_statement_reports_the_bad_line():
+    with pytest.raises(StatementError, match="Line 2: Unrecognized amount"):
+        list(reconciliation.parse_statement(io.StringIO("date,description,amount\n2026-03-10,x,abc\n")))
+
+
+def test_load_ledger_keeps_only_cash_types(db):
+    for tx_type, amount in (("rent", "1000"), ("payment", "1000"), ("writeoff", "20"), ("repair", "300"), ("income", "5")):
+        db.add(Transaction(type=tx_type, amount=Decimal(amount), date=D))
+    db.add(Transaction(type="payment", amount=Decimal("1"), date=D + timedelta(days=30)))
+    db.commit()
+    entries = reconciliation.load_ledger(db, D, D + timedelta(days=1))
+    assert sorted((e.type, e.cents) for e in entries) == [("income", 500), ("payment", 100000), ("repair", -30000)]
@@ -0,0 +1,90 @@
+import pytest
+
+from app import search_index
+from app.models.models import Property, Tenant
+from app.search_index import SearchIndex, query_terms
+
+
+@pytest.fixture
+def rows(db):
+    db.add_all([
+        Property(id=1, address="12 Oak Street", status="vacant"),
+        Property(id=2, address="7 Alder Way", status="rented"),
+        Tenant(id=1, first_name="José", last_name="Alvarez", email="jose.alvarez@example.com", phone="(555) 123-4567"),
+        Tenant(id=2, first_name="Alice", last_name="Oakley", email="alice@example.com", phone="555 987 6543"),
+    ])
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def idx(rows):
+    idx = SearchIndex(None)
+    idx.ensure_built()
+    return idx
+
+
+def found(results):
+    return [(r["type"], r["id"]) for r in results]
+
+
+def assert_consistent(idx):
+    """The incrementally maintained entries equal a fresh sort of the documents."""
+    assert (idx.keys, idx.refs) == search_index._sorted_entries(idx.docs)
+
+
+def test_query_terms():
+    assert query_terms("José  O'Neil") == ["jose", "o", "neil"]
+    assert query_terms("(555) 123-45") == ["55512345"]
+    assert query_terms("alice@Example.com") == ["alice@example.com"]
+
+
+def test_prefix_search_over_names_addresses_emails_and_phones(idx):
+    assert found(idx.suggest(["oak"], 10)) == [("property", 1), ("tenant", 2)]
+    assert found(idx.suggest(["jose"], 10)) == [("tenant", 1)]
+    assert found(idx.suggest(["alvarez", "jo"], 10)) == [("tenant", 1)]
+    assert found(idx.suggest(["5551234"], 10)) == [("tenant", 1)]
+    assert found(idx.suggest(["alice@example.com"], 10)) == [("tenant", 2)]
+    assert idx.suggest(["alice", "street"], 10) == []
+
+
+def test_type_filter_applies_before_the_scan_limit(idx, monkeypatch):
+    # "al" matches Alder Way, Alvarez and Alice; only one entry may be scanned
+    monkeypatch.setattr(search_index, "SEARCH_SCAN_LIMIT", 1)
+    assert found(idx.suggest(["al"], 10, kind="property")) == [("property", 2)]
+    assert len(idx.suggest(["al"], 10, kind="tenant")) == 1
+
+
+def test_scan_limit_truncates_in_token_order_after_exact_matches(idx, monkeypatch):
+    monkeypatch.setattr(search_index, "SEARCH_SCAN_LIMIT", 1)
+    # "oak" (12 Oak Street) sorts before "oakley"; the Oakley tenant is past the limit
+    assert found(idx.suggest(["oak"], 10)) == [("property", 1)]
+
+
+@pytest.mark.parametrize("merge_threshold", [1000, 0])
+def test_pending_changes_are_applied(rows, idx, monkeypatch, merge_threshold):
+    # 1000: entries inserted and removed one by one; 0: filtered and re-sorted
+    monkeypatch.setattr(search_index, "SEARCH_MERGE_THRESHOLD", merge_threshold)
+    rows.get(Property, 1).address = "99 Birch Road"
+    rows.delete(rows.get(Tenant, 2))
+    rows.add(Tenant(id=3, first_name="Bob", last_name="Oakes"))
+    rows.commit()
+
+    idx.pending.update({("property", 1), ("tenant", 2), ("tenant", 3)})
+    idx.apply_pending()
+    assert not idx.pending
+    assert_consistent(idx)
+    assert found(idx.suggest(["oak"], 10)) == [("tenant", 3)]
+    assert found(idx.suggest(["birch"], 10)) == [("property", 1)]
+    assert idx.suggest(["alice"], 10) == []
+
+
+def test_add_and_remove_keep_entries_sorted(idx):
+    ref = search_index._ref("tenant", 10)
+    idx._add(ref, search_index.tenant_document(10, "Zoe", "Oakley", None, None))
+    assert_consistent(idx)
+    assert sorted(found(idx.suggest(["oakley"], 10))) == [("tenant", 2), ("tenant", 10)]
+    idx._remove(ref)
+    idx._remove(ref)  # already gone: no-op
+    assert_consistent(idx)
+    assert found(idx.suggest(["oakley"], 10)) == [("tenant", 2)]
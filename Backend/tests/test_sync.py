@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.models import Property, Tenant, Tombstone
+from app.routers import sync
+from app.routers.sync import decode_token, encode_token
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def ago(seconds):
+    # SQLite keeps UTC timestamps without an offset
+    return (NOW - timedelta(seconds=seconds)).replace(tzinfo=None)
+
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_token_round_trip():
+    moment = datetime(2026, 3, 10, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    token = encode_token(moment)
+    assert "=" not in token
+    assert decode_token(token) == moment
+    # Tokens written without an offset are read as UTC
+    assert decode_token(encode_token(moment.replace(tzinfo=None))) == moment
+    for bad in ("not a token!", encode_token(moment)[:-3] + "%%%", "bm9wZQ"):
+        with pytest.raises(ValueError):
+            decode_token(bad)
+
+
+def test_full_snapshot_then_delta_with_overlap_and_tombstones(db, monkeypatch):
+    monkeypatch.setattr(sync, "SYNC_OVERLAP_SECONDS", 30)
+    db.add_all([
+        Property(id=1, address="Old", updated_at=ago(3600)),
+        Property(id=2, address="Just before the token", updated_at=ago(620)),
+        Property(id=3, address="After the token", updated_at=ago(60)),
+        Tenant(id=1, first_name="Ada", updated_at=ago(3600)),
+        Tombstone(entity="tenants", entity_id=7, deleted_at=ago(60)),
+        Tombstone(entity="tenants", entity_id=8, deleted_at=ago(3600)),
+        Tombstone(entity="reports", entity_id=9, deleted_at=ago(60)),
+    ])
+    db.commit()
+
+    full = sync.sync_changes(since=None, db=db)
+    assert full["full"] is True
+    assert ids(full["properties"]) == [1, 2, 3]
+    assert ids(full["tenants"]) == [1]
+    assert full["deleted"]["tenants"] == []
+    assert decode_token(full["next_token"]) >= NOW
+
+    # A token from 10 minutes ago still picks up the row written 20 s before it
+    delta = sync.sync_changes(since=encode_token(NOW - timedelta(seconds=600)), db=db)
+    assert delta["full"] is False
+    assert ids(delta["properties"]) == [2, 3]
+    assert delta["tenants"] == []
+    assert delta["deleted"] == {name: [] for name in sync.COLLECTIONS} | {"tenants": [7]}
+
+    with pytest.raises(HTTPException) as error:
+        sync.sync_changes(since="%%%", db=db)
+    assert error.value.status_code == 400
@@ -3,10 +3,19 @@ REM Start both backend and frontend servers
 echo Starting Property Management Application...
 echo.
 echo Starting Backend (Python/FastAPI)...
+REM Desktop edition: embedded SQLite database unless EMBEDDED_DB=False is set (then DATABASE_URL is used)
+if not defined EMBEDDED_DB set EMBEDDED_DB=True
 start "Backend Server" cmd /k "cd /d "%~dp0Backend" && (if exist .venv\Scripts\python.exe (.venv\Scripts\python.exe -m uvicorn app.main:app --host 127.0.0.1 --port 8000) else (python -m uvicorn app.main:app --host 127.0.0.1 --port 8000))"
 
 echo Waiting for backend to start...
-timeout /t 3 /nobreak > nul
+set /a attempts=0
+:wait_backend
+curl -s -f -o nul http://127.0.0.1:8000/health/live && goto backend_ready
+set /a attempts+=1
+if %attempts% geq 150 goto backend_ready
+ping -n 1 -w 200 192.0.2.1 > nul
+goto wait_backend
+:backend_ready
 
 echo Starting Frontend (Vite/React)...
 start "Frontend Server" cmd /k "cd /d "%~dp0" && npm run dev"
@@ -10,6 +10,8 @@ $scriptDir = Split-Path -Parent $MyInvocation.MyCommand.Path
 # Start Backend
 Write-Host "Starting Backend (Python/FastAPI)..." -ForegroundColor Cyan
 $backendPath = Join-Path $scriptDir "Backend"
+# Desktop edition: embedded SQLite database unless EMBEDDED_DB=False is set (then DATABASE_URL is used)
+if (-not $env:EMBEDDED_DB) { $env:EMBEDDED_DB = "True" }
 $pythonExe = Join-Path $backendPath ".venv\Scripts\python.exe"
 
 if (Test-Path $pythonExe) {
@@ -20,9 +22,17 @@ if (Test-Path $pythonExe) {
     Start-Process -FilePath "powershell.exe" -ArgumentList "-NoExit", "-Command", "cd '$backendPath'; python -m uvicorn app.main:app --host 127.0.0.1 --port 8000"
 }
 
-# Wait for backend to initialize
+# Wait for backend to initialize (poll the liveness probe instead of a fixed delay)
 Write-Host "Waiting for backend to start..." -ForegroundColor Gray
-Start-Sleep -Seconds 3
+$deadline = (Get-Date).AddSeconds(30)
+while ((Get-Date) -lt $deadline) {
+    try {
+        $response = Invoke-WebRequest -Uri "http://127.0.0.1:8000/health/live" -UseBasicParsing -TimeoutSec 1
+        if ($response.StatusCode -eq 200) { break }
+    } catch {
+        Start-Sleep -Milliseconds 100
+    }
+}
 
 # Start Frontend
 Write-Host "Starting Frontend (Vite/React)..." -ForegroundColor Cyan